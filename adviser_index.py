@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from ranking_index import ADVISER_KEY_COLUMNS, RankingIndex
+
+# 顾问历史中展示的列
+HISTORY_COLUMNS = ['大区', '顾问编制', '最终收益值', '销售利润', '总收益']
+
+# 顾问键中名称与门店的分隔符
+_KEY_SEPARATOR = '\x1f'
+
+
+class AdviserIndex:
+    def __init__(self):
+        """跨月份顾问索引：顾问键(顾问名称, 门店名称) → 各月份中的行号，随月份增删增量维护
+
+        每个顾问分配一个全局编号，每个月份保存 编号→行号 的数组，查询单个顾问的历史只需逐月读取一次（O(月份数)）。
+        同一月份中重复出现的顾问键取第一行（movers中取进入目标组的那一行）。
+        """
+        self._key_index = pd.Index([], dtype=object)
+        self._names = []
+        self._stores = []
+        self._by_name = {}
+        self._months = {}
+
+    # ---- 维护 ----
+
+    def update(self, month_key, date, df, ranking=None):
+        """新增或替换一个月份"""
+        if any(name not in df.columns for name in ADVISER_KEY_COLUMNS):
+            self.remove(month_key)
+            return
+        names = df[ADVISER_KEY_COLUMNS[0]].astype(str).to_numpy()
+        stores = df[ADVISER_KEY_COLUMNS[1]].astype(str).to_numpy()
+        keys = pd.Index(names.astype(object) + _KEY_SEPARATOR + stores.astype(object))
+
+        ids = self._key_index.get_indexer(keys)
+        new_mask = ids < 0
+        if new_mask.any():
+            new_keys, first = np.unique(keys[new_mask].to_numpy(), return_index=True)
+            # 按在月份中首次出现的顺序编号
+            new_keys = new_keys[np.argsort(first)]
+            start = len(self._key_index)
+            self._key_index = self._key_index.append(pd.Index(new_keys, dtype=object))
+            for adviser_id, key in enumerate(new_keys, start):
+                name, store = key.split(_KEY_SEPARATOR, 1)
+                self._names.append(name)
+                self._stores.append(store)
+                self._by_name.setdefault(name, []).append(adviser_id)
+            ids = self._key_index.get_indexer(keys)
+
+        row_of = np.full(len(self._key_index), -1, dtype=np.int32)
+        # 倒序赋值，重复的顾问键保留第一行
+        row_of[ids[::-1]] = np.arange(len(df) - 1, -1, -1, dtype=np.int32)
+        self._months[month_key] = {
+            'date': date,
+            'data': df,
+            'ranking': ranking if ranking is not None else RankingIndex(df),
+            'ids': ids.astype(np.int32),
+            'row_of': row_of
+        }
+
+    def remove(self, month_key):
+        """移除一个月份（顾问编号保留，便于重新加入时复用）"""
+        self._months.pop(month_key, None)
+
+    def clear(self):
+        """清空所有月份与顾问编号"""
+        self._key_index = pd.Index([], dtype=object)
+        self._names = []
+        self._stores = []
+        self._by_name = {}
+        self._months = {}
+
+    # ---- 查询 ----
+
+    @property
+    def months(self):
+        """按日期排序的月份列表"""
+        return sorted(self._months, key=lambda month_key: self._months[month_key]['date'])
+
+    def __len__(self):
+        return len(self._key_index)
+
+    def _rows_of(self, month_key):
+        """月份的 编号→行号 数组，补齐到当前顾问数（该月之后新增的顾问为-1）"""
+        row_of = self._months[month_key]['row_of']
+        if len(row_of) < len(self._key_index):
+            row_of = np.concatenate([row_of, np.full(len(self._key_index) - len(row_of), -1, dtype=np.int32)])
+            self._months[month_key]['row_of'] = row_of
+        return row_of
+
+    def find(self, name, store=None):
+        """按顾问名称（可选门店名称）查找顾问编号"""
+        ids = self._by_name.get(str(name), [])
+        if store is not None:
+            ids = [adviser_id for adviser_id in ids if self._stores[adviser_id] == str(store)]
+        return ids
+
+    def rows(self, adviser_id):
+        """顾问在各月份中的行号 {月份: 行号}，未出现的月份不包含"""
+        rows = {}
+        for month_key in self.months:
+            row_of = self._months[month_key]['row_of']
+            if adviser_id < len(row_of) and row_of[adviser_id] >= 0:
+                rows[month_key] = int(row_of[adviser_id])
+        return rows
+
+    def history(self, name, store=None, metric='最终收益值', columns=HISTORY_COLUMNS):
+        """顾问各月份的表现：月份、顾问名称、门店名称、columns中的列、metric的名次及环比变化"""
+        records = []
+        for adviser_id in self.find(name, store):
+            for month_key, row in self.rows(adviser_id).items():
+                month = self._months[month_key]
+                df = month['data']
+                record = {'月份': month_key, '顾问名称': self._names[adviser_id], '门店名称': self._stores[adviser_id]}
+                for column in columns:
+                    if column in df.columns:
+                        record[column] = df[column].iat[row]
+                if metric in month['ranking'].metrics:
+                    record[f'{metric}排名'] = month['ranking'].rank_of(metric, row)
+                records.append(record)
+        table = pd.DataFrame(records)
+        if not table.empty and metric in table.columns:
+            table[f'{metric}环比变化'] = table.groupby(['顾问名称', '门店名称'], sort=False)[metric].diff()
+        return table
+
+    def month_over_month(self, metric, month_key, previous_month):
+        """两个月份都出现的顾问的metric对比：上月值、当月值、变化量、变化百分比"""
+        current, previous = self._months[month_key], self._months[previous_month]
+        current_rows, previous_rows = self._rows_of(month_key), self._rows_of(previous_month)
+        ids = np.flatnonzero((current_rows >= 0) & (previous_rows >= 0))
+        current_values = current['data'][metric].to_numpy(dtype=np.float64)[current_rows[ids]]
+        previous_values = previous['data'][metric].to_numpy(dtype=np.float64)[previous_rows[ids]]
+        change = current_values - previous_values
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_pct = np.where(previous_values != 0, change / np.abs(previous_values) * 100, np.nan)
+        return pd.DataFrame({
+            '顾问名称': np.asarray(self._names, dtype=object)[ids],
+            '门店名称': np.asarray(self._stores, dtype=object)[ids],
+            f'上月{metric}': previous_values,
+            f'当月{metric}': current_values,
+            '变化量': change,
+            '变化百分比': np.round(change_pct, 1)
+        })
+
+    def movers(self, metric='最终收益值', k=100, source='top', target='bottom'):
+        """全部相邻月份中，从上月前k名(source='top')或后k名进入当月前k名或后k名(target)的顾问"""
+        def group(month, side):
+            ranking = month['ranking']
+            return ranking.top(metric, k) if side == 'top' else ranking.bottom(metric, k)
+
+        months = self.months
+        records = []
+        for previous_month, month_key in zip(months, months[1:]):
+            previous, current = self._months[previous_month], self._months[month_key]
+            if metric not in previous['ranking'].metrics or metric not in current['ranking'].metrics:
+                continue
+            source_rows = group(previous, source)
+            target_rows = group(current, target)
+            # 当月取进入目标组的那一行（重复的顾问键可能有不在组内的其他行）
+            current_rows = {}
+            for row, adviser_id in zip(target_rows, current['ids'][target_rows]):
+                current_rows.setdefault(adviser_id, row)
+            moved = np.isin(previous['ids'][source_rows], list(current_rows))
+            previous_values = previous['data'][metric].to_numpy()
+            current_values = current['data'][metric].to_numpy()
+            for previous_row in source_rows[moved]:
+                adviser_id = previous['ids'][previous_row]
+                current_row = current_rows[adviser_id]
+                records.append({
+                    '起始月份': previous_month,
+                    '目标月份': month_key,
+                    '顾问名称': self._names[adviser_id],
+                    '门店名称': self._stores[adviser_id],
+                    '起始排名': previous['ranking'].rank_of(metric, previous_row),
+                    '目标排名': current['ranking'].rank_of(metric, current_row),
+                    f'起始{metric}': previous_values[previous_row],
+                    f'目标{metric}': current_values[current_row]
+                })
+        return pd.DataFrame(records, columns=['起始月份', '目标月份', '顾问名称', '门店名称', '起始排名', '目标排名',
+                                              f'起始{metric}', f'目标{metric}'])
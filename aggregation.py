@@ -0,0 +1,268 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# 参与聚合的指标列
+METRIC_COLUMNS = ['最终收益值', '销售利润', '新客贡献', '会员价值贡献', '试饮获客贡献', 'A+B内码贡献', '总收益']
+
+# 聚合立方体的维度（从粗到细）
+CUBE_DIMENSIONS = ['大区', '顾问编制', '区域']
+
+# 可加的基础统计量；均值、标准差由其推导
+ADDITIVE_STATS = ['count', 'sum', 'sumsq']
+
+# KLL分位数摘要的精度参数k：最高层保留约k个样本点，k越大越精确。
+# 秩误差与1/k成正比：单个摘要约0.6/k，跨单元、跨月份反复合并后不超过约1.2/k（k=200时约0.6%）
+DEFAULT_SKETCH_K = 200
+
+# 设置分位数摘要精度参数k的环境变量，应用内所有加载路径共用
+SKETCH_K_ENV = "DASHBOARD_SKETCH_K"
+
+# 各层容量按层深度递减的比例，以及每层的最小容量
+_CAPACITY_DECAY = 2 / 3
+_MIN_LEVEL_CAPACITY = 8
+
+
+def configured_sketch_k():
+    """应用使用的分位数摘要精度参数：环境变量DASHBOARD_SKETCH_K，未设置或无效时为DEFAULT_SKETCH_K"""
+    try:
+        return max(int(os.environ.get(SKETCH_K_ENV, DEFAULT_SKETCH_K)), _MIN_LEVEL_CAPACITY)
+    except ValueError:
+        return DEFAULT_SKETCH_K
+
+
+class QuantileSketch:
+    def __init__(self, levels=None, k=DEFAULT_SKETCH_K):
+        """可合并的KLL分位数摘要：第h层保存权重为2^h的有序样本点，样本较少时只有第0层，即为精确值
+
+        各层超出容量时把整层两两压缩、一半样本升到上一层；压缩时交替取奇偶位置（不使用随机数），
+        同样的数据总是得到同样的摘要。多个摘要（不同单元、不同月份）按层拼接后合并，用于任意切片或月份并集。
+        """
+        self.levels = levels if levels is not None else [np.empty(0)]
+        self.k = k
+        self._compactions = 0
+
+    @classmethod
+    def from_sorted(cls, sorted_values, k=DEFAULT_SKETCH_K):
+        """由已排序(不含NaN)的数值构建摘要"""
+        return cls([np.asarray(sorted_values, dtype=np.float64)], k)._compress()
+
+    @property
+    def count(self):
+        """摘要代表的样本数"""
+        return sum(len(level) << height for height, level in enumerate(self.levels))
+
+    @property
+    def exact(self):
+        """摘要是否仍保留全部原始样本"""
+        return all(len(level) == 0 for level in self.levels[1:])
+
+    def _capacity(self, height):
+        """第height层的容量：最高层为k，越往下按比例递减"""
+        depth = len(self.levels) - 1 - height
+        return max(int(np.ceil(self.k * _CAPACITY_DECAY ** depth)), _MIN_LEVEL_CAPACITY)
+
+    def _compress(self):
+        """总样本点数超出各层容量之和时，从最低的超容量层开始逐层压缩"""
+        while sum(len(level) for level in self.levels) > sum(
+                self._capacity(height) for height in range(len(self.levels))):
+            height = next(height for height, level in enumerate(self.levels) if len(level) > self._capacity(height))
+            level = self.levels[height]
+            # 奇数个时最大值留在本层，其余两两取一个升到上一层
+            size = len(level) - len(level) % 2
+            promoted = level[self._compactions % 2:size:2]
+            self._compactions += 1
+            self.levels[height] = level[size:]
+            if height + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[height + 1] = np.sort(np.concatenate([self.levels[height + 1], promoted]), kind='mergesort')
+        return self
+
+    def merge(self, other):
+        """合并两个摘要"""
+        return QuantileSketch.merge_all([self, other])
+
+    @staticmethod
+    def merge_all(sketches):
+        """一次合并多个摘要：各层分别拼接后统一压缩"""
+        sketches = list(sketches)
+        if not sketches:
+            return QuantileSketch()
+        depth = max(len(sketch.levels) for sketch in sketches)
+        levels = [np.sort(np.concatenate([sketch.levels[height] for sketch in sketches
+                                          if height < len(sketch.levels)]), kind='mergesort')
+                  for height in range(depth)]
+        merged = QuantileSketch(levels, max(sketch.k for sketch in sketches))
+        # 延续各摘要的压缩计数，逐个合并时奇偶位置继续交替，不会每次都从同一位置开始而累积偏差
+        merged._compactions = sum(sketch._compactions for sketch in sketches)
+        return merged._compress()
+
+    def quantile(self, q):
+        """估计分位数，精确摘要与pandas的线性插值结果一致"""
+        if self.count == 0:
+            return np.nan
+        if self.exact:
+            return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << height) for height, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='mergesort')
+        values, weights = values[order], weights[order]
+        centers = np.cumsum(weights) - weights / 2
+        return float(np.interp(q * self.count, centers, values))
+
+    def rank(self, value, inclusive=False):
+        """小于value（inclusive为True时不大于）的样本数估计；value可以是数组"""
+        side = 'right' if inclusive else 'left'
+        return sum(np.searchsorted(level, value, side=side) << height for height, level in enumerate(self.levels))
+
+    def count_at_least(self, value):
+        """不小于value的样本数估计"""
+        return self.count - self.rank(value)
+
+
+class MonthCube:
+    def __init__(self, cells, sketches, dimensions, metrics):
+        """单月聚合立方体：按维度组合保存各指标的计数、和、平方和、最值及分位数摘要"""
+        self.cells = cells
+        self.sketches = sketches
+        self.dimensions = dimensions
+        self.metrics = metrics
+        self._merged_sketches = {}
+
+    @classmethod
+    def build(cls, df, dimensions=CUBE_DIMENSIONS, metrics=METRIC_COLUMNS, sketch_k=DEFAULT_SKETCH_K):
+        """扫描一次月度数据构建立方体；sketch_k为各单元分位数摘要的精度参数"""
+        dimensions = [name for name in dimensions if name in df.columns]
+        metrics = [name for name in metrics if name in df.columns]
+        if not dimensions:
+            # 没有维度时整月作为一个单元
+            keys = pd.Series(np.zeros(len(df), dtype=np.int64), name='_all', index=df.index)
+            group_keys = [keys]
+        else:
+            group_keys = [df[name] for name in dimensions]
+
+        grouped = df[metrics].groupby(group_keys, observed=True, dropna=False, sort=False)
+        squares = (df[metrics].astype(np.float64) ** 2).groupby(group_keys, observed=True, dropna=False, sort=False)
+        parts = {
+            'count': grouped.count(),
+            'sum': grouped.sum(),
+            'sumsq': squares.sum(),
+            'min': grouped.min(),
+            'max': grouped.max()
+        }
+        cells = pd.concat(parts, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+        # 每个单元、每个指标的分位数摘要：一次排序后按单元切分
+        codes = grouped.ngroup().to_numpy()
+        sketches = {}
+        for metric in metrics:
+            values = df[metric].to_numpy(dtype=np.float64)
+            valid = ~np.isnan(values)
+            order = np.lexsort((values[valid], codes[valid]))
+            sorted_values = values[valid][order]
+            sorted_codes = codes[valid][order]
+            bounds = np.searchsorted(sorted_codes, np.arange(grouped.ngroups + 1))
+            sketches[metric] = [QuantileSketch.from_sorted(sorted_values[bounds[i]:bounds[i + 1]], sketch_k)
+                                for i in range(grouped.ngroups)]
+
+        # ngroup编号与聚合结果行顺序一致（sort=False时均按首次出现顺序）
+        return cls(cells, sketches, dimensions, metrics)
+
+    def _group_positions(self, by):
+        """按维度分组时每组包含的单元位置"""
+        if not by:
+            return {(): np.arange(len(self.cells))}
+        index = self.cells.index.to_frame(index=False)[list(by)]
+        return index.groupby(list(by), observed=True, sort=False).indices
+
+    def rollup(self, by=(), metrics=None, stats=('count', 'sum', 'mean', 'min', 'max', 'std')):
+        """上卷到指定维度，返回列为(指标, 统计量)的DataFrame；by为空时返回单行总计"""
+        by = list(by)
+        metrics = list(metrics or self.metrics)
+        if by:
+            grouped = self.cells.groupby(level=by, observed=True)
+            additive = grouped.sum()
+            minimum = grouped.min()
+            maximum = grouped.max()
+        else:
+            additive = self.cells.sum().to_frame().T
+            minimum = self.cells.min().to_frame().T
+            maximum = self.cells.max().to_frame().T
+
+        columns = {}
+        for metric in metrics:
+            count = additive[(metric, 'count')]
+            total = additive[(metric, 'sum')]
+            for stat in stats:
+                if stat in ADDITIVE_STATS:
+                    value = additive[(metric, stat)]
+                elif stat == 'mean':
+                    value = total / count.where(count > 0)
+                elif stat == 'std':
+                    # 求和在float64上平方，避免整数指标的int64求和平方后溢出
+                    total_float = total.astype(np.float64)
+                    sumsq = additive[(metric, 'sumsq')].astype(np.float64)
+                    variance = (sumsq - total_float ** 2 / count.where(count > 0)) / (count - 1).where(count > 1)
+                    value = np.sqrt(variance.clip(lower=0))
+                elif stat == 'min':
+                    value = minimum[(metric, 'min')]
+                elif stat == 'max':
+                    value = maximum[(metric, 'max')]
+                elif stat == 'median':
+                    value = self.quantile(metric, 0.5, by).reindex(additive.index) if by else pd.Series(
+                        [self.quantile(metric, 0.5)], index=additive.index)
+                else:
+                    raise ValueError(f"不支持的统计量: {stat}")
+                columns[(metric, stat)] = value
+        result = pd.DataFrame(columns, index=additive.index)
+        if columns:
+            result.columns = pd.MultiIndex.from_tuples(result.columns)
+        if by:
+            # 索引使用原始取值并按取值排序，与直接对文本列groupby的结果一致
+            keys = result.index.to_frame(index=False).astype(object)
+            result.index = pd.MultiIndex.from_frame(keys) if len(by) > 1 else pd.Index(keys[by[0]], name=by[0])
+            result = result.sort_index()
+        return result
+
+    def summary(self, metric, by=(), stats=('count', 'sum', 'mean', 'min', 'max', 'std')):
+        """单个指标的上卷结果，列为统计量名称"""
+        return self.rollup(by, [metric], stats)[metric]
+
+    def total(self, metric, stat='mean'):
+        """整月某指标的统计值"""
+        if metric not in self.metrics:
+            return 0
+        return self.summary(metric, stats=(stat,))[stat].iloc[0]
+
+    def sketch(self, metric, where=None):
+        """满足where（{维度: 取值或取值列表}）的单元合并得到的分位数摘要，where为空时为整月；合并结果按切片缓存"""
+        where = {name: tuple(value) if isinstance(value, (list, tuple, set)) else (value,)
+                 for name, value in (where or {}).items()}
+        key = (metric, tuple(sorted(where.items())))
+        sketch = self._merged_sketches.get(key)
+        if sketch is None:
+            positions = np.arange(len(self.cells))
+            if where:
+                index = self.cells.index.to_frame(index=False)
+                mask = np.ones(len(index), dtype=bool)
+                for name, values in where.items():
+                    mask &= index[name].isin(values).to_numpy()
+                positions = np.flatnonzero(mask)
+            sketches = self.sketches[metric]
+            sketch = QuantileSketch.merge_all(sketches[position] for position in positions)
+            self._merged_sketches[key] = sketch
+        return sketch
+
+    def quantile(self, metric, q, by=()):
+        """由分位数摘要估计分位数；by为空时返回整月结果，否则返回按组的Series"""
+        if not by:
+            return self.sketch(metric).quantile(q)
+        sketches = self.sketches[metric]
+        results = {}
+        for key, positions in self._group_positions(by).items():
+            results[key] = QuantileSketch.merge_all(sketches[position] for position in positions).quantile(q)
+        index = pd.MultiIndex.from_tuples(results.keys(), names=by) if len(by) > 1 else pd.Index(
+            list(results.keys()), name=by[0])
+        return pd.Series(list(results.values()), index=index)
+
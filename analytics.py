@@ -0,0 +1,439 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import pandas as pd
+
+from binning import segment_counts, segment_labels
+
+# 人效价值分段（默认边界与标签，可在调用时替换边界）
+PROFIT_BINS = [-float('inf'), 0, 10000, 50000, 100000, 200000, float('inf')]
+PROFIT_LABELS = ['亏损(<0)', '低人效价值(0-1万)', '中低人效价值(1-5万)',
+                 '中人效价值(5-10万)', '中高人效价值(10-20万)', '高人效价值(>20万)']
+
+# 销售利润坎级（默认边界与标签）
+SALES_BINS = [0, 20000, 50000, 100000, float('inf')]
+SALES_LABELS = ['2万以下', '2-5万', '5-10万', '10万以上']
+
+# 区域优劣势分析的指标：(显示名称, 数据列)
+REGION_COMPARISON_METRICS = [('销售利润', '销售利润'), ('新客贡献', '新客贡献'), ('会员价值', '会员价值贡献'),
+                             ('试饮获客', '试饮获客贡献'), ('A+B内码贡献', 'A+B内码贡献')]
+
+# 前N名与后N名对比的指标
+TOP_BOTTOM_METRICS = ['销售利润', '新客贡献', '会员价值贡献', '试饮获客贡献', 'A+B内码贡献', '总收益']
+
+# 高绩效顾问的分位数阈值（收益前20%）
+HIGH_PERFORMER_QUANTILE = 0.8
+
+# 环比对比支持的维度（门店名称不在立方体中，由月度数据分组聚合）
+COMPARISON_DIMENSIONS = ['大区', '区域', '顾问编制', '门店名称']
+
+# 环比对比的统计口径
+COMPARISON_STATS = {'sum': '总量', 'mean': '人均', 'count': '人数'}
+
+
+@dataclass
+class OverviewStats:
+    """概览关键指标"""
+    total_advisers: int
+    avg_profit: float
+    total_profit: float
+    high_performer_pct: Optional[float]
+
+
+@dataclass
+class ProfitDistribution:
+    """人效价值分段人数及极值"""
+    distribution: pd.Series
+    maximum: float
+    median: float
+    minimum: float
+
+
+@dataclass
+class AdviserTypeStats:
+    """各类型顾问统计：顾问编制、人数、平均/中位人效价值、标准差"""
+    table: pd.DataFrame
+
+
+@dataclass
+class RegionPerformance:
+    """各大区平均人效价值（升序）及最佳、最差大区"""
+    table: pd.DataFrame
+    best: Optional[pd.Series] = None
+    worst: Optional[pd.Series] = None
+
+
+@dataclass
+class SalesProfitDistribution:
+    """各类型顾问在销售利润坎级上的人数、占比及汇总表"""
+    counts: pd.DataFrame
+    percentages: pd.DataFrame
+    summary: pd.DataFrame
+
+
+@dataclass
+class MonthOverMonth:
+    """两个月份在某一维度上各指标的环比对比：各表以维度取值为索引、指标为列"""
+    by: str
+    stat: str
+    current: pd.DataFrame
+    previous: pd.DataFrame
+    change: pd.DataFrame
+    change_pct: pd.DataFrame
+    total_current: pd.Series
+    total_previous: pd.Series
+
+    @property
+    def metrics(self):
+        return list(self.current.columns)
+
+    def table(self, metric, current_label=None, previous_label=None):
+        """单个指标的对比表：维度、当月、上月、变化量、变化百分比"""
+        return pd.DataFrame({
+            self.by: self.current.index.to_numpy(),
+            current_label or f'当月{metric}': self.current[metric].to_numpy(),
+            previous_label or f'上月{metric}': self.previous[metric].to_numpy(),
+            '变化量': self.change[metric].to_numpy(),
+            '变化百分比': self.change_pct[metric].to_numpy()
+        })
+
+    def totals(self):
+        """各指标的整体对比：指标、当月、上月、变化量、变化百分比"""
+        change = self.total_current - self.total_previous
+        return pd.DataFrame({
+            '指标': self.metrics,
+            '当月': self.total_current.to_numpy(),
+            '上月': self.total_previous.to_numpy(),
+            '变化量': change.to_numpy(),
+            '变化百分比': (change / self.total_previous * 100).round(1).fillna(0).to_numpy()
+        })
+
+
+@dataclass
+class MemberValueComparison:
+    """当月与上月各大区会员价值贡献对比"""
+    table: pd.DataFrame
+    total_current: float
+    total_previous: float
+    total_change: float
+    total_change_pct: float
+    top_growth: Optional[dict] = None
+    bottom_decline: Optional[dict] = None
+
+
+@dataclass
+class MemberValueAnalysis:
+    """各大区会员价值贡献总量、统计排名及环比对比"""
+    region_totals: pd.DataFrame
+    region_stats: pd.DataFrame
+    comparison: Optional[MemberValueComparison] = None
+
+
+@dataclass
+class RegionComparison:
+    """单个大区各指标与全区域平均的对比"""
+    region: str
+    metrics: pd.DataFrame
+    top_metrics: pd.DataFrame
+    advantages: List[str] = field(default_factory=list)
+    disadvantages: List[str] = field(default_factory=list)
+    worst_metric: Optional[dict] = None
+
+    @property
+    def region_column(self):
+        return f'{self.region}区域平均值'
+
+
+@dataclass
+class RegionGapMatrix:
+    """所有大区各指标均值与全区域均值的差异矩阵（大区 × 指标），及按平均差异百分比的大区排名"""
+    region_means: pd.DataFrame
+    overall_means: pd.Series
+    gaps: pd.DataFrame
+    gap_pct: pd.DataFrame
+    ranking: pd.DataFrame
+
+    @property
+    def regions(self):
+        return list(self.region_means.index)
+
+    def comparison(self, region):
+        """单个大区的对比结果（从矩阵中取一行，不重新计算）；大区不存在时返回None"""
+        if region not in self.region_means.index:
+            return None
+        region_column = f'{region}区域平均值'
+        metrics = pd.DataFrame({
+            '指标': self.region_means.columns.to_numpy(),
+            region_column: self.region_means.loc[region].to_numpy(),
+            '全区域平均值': self.overall_means.to_numpy(),
+            '差异': self.gaps.loc[region].to_numpy(),
+            '差异百分比': self.gap_pct.loc[region].to_numpy()
+        })
+        weaker = metrics[metrics['差异百分比'] < 0]
+        return RegionComparison(
+            region=region,
+            metrics=metrics,
+            top_metrics=metrics.nlargest(3, '差异百分比'),
+            advantages=metrics[metrics['差异百分比'] > 0]['指标'].tolist(),
+            disadvantages=weaker['指标'].tolist(),
+            worst_metric=weaker.nsmallest(1, '差异百分比').iloc[0].to_dict() if not weaker.empty else None
+        )
+
+
+@dataclass
+class TopBottomComparison:
+    """前N名与后N名顾问的各项指标对比"""
+    size: int
+    table: pd.DataFrame
+    top_mean: float
+    bottom_mean: float
+    advantage: float
+    max_advantage: dict
+    min_advantage: dict
+    top_types: Optional[pd.Series] = None
+    bottom_types: Optional[pd.Series] = None
+
+
+def _segment_labels(edges, default_edges, default_labels):
+    """分段标签：默认边界使用预设标签，自定义边界按边界生成"""
+    return default_labels if list(edges) == list(default_edges) else segment_labels(edges)
+
+
+def overview_stats(df, cube):
+    """概览关键指标：人数、平均及总人效价值、高绩效顾问比例（由立方体的分位数摘要估计）"""
+    high_performer_pct = None
+    if '最终收益值' in cube.metrics and len(df) > 0:
+        sketch = cube.sketch('最终收益值')
+        threshold = sketch.quantile(HIGH_PERFORMER_QUANTILE)
+        high_performer_pct = sketch.count_at_least(threshold) / len(df) * 100
+    return OverviewStats(
+        total_advisers=len(df),
+        avg_profit=cube.total('最终收益值', 'mean'),
+        total_profit=cube.total('最终收益值', 'sum'),
+        high_performer_pct=high_performer_pct
+    )
+
+
+def profit_distribution(df, cube, edges=PROFIT_BINS):
+    """人效价值分段分布（edges为分段边界，默认PROFIT_BINS）；极值读取立方体，中位数由分位数摘要估计"""
+    return ProfitDistribution(
+        distribution=segment_counts(df, '最终收益值', edges, _segment_labels(edges, PROFIT_BINS, PROFIT_LABELS)),
+        maximum=cube.total('最终收益值', 'max'),
+        median=cube.quantile('最终收益值', 0.5),
+        minimum=cube.total('最终收益值', 'min')
+    )
+
+
+def adviser_type_stats(cube):
+    """按顾问编制统计最终收益值"""
+    table = cube.summary('最终收益值', by=['顾问编制'], stats=('count', 'mean', 'median', 'std')).round(0)
+    table.columns = ['人数', '平均人效价值', '中位人效价值', '标准差']
+    return AdviserTypeStats(table=table.reset_index())
+
+
+def region_performance(cube):
+    """按大区统计平均人效价值与人数，并找出最佳、最差大区"""
+    table = cube.summary('最终收益值', by=['大区'], stats=('mean', 'count')).round(0)
+    table.columns = ['平均人效价值', '顾问人数']
+    table = table.reset_index().sort_values('平均人效价值', ascending=True)
+    result = RegionPerformance(table=table)
+    if len(table) > 1:
+        result.best = table.loc[table['平均人效价值'].idxmax()]
+        result.worst = table.loc[table['平均人效价值'].idxmin()]
+    return result
+
+
+def sales_profit_distribution(df, edges=SALES_BINS, by='顾问编制'):
+    """各类型顾问（或by的各取值）在销售利润坎级上的人数及占比，edges为坎级边界，默认SALES_BINS"""
+    counts = segment_counts(df, '销售利润', edges, _segment_labels(edges, SALES_BINS, SALES_LABELS), by=by,
+                            name='销售利润坎级')
+    percentages = counts.div(counts.sum(axis=1), axis=0) * 100
+
+    summary = counts.add_suffix('人数')
+    summary['总人数'] = counts.sum(axis=1)
+    summary = summary.reset_index()
+    summary.columns.name = ''
+    return SalesProfitDistribution(counts=counts, percentages=percentages, summary=summary)
+
+
+def member_value_analysis(cube, previous_cube=None):
+    """各大区会员价值贡献总量与统计；给出上月立方体时计算环比对比"""
+    totals = cube.summary('会员价值贡献', by=['大区'], stats=('sum',))
+    region_totals = totals.rename(columns={'sum': '会员价值贡献'}).reset_index()
+    region_totals = region_totals.sort_values('会员价值贡献', ascending=True)
+
+    region_stats = cube.summary('会员价值贡献', by=['大区'], stats=('sum', 'mean', 'count')).round(0)
+    region_stats.columns = ['贡献总量', '人均贡献', '顾问人数']
+    region_stats = region_stats.reset_index().sort_values('贡献总量', ascending=False)
+    region_stats['排名'] = range(1, len(region_stats) + 1)
+    region_stats = region_stats[['排名', '大区', '贡献总量', '人均贡献', '顾问人数']]
+
+    comparison = None
+    if previous_cube is not None:
+        change = month_over_month(cube, previous_cube, '大区', ['会员价值贡献'])
+        table = change.table('会员价值贡献', '当月贡献', '上月贡献')
+
+        total_current = change.total_current['会员价值贡献']
+        total_previous = change.total_previous['会员价值贡献']
+        total_change = total_current - total_previous
+        comparison = MemberValueComparison(
+            table=table,
+            total_current=total_current,
+            total_previous=total_previous,
+            total_change=total_change,
+            total_change_pct=(total_change / total_previous * 100) if total_previous != 0 else 0
+        )
+        if not table.empty:
+            comparison.top_growth = table.nlargest(1, '变化百分比').iloc[0].to_dict()
+            bottom = table.nsmallest(1, '变化百分比').iloc[0]
+            if bottom['变化百分比'] < 0:
+                comparison.bottom_decline = bottom.to_dict()
+    return MemberValueAnalysis(region_totals=region_totals, region_stats=region_stats, comparison=comparison)
+
+
+def level_totals(cube, by, metrics=None, df=None):
+    """某一维度上各指标的计数与求和，列为(指标, count/sum)、索引为按取值排序的维度取值
+
+    维度在立方体中时由立方体上卷；否则（如门店名称）对月度数据df做一次分组聚合，所有指标一起计算。
+    """
+    metrics = [name for name in (metrics or cube.metrics) if name in cube.metrics]
+    if by in cube.dimensions:
+        return cube.rollup([by], metrics, stats=('count', 'sum'))
+    if df is None or by not in df.columns:
+        raise KeyError(f"没有维度列: {by}")
+    grouped = df.groupby(by, observed=True)[metrics]
+    totals = pd.concat({'count': grouped.count(), 'sum': grouped.sum()}, axis=1).swaplevel(0, 1, axis=1)
+    totals.index = pd.Index(totals.index.astype(object), name=by)
+    return totals.sort_index()
+
+
+def _stat_values(totals, metrics, stat):
+    """由计数与求和得到各指标的统计值（维度取值 × 指标）"""
+    counts = totals.xs('count', axis=1, level=1)[metrics]
+    sums = totals.xs('sum', axis=1, level=1)[metrics]
+    if stat == 'sum':
+        return sums
+    if stat == 'count':
+        return counts
+    if stat == 'mean':
+        return sums / counts.where(counts > 0)
+    raise ValueError(f"不支持的统计量: {stat}")
+
+
+def month_over_month(cube, previous_cube, by, metrics=None, stat='sum', df=None, previous_df=None):
+    """当月与上月在维度by上所有指标的环比对比，整表向量化计算，不逐行或逐指标循环
+
+    两个月份的维度取值取并集，只在一个月份出现的取值另一月份按0计；变化百分比保留一位小数，
+    上月为0时记为0（变化量非0时为inf）。df、previous_df仅在维度不在立方体中时使用。
+    """
+    metrics = [name for name in (metrics or cube.metrics) if name in cube.metrics and name in previous_cube.metrics]
+    current_totals = level_totals(cube, by, metrics, df)
+    previous_totals = level_totals(previous_cube, by, metrics, previous_df)
+    index = current_totals.index.union(previous_totals.index)
+    current = _stat_values(current_totals.reindex(index), metrics, stat).fillna(0)
+    previous = _stat_values(previous_totals.reindex(index), metrics, stat).fillna(0)
+    change = current - previous
+    change_pct = (change / previous * 100).round(1).fillna(0)
+
+    # 整体值由各组的计数与求和合计得到
+    overall = [_stat_values(totals.sum().to_frame().T, metrics, stat).iloc[0]
+               for totals in (current_totals, previous_totals)]
+    return MonthOverMonth(by=by, stat=stat, current=current, previous=previous, change=change,
+                          change_pct=change_pct, total_current=overall[0], total_previous=overall[1])
+
+
+def region_gap_matrix(cube):
+    """所有大区、REGION_COMPARISON_METRICS中所有指标与全区域均值的差异，一次上卷得到整个矩阵
+
+    缺少的指标均值与差异记为0；大区排名按各指标差异百分比的平均值从高到低。
+    """
+    labels = [label for label, _ in REGION_COMPARISON_METRICS]
+    columns = [column for _, column in REGION_COMPARISON_METRICS]
+    present = [column for column in columns if column in cube.metrics]
+    region_means = cube.rollup(by=['大区'], metrics=present, stats=('mean',))
+    overall_means = cube.rollup(metrics=present, stats=('mean',)).iloc[0]
+
+    region_means = region_means.droplevel(1, axis=1).reindex(columns=columns, fill_value=0)
+    region_means.columns = labels
+    overall_means = overall_means.droplevel(1).reindex(columns, fill_value=0)
+    overall_means.index = labels
+
+    gaps = (region_means - overall_means).fillna(0)
+    gap_pct = (gaps / overall_means * 100).round(1).fillna(0)
+    region_means = region_means.fillna(0)
+    overall_means = overall_means.fillna(0)
+
+    ranking = pd.DataFrame({
+        '大区': gap_pct.index.to_numpy(),
+        '平均差异百分比': gap_pct.mean(axis=1).round(1).to_numpy(),
+        '优势指标数': (gap_pct > 0).sum(axis=1).to_numpy(),
+        '薄弱指标数': (gap_pct < 0).sum(axis=1).to_numpy()
+    }).sort_values('平均差异百分比', ascending=False, kind='stable').reset_index(drop=True)
+    ranking.insert(0, '排名', range(1, len(ranking) + 1))
+    return RegionGapMatrix(region_means=region_means, overall_means=overall_means, gaps=gaps, gap_pct=gap_pct,
+                           ranking=ranking)
+
+
+def region_comparison(cube, region):
+    """单个大区各指标均值与全区域均值的差异；大区不存在时返回None"""
+    return region_gap_matrix(cube).comparison(region)
+
+
+def top_bottom_comparison(df, ranking, cube, size=100):
+    """按最终收益值取前size名与后size名，对比各项指标均值及顾问类型分布"""
+    top = df.iloc[ranking.top('最终收益值', size)]
+    bottom = df.iloc[ranking.bottom('最终收益值', size)]
+
+    table = pd.DataFrame({
+        '指标': TOP_BOTTOM_METRICS,
+        f'前{size}名平均值': [top[name].mean() if name in top.columns else 0 for name in TOP_BOTTOM_METRICS],
+        f'后{size}名平均值': [bottom[name].mean() if name in bottom.columns else 0 for name in TOP_BOTTOM_METRICS],
+        # 全量平均值读取预聚合立方体
+        '全量平均值': [cube.total(name) for name in TOP_BOTTOM_METRICS]
+    })
+    table[f'前{size}名优势百分比'] = (
+            (table[f'前{size}名平均值'] - table[f'后{size}名平均值']) / table[f'后{size}名平均值'] * 100).round(1)
+    table[f'前{size}名vs全量优势百分比'] = (
+            (table[f'前{size}名平均值'] - table['全量平均值']) / table['全量平均值'] * 100).round(1)
+    table = table.fillna(0)
+
+    top_mean = top['最终收益值'].mean()
+    bottom_mean = bottom['最终收益值'].mean()
+    advantage_column = f'前{size}名优势百分比'
+    result = TopBottomComparison(
+        size=size,
+        table=table,
+        top_mean=top_mean,
+        bottom_mean=bottom_mean,
+        advantage=(top_mean - bottom_mean) / bottom_mean * 100,
+        max_advantage=table.loc[table[advantage_column].idxmax()].to_dict(),
+        min_advantage=table.loc[table[advantage_column].idxmin()].to_dict()
+    )
+    if '顾问编制' in df.columns:
+        # 共享字典中本组未出现的类型计数为0，不参与分布
+        top_types = top['顾问编制'].value_counts()
+        bottom_types = bottom['顾问编制'].value_counts()
+        result.top_types = top_types[top_types > 0]
+        result.bottom_types = bottom_types[bottom_types > 0]
+    return result
+
+
+def trend_table(overall, by_type, dates):
+    """多月份趋势表：月份、日期、总体平均人效价值及各类型平均值，按日期排序
+
+    overall、by_type为跨月份汇总结果（按月份、按(月份, 类型)索引，含mean列），dates为{月份: 日期}。
+    """
+    months = [month for month in overall.index if month in dates]
+    if not months:
+        return pd.DataFrame()
+    table = pd.DataFrame({
+        '月份': months,
+        '日期': [dates[month] for month in months],
+        '总体平均人效价值': overall['mean'].reindex(months).to_numpy()
+    })
+    if not by_type.empty:
+        type_means = by_type['mean'].unstack()
+        type_means = type_means.loc[:, type_means.notna().any()].reindex(months)
+        for adviser_type in type_means.columns:
+            table[adviser_type] = type_means[adviser_type].to_numpy()
+    return table.sort_values('日期').reset_index(drop=True)
@@ -0,0 +1,277 @@
+"""营养顾问绩效批量报告
+
+不启动Streamlit，复用仪表板各create_*方法的分析与图表，把 月份 × 大区 × 视图 输出为静态HTML（可选PNG）
+图表及CSV/HTML表格，任务分配到进程池并行执行。
+
+    python batch_report.py --output reports
+    python batch_report.py --output reports --months 202507 202508 --png
+"""
+import argparse
+import html
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aggregation import configured_sketch_k
+from data_cache import ColumnarCache
+from ingestion import DEFAULT_MAX_WORKERS, read_excel_projected
+from month_store import MonthStore
+from report_watcher import refresh_month_store, scan_reports
+
+# 默认报表目录（与app同级）
+DEFAULT_SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 每个月份输出一次的视图
+MONTH_VIEWS = ['overview', 'member_value', 'sales_profit', 'performance', 'ranking', 'region_gaps']
+
+# 每个月份、每个大区输出一次的视图
+REGION_VIEWS = ['region_report', 'region_detail']
+
+# 视图显示名称
+VIEW_TITLES = {
+    'overview': '绩效概览',
+    'member_value': '会员价值贡献',
+    'sales_profit': '销售利润分析',
+    'performance': '前100vs后100分析',
+    'ranking': '绩效排名',
+    'region_gaps': '全部大区优劣势',
+    'region_report': '区域分析报告',
+    'region_detail': '区域详情'
+}
+
+# 排名视图输出的人数
+RANKING_SIZE = 100
+
+# 工作进程内的仪表板（由_init_worker加载一次，供该进程的所有任务复用）
+_dashboard = None
+
+
+def _safe_name(name):
+    """转为可用作文件或目录名的字符串"""
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(name))
+
+
+class ReportSink:
+    def __init__(self, directory, png=False):
+        """接收仪表板输出的图表、表格和指标，依次写入目录"""
+        self.directory = directory
+        self.png = png
+        self.files = []
+        self.metrics = []
+        self._figures = 0
+        self._tables = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def figure(self, figure):
+        self._figures += 1
+        path = os.path.join(self.directory, f"figure_{self._figures:02d}.html")
+        figure.write_html(path, include_plotlyjs='cdn', full_html=True)
+        self.files.append(path)
+        if self.png:
+            png_path = path[:-len('.html')] + '.png'
+            try:
+                figure.write_image(png_path)
+                self.files.append(png_path)
+            except (ValueError, ImportError, RuntimeError) as e:
+                # 未安装kaleido时只输出HTML
+                logging.getLogger(__name__).warning("PNG导出失败 %s: %s", png_path, e)
+                self.png = False
+
+    def table(self, data):
+        self._tables += 1
+        base = os.path.join(self.directory, f"table_{self._tables:02d}")
+        df = data.data if hasattr(data, 'data') and isinstance(data.data, pd.DataFrame) else data
+        df.to_csv(base + '.csv', encoding='utf-8-sig')
+        if hasattr(data, 'to_html'):
+            content = data.to_html()
+        else:
+            content = df.to_html()
+        with open(base + '.html', 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.files.extend([base + '.csv', base + '.html'])
+
+    def metric(self, label, value, delta=None):
+        self.metrics.append({'指标': label, '数值': value, '变化': delta})
+
+    def finish(self):
+        """写出指标汇总，返回输出的文件列表"""
+        if self.metrics:
+            path = os.path.join(self.directory, 'metrics.csv')
+            pd.DataFrame(self.metrics).to_csv(path, index=False, encoding='utf-8-sig')
+            self.files.append(path)
+        return self.files
+
+
+def load_dashboard(source_dir, months=None, max_workers=1):
+    """加载报表目录中的月份（经列式缓存）到一个无界面的仪表板"""
+    import streamlit_app
+
+    store = MonthStore()
+    reports, _ = scan_reports(source_dir)
+    if months:
+        reports = {month_key: report for month_key, report in reports.items()
+                   if f"{report[1]:%Y%m}" in months or month_key in months}
+    refresh_month_store(store, reports, ColumnarCache(reader=read_excel_projected), max_workers,
+                        sketch_k=configured_sketch_k())
+    dashboard = streamlit_app.NutritionAdviserDashboard(month_store=store)
+    for month_key in sorted(store.months(), key=lambda key: reports[key][1]):
+        dashboard._set_month(month_key, store.view(month_key))
+    return dashboard
+
+
+def _init_worker(source_dir, months):
+    global _dashboard
+    # bare模式下Streamlit的提示信息与报告无关
+    logging.disable(logging.WARNING)
+    _dashboard = load_dashboard(source_dir, months)
+
+
+def render_view(dashboard, month, view, region, directory, png=False):
+    """在capture_output下调用对应的create_*方法，把输出写入directory，返回文件列表"""
+    import streamlit_app
+
+    df = dashboard.get_month_data(month)
+    sink = ReportSink(directory, png)
+    with streamlit_app.capture_output(sink):
+        if view == 'overview':
+            dashboard.create_overview_dashboard(month)
+        elif view == 'member_value':
+            dashboard.create_member_value_analysis(month)
+        elif view == 'sales_profit':
+            dashboard.create_sales_profit_analysis(month)
+        elif view == 'performance':
+            dashboard.create_performance_comparison(df, month)
+        elif view == 'ranking':
+            ranking = dashboard.get_ranking_index(month)
+            for metric in ranking.metrics:
+                sink.table(df.iloc[ranking.top(metric, RANKING_SIZE)])
+                sink.table(df.iloc[ranking.bottom(metric, RANKING_SIZE)])
+        elif view == 'region_gaps':
+            dashboard.create_region_gap_heatmap(df, month)
+        elif view == 'region_report':
+            previous_month = dashboard.get_previous_month(month)
+            previous_df = dashboard.get_month_data(previous_month) if previous_month else None
+            dashboard.create_region_strengths_weaknesses(df, region, previous_df, month=month)
+        elif view == 'region_detail':
+            region_data = df[df['大区'] == region]
+            sink.metric("顾问人数", len(region_data))
+            sink.metric("平均收益", f"¥{region_data['最终收益值'].mean():,.0f}")
+            sink.metric("总收益", f"¥{region_data['最终收益值'].sum():,.0f}")
+            sink.table(region_data)
+        else:
+            raise ValueError(f"未知视图: {view}")
+    return sink.finish()
+
+
+def _run_task(task, output_dir, png):
+    month, view, region = task
+    directory = os.path.join(output_dir, _safe_name(month), view, *([_safe_name(region)] if region else []))
+    return task, render_view(_dashboard, month, view, region, directory, png)
+
+
+def plan_tasks(dashboard, views=None):
+    """列出全部(月份, 视图, 大区)任务；大区视图按该月出现的每个大区展开"""
+    views = views or MONTH_VIEWS + REGION_VIEWS
+    tasks = []
+    for month in sorted(dashboard.monthly_data, key=lambda key: dashboard.monthly_data[key]['date']):
+        df = dashboard.get_month_data(month)
+        for view in views:
+            if view in REGION_VIEWS:
+                if '大区' not in df.columns:
+                    continue
+                for region in sorted(df['大区'].dropna().unique().tolist()):
+                    tasks.append((month, view, region))
+            else:
+                tasks.append((month, view, None))
+    return tasks
+
+
+def write_index(output_dir, outputs):
+    """生成汇总页面，按月份、视图、大区列出所有输出文件"""
+    lines = ['<!DOCTYPE html>', '<html><head><meta charset="utf-8"><title>营养顾问绩效报告</title></head><body>',
+             '<h1>营养顾问绩效报告</h1>']
+    current_month = None
+    for (month, view, region), files in sorted(outputs.items(), key=lambda item: (item[0][0], item[0][1],
+                                                                                  item[0][2] or '')):
+        if month != current_month:
+            lines.append(f'<h2>{html.escape(month)}</h2>')
+            current_month = month
+        title = VIEW_TITLES.get(view, view) + (f" - {region}" if region else "")
+        links = ' '.join(f'<a href="{html.escape(os.path.relpath(path, output_dir))}">'
+                         f'{html.escape(os.path.basename(path))}</a>' for path in files)
+        lines.append(f'<p><b>{html.escape(title)}</b>: {links}</p>')
+    lines.append('</body></html>')
+    path = os.path.join(output_dir, 'index.html')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    return path
+
+
+def generate_reports(output_dir, source_dir=DEFAULT_SOURCE_DIR, months=None, views=None, png=False,
+                     max_workers=DEFAULT_MAX_WORKERS, on_progress=None):
+    """批量生成报告，返回{(月份, 视图, 大区): 文件列表}"""
+    global _dashboard
+    # 主进程先加载一次，同时预热列式缓存，工作进程直接读取缓存
+    dashboard = load_dashboard(source_dir, months, max_workers)
+    tasks = plan_tasks(dashboard, views)
+    total = len(tasks)
+    outputs = {}
+
+    if max_workers <= 1 or total <= 1:
+        _dashboard = dashboard
+        for done, task in enumerate(tasks, 1):
+            outputs[task] = _run_task(task, output_dir, png)[1]
+            if on_progress:
+                on_progress(task, done, total)
+    else:
+        # 与数据读取一致使用spawn，工作进程各自加载一次数据后处理多个任务
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(source_dir, months)) as pool:
+            futures = [pool.submit(_run_task, task, output_dir, png) for task in tasks]
+            for done, future in enumerate(as_completed(futures), 1):
+                task, files = future.result()
+                outputs[task] = files
+                if on_progress:
+                    on_progress(task, done, total)
+
+    write_index(output_dir, outputs)
+    return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="营养顾问绩效批量报告")
+    parser.add_argument('--output', default='reports', help="输出目录")
+    parser.add_argument('--source', default=DEFAULT_SOURCE_DIR, help="报表Excel所在目录")
+    parser.add_argument('--months', nargs='*', help="只生成指定月份（YYYYMM），默认全部")
+    parser.add_argument('--views', nargs='*', choices=MONTH_VIEWS + REGION_VIEWS, help="只生成指定视图，默认全部")
+    parser.add_argument('--png', action='store_true', help="同时导出PNG图片（需要安装kaleido）")
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help="并行进程数")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    start = time.perf_counter()
+
+    def on_progress(task, done, total):
+        month, view, region = task
+        print(f"[{done}/{total}] {month} {VIEW_TITLES.get(view, view)}{' ' + region if region else ''}", flush=True)
+
+    outputs = generate_reports(args.output, args.source, args.months, args.views, args.png, args.workers,
+                               on_progress)
+    file_count = sum(len(files) for files in outputs.values())
+    if args.png and not any(path.endswith('.png') for files in outputs.values() for path in files):
+        print("未生成PNG图片：请安装kaleido后重试", file=sys.stderr)
+    print(f"完成: {len(outputs)} 个视图, {file_count} 个文件, 用时 {time.perf_counter() - start:.1f} 秒")
+    print(f"汇总页面: {os.path.join(args.output, 'index.html')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""营养顾问绩效评估系统性能基准
+
+生成与仓库中报表相同结构的合成月度数据，在无浏览器的情况下计时数据读取、各create_*视图计算和排名查询，
+结果可保存为JSON基线并与之对比。
+
+    python benchmark.py --sizes 10000 100000 --save benchmark_baseline.json
+    python benchmark.py --sizes 10000 100000 --compare benchmark_baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion import PROJECTED_COLUMNS, REPORT_PREFIX, normalize_month_frame, read_excel_projected
+from month_store import MonthStore
+from ranking_index import RankingIndex
+from report_watcher import build_month_entry
+
+# 默认数据规模（顾问人数）
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# 默认生成Excel并计时读取的规模（百万行的Excel生成耗时较长，需显式指定）
+DEFAULT_INGEST_SIZES = [10_000, 100_000]
+
+# 合成Excel文件目录
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "benchmarks")
+
+# 默认基线文件
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# 与基线相比慢于该比例视为性能退化
+DEFAULT_TOLERANCE = 0.25
+
+# 变慢不足该秒数时视为计时噪声，不计为退化
+DEFAULT_MIN_DELTA = 0.005
+
+# 基础顾问编制，规模较大时追加合成类型
+BASE_ADVISER_TYPES = ['医销营养顾问', '常规营养顾问', '店员型顾问']
+
+_SURNAMES = list("王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈")
+_GIVEN = list("丽芳娜敏静燕艳娟霞玲桂英华秀兰萍红梅琳雪晓慧洁婷颖倩琴云莉欣佳悦彤蕾瑶雯晶思雨涵")
+
+
+def make_month(size, month, seed=0):
+    """生成单月合成报表：大区、区域、顾问编制的取值数随规模增加"""
+    rng = np.random.default_rng(seed + month.year * 100 + month.month)
+    region_count = max(11, size // 5_000)
+    area_count = region_count * 4
+    types = BASE_ADVISER_TYPES + [f"合成顾问类型{i}" for i in range(1, size // 250_000 + 1)]
+
+    regions = np.array([f"奶粉{i:03d}营销总部" for i in range(region_count)], dtype=object)
+    areas = np.array([f"区域{i:04d}" for i in range(area_count)], dtype=object)
+    area_codes = rng.integers(0, area_count, size)
+    store_codes = rng.integers(0, max(1, int(size * 0.95)), size)
+    names = (np.array(_SURNAMES, dtype=object)[rng.integers(0, len(_SURNAMES), size)]
+             + np.array(_GIVEN, dtype=object)[rng.integers(0, len(_GIVEN), size)]
+             + np.array(_GIVEN, dtype=object)[rng.integers(0, len(_GIVEN), size)])
+
+    sales = np.round(rng.gamma(2.2, 9_600, size), 3)
+    new_customer = np.round(rng.gamma(1.7, 12_000, size), 1)
+    member_value = np.round(rng.normal(64_000, 13_600, size).clip(0), 0)
+    trial = np.round(rng.gamma(4.2, 1_270, size), 1)
+    inner_code = np.round(rng.uniform(0, 20_000, size), 0)
+    remote_penalty = rng.choice([0, 100, 200, 500, 1_500], size, p=[0.5, 0.2, 0.15, 0.1, 0.05])
+    photo_penalty = rng.choice([0, 80, 160, 240, 2_480], size, p=[0.4, 0.25, 0.2, 0.1, 0.05])
+    total = sales + new_customer + member_value + trial + inner_code
+    final = np.round(total - remote_penalty - photo_penalty, 3)
+    adviser_types = np.array(types, dtype=object)[rng.integers(0, len(types), size)]
+
+    df = pd.DataFrame({
+        '时间': pd.Timestamp(month),
+        '大区': regions[area_codes % region_count],
+        '区域': areas[area_codes],
+        '门店名称': np.char.add('门店', store_codes.astype(str)).astype(object),
+        '顾问id': rng.permutation(size) + 10_000,
+        '顾问名称': names,
+        '顾问编制': adviser_types,
+        '工作年限': np.round(rng.exponential(3.8, size), 6),
+        '最终收益值': final,
+        '类型内收益排名': 0,
+        '净收益': final,
+        '总收益': np.round(total, 3),
+        '异地积分扣分': remote_penalty,
+        '内码翻拍扣分': photo_penalty,
+        '销售利润': sales,
+        '外码充值贡献': 0,
+        '新客贡献': new_customer,
+        '会员价值贡献': member_value,
+        '试饮获客贡献': trial,
+        'A+B内码贡献': inner_code,
+        '全品内码贡献': inner_code
+    }, columns=PROJECTED_COLUMNS)
+    df['类型内收益排名'] = df.groupby('顾问编制')['最终收益值'].rank(ascending=False, method='first').astype(int)
+    return df.sort_values('最终收益值', ascending=False, ignore_index=True)
+
+
+def write_report(df, path):
+    """以openpyxl只写模式写出报表"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row])
+    workbook.save(path)
+
+
+def report_path(data_dir, size, month, seed):
+    """合成报表的文件路径（按规模与随机种子区分，可重复使用）"""
+    return os.path.join(data_dir, f"{size}-{seed}", f"{REPORT_PREFIX}{month:%Y%m}.xlsx")
+
+
+def measure(func, repeat, setup=None):
+    """重复执行func，返回耗时统计（秒）；setup在每次计时前调用，不计入耗时"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {'median': statistics.median(timings), 'min': min(timings), 'repeat': repeat}
+
+
+def bench_ingestion(size, months, data_dir, seed, repeat):
+    """报表读取、规范化及立方体、排名索引构建"""
+    results = {}
+    month = months[-1]
+    path = report_path(data_dir, size, month, seed)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_report(make_month(size, month, seed), path)
+
+    raw = read_excel_projected(path)
+    registry = MonthStore().categories
+    df = normalize_month_frame(raw, registry)
+    results['ingest/read_excel_projected'] = measure(lambda: read_excel_projected(path), repeat)
+    results['ingest/normalize_month_frame'] = measure(lambda: normalize_month_frame(raw, registry), repeat)
+    results['ingest/build_month_entry'] = measure(lambda: build_month_entry(df), repeat)
+    return results
+
+
+def bench_ranking(df, repeat):
+    """排名索引构建及各类排名查询"""
+    ranking = RankingIndex(df)
+    region = df['大区'].iloc[0]
+    adviser_type = df['顾问编制'].iloc[0]
+    name = df['顾问名称'].iloc[len(df) // 2]
+    positions = np.random.default_rng(0).integers(0, len(df), 1_000)
+    ranking.find_adviser(name)
+    return {
+        'ranking/build': measure(lambda: RankingIndex(df), repeat),
+        'ranking/top_100': measure(lambda: df.iloc[ranking.top('最终收益值', 100)], repeat),
+        'ranking/bottom_100': measure(lambda: df.iloc[ranking.bottom('最终收益值', 100)], repeat),
+        'ranking/top_100_filtered': measure(lambda: df.iloc[ranking.top(
+            '销售利润', 100, {'大区': region, '顾问编制': adviser_type})], repeat),
+        'ranking/rank_of_1000': measure(lambda: [ranking.percentile_rank('总收益', p) for p in positions], repeat),
+        'ranking/find_adviser': measure(lambda: ranking.find_adviser(name), repeat),
+        'ranking/nlargest_100': measure(lambda: df.nlargest(100, '最终收益值'), repeat)
+    }
+
+
+def bench_views(entries, repeat):
+    """在无浏览器的bare模式下计时各create_*视图（图表缓存关闭、分析结果缓存每次清空，每次都完整计算）"""
+    import streamlit_app
+    from figure_cache import FigureCache
+
+    dashboard = streamlit_app.NutritionAdviserDashboard(month_store=MonthStore(),
+                                                         figure_cache=FigureCache(max_entries=0))
+    for month_key, entry in entries:
+        dashboard._set_month(month_key, dict(entry))
+    month, previous_month = entries[-1][0], entries[-2][0]
+    df = dashboard.get_month_data(month)
+    previous_df = dashboard.get_month_data(previous_month)
+    region = df['大区'].iloc[0]
+
+    views = {
+        'create_overview_dashboard': lambda: dashboard.create_overview_dashboard(month),
+        'create_profit_distribution_chart': lambda: dashboard.create_profit_distribution_chart(df, month),
+        'create_adviser_type_chart': lambda: dashboard.create_adviser_type_chart(df, month),
+        'create_region_analysis_chart': lambda: dashboard.create_region_analysis_chart(df, month),
+        'create_trend_analysis_chart': lambda: dashboard.create_trend_analysis_chart(month),
+        'create_member_value_analysis': lambda: dashboard.create_member_value_analysis(month),
+        'create_sales_profit_analysis': lambda: dashboard.create_sales_profit_analysis(month),
+        'create_region_strengths_weaknesses': lambda: dashboard.create_region_strengths_weaknesses(
+            df, region, previous_df, month),
+        'create_region_gap_heatmap': lambda: dashboard.create_region_gap_heatmap(df, month),
+        'create_performance_comparison': lambda: dashboard.create_performance_comparison(df, month)
+    }
+    return {f"view/{name}": measure(view, repeat, setup=streamlit_app._analysis_result.clear)
+            for name, view in views.items()}
+
+
+def run(sizes, ingest_sizes, data_dir, seed, repeat, month_count=2):
+    """按规模依次执行全部基准，返回{"指标@规模": 耗时统计}"""
+    months = [datetime(2025, 6 + i, 1) for i in range(month_count)]
+    results = {}
+    for size in sizes:
+        print(f"规模 {size:,}", flush=True)
+        registry = MonthStore().categories
+        entries = []
+        for month in months:
+            # 与读取Excel时一致，只保留投影列
+            df = normalize_month_frame(make_month(size, month, seed)[PROJECTED_COLUMNS], registry)
+            entries.append((f"{month:%Y年%m月}", build_month_entry(df, month=f"{month:%Y年%m月}", date=month,
+                                                                   file_path='benchmark', source='benchmark')))
+
+        sections = {}
+        if size in ingest_sizes:
+            sections.update(bench_ingestion(size, months, data_dir, seed, repeat))
+        sections.update(bench_ranking(entries[-1][1]['data'], repeat))
+        sections.update(bench_views(entries, repeat))
+        for name, timing in sections.items():
+            results[f"{name}@{size}"] = timing
+            print(f"  {name:<45} {timing['median'] * 1000:>10.1f} ms", flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, min_delta=DEFAULT_MIN_DELTA):
+    """与基线对比，返回(对比表, 退化项列表)"""
+    rows = []
+    regressions = []
+    for name, timing in results.items():
+        reference = baseline.get('results', {}).get(name)
+        if reference is None:
+            rows.append((name, None, timing['median'], None))
+            continue
+        ratio = timing['median'] / reference['median'] if reference['median'] else float('inf')
+        rows.append((name, reference['median'], timing['median'], ratio))
+        if ratio > 1 + tolerance and timing['median'] - reference['median'] > min_delta:
+            regressions.append(name)
+    table = pd.DataFrame(rows, columns=['基准', '基线(s)', '本次(s)', '比值'])
+    return table, regressions
+
+
+def environment():
+    """记录运行环境，便于解读不同机器上的结果"""
+    import plotly
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plotly': plotly.__version__,
+        'timestamp': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="营养顾问绩效评估系统性能基准")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="顾问人数规模")
+    parser.add_argument('--ingest-sizes', type=int, nargs='*', default=DEFAULT_INGEST_SIZES,
+                        help="生成Excel并计时读取的规模")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取中位数")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="合成Excel文件目录")
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, help="把结果保存为基线")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help="与基线对比")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="允许的变慢比例")
+    args = parser.parse_args(argv)
+
+    # bare模式下Streamlit的提示信息与基准无关
+    logging.disable(logging.WARNING)
+
+    results = run(args.sizes, set(args.ingest_sizes), args.data_dir, args.seed, args.repeat)
+    report = {'environment': environment(), 'repeat': args.repeat, 'seed': args.seed, 'results': results}
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        table, regressions = compare(results, baseline, args.tolerance)
+        print(table.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+        if regressions:
+            print(f"性能退化（慢于基线 {args.tolerance:.0%} 以上）: {', '.join(regressions)}")
+            return 1
+        print("未发现性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
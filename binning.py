@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+def _amount_label(value):
+    """金额在分段标签中的写法：0写作0，其余以万为单位"""
+    return '0' if value == 0 else f"{value / 10000:g}万"
+
+
+def segment_labels(edges):
+    """按分段边界生成标签：首段“x以下”，末段“x以上”，其余“a-b万”"""
+    labels = []
+    for position, (lower, upper) in enumerate(zip(edges[:-1], edges[1:])):
+        if np.isinf(upper):
+            labels.append(f"{_amount_label(lower)}以上")
+        elif position == 0 and (np.isinf(lower) or lower == 0):
+            labels.append(f"{_amount_label(upper)}以下")
+        elif lower == 0 or upper == 0:
+            labels.append(f"{_amount_label(lower)}-{_amount_label(upper)}")
+        else:
+            labels.append(f"{lower / 10000:g}-{upper / 10000:g}万")
+    return labels
+
+
+def parse_edges(text, lower=-np.inf, upper=np.inf):
+    """把逗号分隔的内部边界解析为完整的分段边界(含lower、upper)；格式不正确或不是严格递增时返回None"""
+    try:
+        inner = [float(part) for part in text.replace('，', ',').split(',') if part.strip()]
+    except ValueError:
+        return None
+    edges = [lower] + [value for value in inner if lower < value < upper] + [upper]
+    if len(edges) < 3 or any(a >= b for a, b in zip(edges[:-1], edges[1:])):
+        return None
+    return tuple(edges)
+
+
+def bin_codes(values, edges):
+    """各值所在分段的编号（区间左开右闭，与pd.cut一致）；空值和超出边界的值为-1"""
+    codes = np.searchsorted(np.asarray(edges, dtype=np.float64), values, side='left') - 1
+    codes[(codes < 0) | (codes >= len(edges) - 1)] = -1
+    return codes
+
+
+def segment_counts(df, column, edges, labels=None, by=None, name=None):
+    """column在各分段的人数，直接由数值数组计算，不复制DataFrame、不生成临时分段列
+
+    by为空时返回以分段标签为索引的Series；否则与维度by交叉统计（一次bincount），
+    返回 by取值 × 分段 的DataFrame，只保留有数据的取值。name为分段轴的名称，默认为column。
+    """
+    labels = list(labels) if labels is not None else segment_labels(edges)
+    bin_count = len(edges) - 1
+    bins = bin_codes(df[column].to_numpy(dtype=np.float64), edges)
+    segment_index = pd.Index(labels, name=name or column)
+
+    if by is None:
+        counts = np.bincount(bins[bins >= 0], minlength=bin_count)
+        return pd.Series(counts, index=segment_index, name='count')
+
+    series = df[by]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # 共享字典的编码直接作为分组编号
+        codes, groups = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, groups = pd.factorize(series, sort=True)
+    valid = (bins >= 0) & (codes >= 0)
+    keys = codes[valid].astype(np.int64) * bin_count + bins[valid]
+    counts = np.bincount(keys, minlength=len(groups) * bin_count).reshape(len(groups), bin_count)
+    table = pd.DataFrame(counts, index=pd.Index(groups, name=by), columns=segment_index)
+    return table[counts.sum(axis=1) > 0]
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+# 缓存格式版本，解析逻辑变化时递增以使旧缓存失效
+CACHE_SCHEMA_VERSION = 3
+
+# 默认缓存目录（与app同级的 .cache/columnar）
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "columnar")
+
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    """计算文件内容的SHA-256哈希"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bytes_content_hash(content):
+    """计算字节内容的SHA-256哈希（与file_content_hash结果一致）"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def _atomic_write(target_path, write_func):
+    """先写临时文件再替换，避免并发读取到半成品"""
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    try:
+        write_func(tmp_path)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ColumnarCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, reader=pd.read_excel):
+        """Excel报表的列式(Parquet)磁盘缓存，按路径、修改时间、大小和内容哈希定位"""
+        self.cache_dir = cache_dir
+        self.reader = reader
+        self.hits = 0
+        self.misses = 0
+
+    def _index_path(self, file_path):
+        """文件路径对应的索引记录位置"""
+        path_key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'index', f"{path_key}.json")
+
+    def _data_path(self, content_hash):
+        """内容哈希对应的列式数据文件位置，不同解析函数的结果分别缓存"""
+        reader_name = getattr(self.reader, '__name__', 'reader')
+        return os.path.join(self.cache_dir, 'data',
+                            f"{content_hash}-{reader_name}-v{CACHE_SCHEMA_VERSION}.parquet")
+
+    def _read_index(self, file_path):
+        """读取索引记录，不存在或损坏时返回None"""
+        try:
+            with open(self._index_path(file_path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_index(self, file_path, record):
+        """写入索引记录"""
+        index_path = self._index_path(file_path)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+
+        _atomic_write(index_path, write)
+
+    def _write_data(self, data_path, df):
+        """写入列式数据文件"""
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        _atomic_write(data_path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+
+    def lookup(self, file_path):
+        """返回(内容哈希, 数据文件路径)，修改时间和大小未变时跳过重新哈希"""
+        stat = os.stat(file_path)
+        record = self._read_index(file_path)
+        if (record and record.get('mtime_ns') == stat.st_mtime_ns
+                and record.get('size') == stat.st_size
+                and os.path.exists(self._data_path(record['sha256']))):
+            return record['sha256'], self._data_path(record['sha256'])
+
+        content_hash = file_content_hash(file_path)
+        try:
+            self._write_index(file_path, {
+                'path': os.path.abspath(file_path),
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': content_hash
+            })
+        except OSError:
+            pass
+        return content_hash, self._data_path(content_hash)
+
+    def cached_path(self, file_path):
+        """已有有效列式缓存时返回缓存文件路径，否则返回None"""
+        try:
+            _, data_path = self.lookup(file_path)
+        except OSError:
+            return None
+        return data_path if os.path.exists(data_path) else None
+
+    def load(self, file_path):
+        """读取Excel文件，优先使用列式缓存"""
+        try:
+            _, data_path = self.lookup(file_path)
+        except OSError:
+            data_path = None
+
+        if data_path and os.path.exists(data_path):
+            try:
+                df = pd.read_parquet(data_path)
+                self.hits += 1
+                return df
+            except Exception:
+                # 缓存文件损坏时重新解析并覆盖
+                pass
+
+        self.misses += 1
+        df = self.reader(file_path)
+
+        if data_path:
+            try:
+                self._write_data(data_path, df)
+            except Exception:
+                # 列类型无法转换为Parquet或目录不可写时只跳过缓存
+                pass
+        return df
@@ -0,0 +1,152 @@
+import math
+from collections import defaultdict, namedtuple
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# 支持搜索的列
+SEARCH_COLUMNS = ['顾问名称', '门店名称']
+
+# 每页行数选项
+PAGE_SIZES = [50, 100, 200, 500]
+DEFAULT_PAGE_SIZE = 100
+
+# 一页查询结果：当前页数据、筛选后的总行数、页码（从1开始）、总页数
+GridPage = namedtuple('GridPage', ['data', 'total_rows', 'page', 'page_count'])
+
+
+def _bigrams(text):
+    """文本中相邻两个字符组成的字组"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SearchIndex:
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        """按二元字组（bigram）建立的倒排索引
+
+        索引建在各列的不同取值上：查询先由字组求交得到候选取值，再校验子串，最后按取值取出行号，
+        耗时与匹配的取值数相关，而不是逐行扫描。
+        """
+        self.columns = [name for name in columns if name in df.columns]
+        self.size = len(df)
+        self._values = {}
+        self._postings = {}
+        self._rows = {}
+        for column in self.columns:
+            codes, uniques = pd.factorize(df[column], sort=False)
+            values = np.asarray(uniques, dtype=object).astype(str)
+            postings = defaultdict(list)
+            for value_id, value in enumerate(values):
+                for gram in _bigrams(value):
+                    postings[gram].append(value_id)
+            self._values[column] = values
+            self._postings[column] = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+            # 按取值分组的行号：order[offsets[v]:offsets[v + 1]]为取值v所在的行（空值编码为-1，排在最前）
+            order = np.argsort(codes, kind='stable').astype(np.int32)
+            counts = np.bincount(codes[codes >= 0], minlength=len(values))
+            offsets = np.concatenate([[0], np.cumsum(counts)]) + int((codes < 0).sum())
+            self._rows[column] = (order, offsets)
+
+    def _matching_values(self, column, text):
+        """列中包含text的取值编号"""
+        values = self._values[column]
+        if len(text) < 2:
+            candidates = np.arange(len(values))
+        else:
+            postings = self._postings[column]
+            lists = [postings.get(gram) for gram in _bigrams(text)]
+            if any(ids is None for ids in lists):
+                return np.empty(0, dtype=np.int64)
+            candidates = reduce(np.intersect1d, sorted(lists, key=len))
+        if len(candidates) == 0:
+            return candidates
+        # 字组命中不代表连续出现，校验子串
+        return candidates[np.char.find(values[candidates].astype(str), text) >= 0]
+
+    def search(self, text, columns=None):
+        """包含text的行号（升序），在指定列（默认全部索引列）中任一列匹配即可"""
+        text = (text or '').strip()
+        if not text:
+            return np.arange(self.size)
+        matches = []
+        for column in columns or self.columns:
+            order, offsets = self._rows[column]
+            matches.extend(order[offsets[value_id]:offsets[value_id + 1]]
+                           for value_id in self._matching_values(column, text))
+        if not matches:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(matches))
+
+
+class DataGrid:
+    def __init__(self, df, search_columns=SEARCH_COLUMNS):
+        """服务端分页表格：搜索、筛选、排序和列投影都在服务端完成，只把当前页发送到浏览器
+
+        各列的排序结果首次使用时计算并缓存，之后的排序、翻页只需按筛选结果过滤预排序行号。
+        """
+        self._df = df
+        self.size = len(df)
+        self.columns = list(df.columns)
+        self.search_index = SearchIndex(df, search_columns)
+        self._orders = {}
+
+    def sort_order(self, column, ascending=True):
+        """按某列排序的全部行号（稳定排序，空值在后）"""
+        key = (column, ascending)
+        order = self._orders.get(key)
+        if order is None:
+            series = self._df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                # 共享字典的编码按出现先后分配，按取值本身排序
+                categories = series.cat.categories
+                ranks = np.empty(len(categories), dtype=np.int64)
+                ranks[np.argsort(np.asarray(categories, dtype=str), kind='stable')] = np.arange(len(categories))
+                codes = series.cat.codes.to_numpy()
+                keys = np.where(codes >= 0, ranks[np.maximum(codes, 0)] if ascending else
+                                -ranks[np.maximum(codes, 0)], len(categories) + 1)
+                order = np.argsort(keys, kind='stable')
+            else:
+                order = pd.Series(series.to_numpy()).sort_values(
+                    ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+            order = order.astype(np.int32)
+            self._orders[key] = order
+        return order
+
+    def select(self, search=None, filters=None, sort_by=None, ascending=True):
+        """按搜索词、{列: 取值}筛选条件和排序列得到行号"""
+        mask = None
+        for column, value in (filters or {}).items():
+            if value is None or column not in self._df.columns:
+                continue
+            column_mask = (self._df[column] == value).to_numpy()
+            mask = column_mask if mask is None else mask & column_mask
+        if search and search.strip():
+            search_mask = np.zeros(self.size, dtype=bool)
+            search_mask[self.search_index.search(search)] = True
+            mask = search_mask if mask is None else mask & search_mask
+
+        if sort_by is not None and sort_by in self._df.columns:
+            order = self.sort_order(sort_by, ascending)
+            return order if mask is None else order[mask[order]]
+        return np.arange(self.size) if mask is None else np.flatnonzero(mask)
+
+    def distinct(self, column, filters=None):
+        """某列在筛选条件下出现的取值（升序）"""
+        positions = self.select(filters=filters)
+        return sorted(self._df[column].iloc[positions].dropna().unique().tolist())
+
+    def page(self, positions, page=1, page_size=DEFAULT_PAGE_SIZE, columns=None):
+        """取出一页数据，只包含columns中的列；页码超出范围时取最近的有效页"""
+        total_rows = len(positions)
+        page_count = max(1, math.ceil(total_rows / page_size))
+        page = min(max(1, int(page)), page_count)
+        rows = positions[(page - 1) * page_size:page * page_size]
+        column_positions = [self.columns.index(name) for name in (columns or self.columns) if name in self.columns]
+        return GridPage(self._df.iloc[rows, column_positions], total_rows, page, page_count)
+
+    def query(self, search=None, filters=None, sort_by=None, ascending=True, columns=None, page=1,
+              page_size=DEFAULT_PAGE_SIZE):
+        """搜索、筛选、排序后取出一页"""
+        return self.page(self.select(search, filters, sort_by, ascending), page, page_size, columns)
@@ -0,0 +1,109 @@
+import gzip
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 支持的导出格式：名称 -> (显示名称, 文件扩展名, MIME类型)
+EXPORT_FORMATS = OrderedDict([
+    ('csv', ('CSV', '.csv', 'text/csv')),
+    ('csv.gz', ('CSV (gzip压缩)', '.csv.gz', 'application/gzip')),
+    ('parquet', ('Parquet', '.parquet', 'application/vnd.apache.parquet'))
+])
+
+# 每次写出的行数
+DEFAULT_CHUNK_ROWS = 50_000
+
+# 导出缓存的默认容量（字节）
+DEFAULT_EXPORT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def iter_csv_chunks(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """分块生成UTF-8编码的CSV内容，只有第一块包含表头"""
+    if df.empty:
+        yield df.to_csv(index=False).encode('utf-8')
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+def write_export(df, stream, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """按指定格式把df分块写入可写的二进制流"""
+    if fmt == 'csv':
+        for chunk in iter_csv_chunks(df, chunk_rows):
+            stream.write(chunk)
+    elif fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=stream, mode='wb') as compressed:
+            for chunk in iter_csv_chunks(df, chunk_rows):
+                compressed.write(chunk)
+    elif fmt == 'parquet':
+        # 列类型按整表推断，每块写为一个行组，不需要一次性转换整个表
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(stream, schema) as writer:
+            for start in range(0, len(df), chunk_rows):
+                batch = pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False)
+                writer.write_table(batch)
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+
+def export_frame(df, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """把单个数据表导出为字节内容"""
+    buffer = io.BytesIO()
+    write_export(df, buffer, fmt, chunk_rows)
+    return buffer.getvalue()
+
+
+def export_bundle(frames, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """把多个数据表打包为zip，frames为[(文件名, df)]，每个文件逐块写入压缩包"""
+    buffer = io.BytesIO()
+    # gzip格式已压缩，zip内不再重复压缩
+    compression = zipfile.ZIP_STORED if fmt == 'csv.gz' else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(buffer, mode='w', compression=compression) as archive:
+        for name, df in frames:
+            with archive.open(name + EXPORT_FORMATS[fmt][1], mode='w', force_zip64=True) as member:
+                write_export(df, member, fmt, chunk_rows)
+    return buffer.getvalue()
+
+
+class ExportCache:
+    def __init__(self, max_bytes=DEFAULT_EXPORT_CACHE_BYTES):
+        """导出文件缓存：按(月份, 数据版本, 格式, 筛选条件)保存生成的文件，超出容量时按LRU淘汰"""
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get_or_build(self, key, builder):
+        """命中时直接返回文件内容，否则调用builder()生成并缓存"""
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+                return content
+
+        content = builder()
+        with self._lock:
+            if key not in self._entries and len(content) <= self.max_bytes:
+                self._entries[key] = content
+                self._size += len(content)
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return content
+
+    def invalidate(self, month=None):
+        """移除包含指定月份（默认全部）的导出文件"""
+        with self._lock:
+            if month is None:
+                self._entries.clear()
+                self._size = 0
+                return
+            for key in [key for key in self._entries if month in key[0]]:
+                self._size -= len(self._entries.pop(key))
+
+    def __len__(self):
+        return len(self._entries)
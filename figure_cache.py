@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+# 默认最多缓存的图表数量
+DEFAULT_MAX_FIGURES = 256
+
+
+class FigureCache:
+    def __init__(self, max_entries=DEFAULT_MAX_FIGURES):
+        """Plotly图表缓存：按(月份, 数据版本, 视图, 参数)保存序列化后的图表JSON，超出容量时按LRU淘汰"""
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, builder):
+        """命中时由JSON还原图表，否则调用builder()构建并缓存"""
+        with self._lock:
+            figure_json = self._entries.get(key)
+            if figure_json is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if figure_json is not None:
+            return pio.from_json(figure_json)
+
+        figure = builder()
+        figure_json = figure.to_json()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = figure_json
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+    def invalidate(self, month=None):
+        """移除指定月份（默认全部）的缓存图表"""
+        with self._lock:
+            if month is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == month]:
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """命中、未命中次数及当前缓存数量"""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
@@ -0,0 +1,40 @@
+import numpy as np
+import streamlit as st
+
+# 数值显示格式：(st.column_config的printf格式, Python格式)，前者用于页面表格，后者用于导出的HTML
+CURRENCY = ("¥%,.0f", "¥{:,.0f}")
+SIGNED_CURRENCY = ("¥%+,.0f", "¥{:+,.0f}")
+PERCENT = ("%.1f%%", "{:.1f}%")
+SIGNED_PERCENT = ("%+.1f%%", "{:+.1f}%")
+COUNT = ("%,.0f", "{:,.0f}")
+SIGNED_COUNT = ("%+,.0f", "{:+,.0f}")
+
+# 正负号着色
+POSITIVE_STYLE = 'color: green; font-weight: bold'
+NEGATIVE_STYLE = 'color: red; font-weight: bold'
+
+
+def number_columns(formats):
+    """{列名: 显示格式} 转为st.dataframe的column_config；数据保持数值类型，表格内按数值排序"""
+    return {column: st.column_config.NumberColumn(column, format=fmt[0]) for column, fmt in formats.items()}
+
+
+def sign_colors(values, zero_positive=False):
+    """按正负号返回整列单元格的CSS：正数绿色、负数红色；zero_positive为True时0也视为正数"""
+    values = np.asarray(values, dtype=float)
+    positive = values >= 0 if zero_positive else values > 0
+    return np.select([positive, values < 0], [POSITIVE_STYLE, NEGATIVE_STYLE], default='')
+
+
+def style_signs(df, columns, formats=None, zero_positive=()):
+    """按列整体着色的Styler（每列调用一次，而非每个单元格）
+
+    columns为按正负号着色的列，zero_positive中的列0值也着绿色；formats同时设置Styler的显示格式，
+    仅在导出HTML时使用，页面表格以column_config的格式为准。
+    """
+    styler = df.style
+    for column in columns:
+        styler = styler.apply(sign_colors, subset=[column], zero_positive=column in zero_positive)
+    if formats:
+        styler = styler.format({column: fmt[1] for column, fmt in formats.items()}, na_rep='-')
+    return styler
@@ -0,0 +1,217 @@
+import io
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from data_cache import ColumnarCache
+
+# 报表文件名前缀
+REPORT_PREFIX = "利润模型评估报告_原始收益值_"
+
+# 默认并行解析进程数
+DEFAULT_MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# 读取时保留的列（按报表中的顺序）：分析用列之外还包括原始数据页和导出文件展示的其余报表列
+PROJECTED_COLUMNS = ['时间', '大区', '区域', '门店名称', '顾问id', '顾问名称', '顾问编制', '工作年限', '最终收益值',
+                     '类型内收益排名', '净收益', '总收益', '异地积分扣分', '内码翻拍扣分', '销售利润', '外码充值贡献',
+                     '新客贡献', '会员价值贡献', '试饮获客贡献', 'A+B内码贡献', '全品内码贡献']
+
+# 文本维度列，其余投影列按数值读取
+DIMENSION_COLUMNS = ['大区', '区域', '门店名称', '顾问名称', '顾问编制']
+
+# 转为共享字典Categorical的维度列
+CATEGORICAL_COLUMNS = ['大区', '区域', '顾问编制', '门店名称']
+
+# 单个文件的解析结果：名称、月份、日期、数据、错误信息
+IngestResult = namedtuple('IngestResult', ['name', 'month_key', 'file_date', 'data', 'error'])
+
+
+def parse_report_name(filename):
+    """从文件名提取(月份标识, 日期)，无法识别日期时日期为None"""
+    filename = os.path.basename(filename)
+    if REPORT_PREFIX in filename:
+        date_str = filename.replace(REPORT_PREFIX, "").replace(".xlsx", "")
+        try:
+            file_date = datetime.strptime(date_str, "%Y%m")
+            return file_date.strftime("%Y年%m月"), file_date
+        except ValueError:
+            pass
+    return filename.replace(".xlsx", ""), None
+
+
+def report_sort_key(name):
+    """报表排序键：按日期排序，无法识别日期的排在最后并按文件名排序"""
+    _, file_date = parse_report_name(name)
+    return file_date is None, file_date or datetime.min, name
+
+
+def _to_float(value):
+    """单元格值转浮点数，空值为NaN，无法转换时抛出ValueError"""
+    if value is None or value == '':
+        return np.nan
+    return float(value)
+
+
+def read_excel_projected(source, columns=PROJECTED_COLUMNS, keep_unknown=True):
+    """以openpyxl只读模式流式读取第一个工作表，投影列直接写入预分配的类型化数组
+
+    keep_unknown为True时，表头中不在columns内的其余列按object读取并排在投影列之后，不会被丢弃。
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        header = [str(name).strip() if name is not None else None for name in header]
+        positions = [(name, header.index(name)) for name in columns if name in header]
+        if keep_unknown:
+            # 重名列只保留第一列，与投影列的处理一致
+            known = set(columns)
+            for index, name in enumerate(header):
+                if name and name not in known:
+                    positions.append((name, index))
+                    known.add(name)
+        if not positions:
+            return pd.DataFrame()
+
+        # 按工作表声明的行数预分配，声明不准确时再成倍扩容
+        capacity = max((sheet.max_row or 0) - 1, 1024)
+        numeric = set(columns) - set(DIMENSION_COLUMNS)
+        arrays = {name: np.full(capacity, np.nan, dtype=np.float64 if name in numeric else object)
+                  for name, _ in positions}
+
+        count = 0
+        rows = sheet.iter_rows(min_row=2, max_col=max(index for _, index in positions) + 1, values_only=True)
+        for row in rows:
+            values = [row[index] if index < len(row) else None for _, index in positions]
+            if all(value is None for value in values):
+                continue
+            if count == capacity:
+                capacity *= 2
+                for name in arrays:
+                    grown = np.full(capacity, np.nan, dtype=arrays[name].dtype)
+                    grown[:count] = arrays[name][:count]
+                    arrays[name] = grown
+            for (name, _), value in zip(positions, values):
+                array = arrays[name]
+                if array.dtype == object:
+                    # 与pd.read_excel一致，空单元格和空字符串均记为NaN
+                    if value is not None and value != '':
+                        array[count] = value
+                else:
+                    try:
+                        array[count] = _to_float(value)
+                    except (TypeError, ValueError):
+                        # 数值列中出现文本时整列退回为object，保持原值
+                        arrays[name] = array.astype(object)
+                        arrays[name][count] = value
+            count += 1
+        # 退回为object的列（如日期列）按实际取值推断类型，日期得到datetime64，与pd.read_excel一致
+        return pd.DataFrame({name: arrays[name][:count] for name, _ in positions}).infer_objects()
+    finally:
+        workbook.close()
+
+
+def downcast_metric(series):
+    """在不损失精度的前提下把数值列压缩为int32或float32"""
+    values = series.to_numpy()
+    if values.dtype.kind not in 'if' or len(values) == 0:
+        return series
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        candidates = [np.float32]
+    else:
+        candidates = [np.int32, np.float32]
+    for dtype in candidates:
+        if np.dtype(dtype).kind == 'i':
+            info = np.iinfo(dtype)
+            if values.min() < info.min or values.max() > info.max:
+                continue
+        converted = values.astype(dtype)
+        if np.array_equal(converted.astype(values.dtype), values, equal_nan=values.dtype.kind == 'f'):
+            return pd.Series(converted, index=series.index, name=series.name)
+    return series
+
+
+def normalize_month_frame(df, registry):
+    """规范化单月数据：维度列转为共享字典Categorical，数值列无损压缩"""
+    columns = {}
+    for name in df.columns:
+        if name in CATEGORICAL_COLUMNS:
+            columns[name] = registry.encode(name, df[name].to_numpy())
+        elif df[name].dtype.kind in 'if':
+            columns[name] = downcast_metric(df[name])
+        else:
+            columns[name] = df[name]
+    return pd.DataFrame(columns, index=df.index)
+
+
+def read_report(source, cache_dir=None):
+    """读取单个报表：source为文件路径（经列式缓存）或文件字节内容"""
+    if cache_dir and isinstance(source, str):
+        return ColumnarCache(cache_dir, reader=read_excel_projected).load(source)
+    return read_excel_projected(source)
+
+
+def ingest_files(sources, max_workers=DEFAULT_MAX_WORKERS, on_progress=None, cache=None):
+    """并行读取多个报表文件
+
+    sources为[(文件名, 路径或字节内容)]；每个文件完成时回调on_progress(result, 已完成数, 总数)；
+    返回按月份排序的IngestResult列表，解析失败的文件error非空。
+    """
+    items = []
+    for name, source in sources:
+        month_key, file_date = parse_report_name(name)
+        items.append((name, month_key, file_date, source))
+    # 按日期（无法识别的按文件名）排序，保证结果顺序确定
+    items.sort(key=lambda item: report_sort_key(item[0]))
+
+    total = len(items)
+    results = [None] * total
+    done = 0
+
+    def finish(index, data=None, error=None):
+        nonlocal done
+        name, month_key, file_date, _ = items[index]
+        results[index] = IngestResult(name, month_key, file_date, data, error)
+        done += 1
+        if on_progress:
+            on_progress(results[index], done, total)
+
+    # 已有列式缓存的文件直接在主线程读取，只把需要解析Excel的文件交给进程池
+    pending = []
+    for index, (_, _, _, source) in enumerate(items):
+        if cache is not None and isinstance(source, str) and cache.cached_path(source):
+            try:
+                finish(index, data=cache.load(source))
+            except Exception as e:
+                finish(index, error=str(e))
+        else:
+            pending.append(index)
+
+    cache_dir = cache.cache_dir if cache is not None else None
+    workers = min(max_workers, len(pending))
+    if workers <= 1:
+        for index in pending:
+            try:
+                finish(index, data=read_report(items[index][3], cache_dir))
+            except Exception as e:
+                finish(index, error=str(e))
+        return results
+
+    # openpyxl解析持有GIL，使用进程池并行；服务端是多线程进程，使用spawn避免fork带来的锁状态问题
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(read_report, items[index][3], cache_dir): index for index in pending}
+        for future in as_completed(futures):
+            try:
+                finish(futures[future], data=future.result())
+            except Exception as e:
+                finish(futures[future], error=str(e))
+    return results
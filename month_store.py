@@ -0,0 +1,146 @@
+import itertools
+import os
+import threading
+import weakref
+
+import pandas as pd
+
+from month_table import MonthTable
+
+# 进程内全局递增的数据版本号，共享月份与上传月份统一编号，便于各类缓存区分数据
+_data_versions = itertools.count(1)
+
+
+def next_data_version():
+    """分配一个新的数据版本号"""
+    return next(_data_versions)
+
+
+def file_signature(file_path):
+    """文件签名（修改时间与大小），用于判断共享数据是否过期"""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CategoryRegistry:
+    def __init__(self):
+        """跨月份共享的维度字典：类别只追加不重排，各月份同一取值的编码一致"""
+        self._lock = threading.Lock()
+        self._values = {}
+        self._indexes = {}
+
+    def categories(self, column):
+        """维度列当前的类别索引（同一版本的字典在各月份间共享同一对象）"""
+        with self._lock:
+            return self._indexes.get(column, pd.Index([], dtype=object))
+
+    def encode(self, column, values):
+        """把一列取值编码为使用共享字典的Categorical"""
+        uniques = pd.unique(pd.Series(values).dropna())
+        with self._lock:
+            known = self._values.setdefault(column, {})
+            new_values = [value for value in uniques if value not in known]
+            if new_values or column not in self._indexes:
+                for value in new_values:
+                    known[value] = len(known)
+                self._indexes[column] = pd.Index(list(known), dtype=object)
+            categories = self._indexes[column]
+        return pd.Categorical(values, categories=categories)
+
+
+class MonthStore:
+    def __init__(self):
+        """进程级共享的只读月度数据仓库，所有会话复用同一份解析结果"""
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._entries = {}
+        self._signatures = {}
+        self._removed = set()
+        self._session_count = 0
+        self.categories = CategoryRegistry()  # 所有月份共享的维度字典
+        self.table = MonthTable()  # 所有月份数据的列式表，各月份数据是其中的零拷贝切片
+
+    # ---- 会话引用计数 ----
+
+    def attach(self, owner):
+        """登记一个使用仓库的会话，owner被回收时自动注销"""
+        with self._lock:
+            self._session_count += 1
+        return weakref.finalize(owner, self._detach)
+
+    def _detach(self):
+        """注销会话"""
+        with self._lock:
+            self._session_count = max(0, self._session_count - 1)
+
+    @property
+    def session_count(self):
+        """当前引用仓库的会话数"""
+        return self._session_count
+
+    # ---- 读取 ----
+
+    def months(self):
+        """仓库中的月份列表"""
+        with self._lock:
+            return list(self._entries.keys())
+
+    def __contains__(self, month_key):
+        return month_key in self._entries
+
+    def view(self, month_key):
+        """返回月份数据的零拷贝视图（浅拷贝DataFrame，底层数组共享）"""
+        with self._lock:
+            entry = self._entries.get(month_key)
+        if entry is None:
+            return None
+        return dict(entry, data=entry['data'].copy(deep=False))
+
+    def is_current(self, month_key, signature):
+        """月份已加载且文件签名未变"""
+        with self._lock:
+            return month_key in self._entries and self._signatures.get(month_key) == signature
+
+    def version(self, month_key):
+        """月份数据版本号，重新加载后递增"""
+        entry = self._entries.get(month_key)
+        return entry['version'] if entry else None
+
+    def is_removed(self, month_key):
+        """月份的源文件已被删除（区别于仅失效待重新加载）"""
+        return month_key in self._removed
+
+    # ---- 写入 ----
+
+    def put(self, month_key, entry, signature=None):
+        """写入(或替换)一个月份的数据"""
+        with self._lock:
+            self._entries[month_key] = dict(entry, version=next_data_version())
+            self._signatures[month_key] = signature
+            self._removed.discard(month_key)
+
+    def remove(self, month_key):
+        """源文件已删除时移除月份，各会话同步时一并移除"""
+        with self._lock:
+            self._entries.pop(month_key, None)
+            self._signatures.pop(month_key, None)
+            self._removed.add(month_key)
+            self.table.remove(month_key)
+
+    def loading(self):
+        """加载锁：多个会话同时加载时串行执行，后到者直接复用已解析的数据"""
+        return self._load_lock
+
+    def invalidate(self, month_key=None):
+        """使指定月份（默认全部）失效，下次加载时重新解析
+
+        列式表中的分区保留：其他会话仍持有这些月份，其趋势等跨月份汇总继续读取表中数据，
+        重新加载时写入的新数据直接替换对应分区。
+        """
+        with self._lock:
+            if month_key is None:
+                self._entries.clear()
+                self._signatures.clear()
+            else:
+                self._entries.pop(month_key, None)
+                self._signatures.pop(month_key, None)
@@ -0,0 +1,265 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# 重新分配时按存活行数预留的容量倍数，后续追加的月份直接写入尾部
+GROWTH_FACTOR = 1.5
+
+
+def _codes_dtype(size):
+    """与pandas一致的Categorical编码类型（按类别数取最小整数类型）"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _column_dtype(series):
+    """列在表中的存储类型：Categorical保留字典，数值列、日期列保留原类型，其余为object"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.dtype
+    if series.dtype.kind in 'iufM':
+        return series.dtype
+    return np.dtype(object)
+
+
+def _is_prefix(prefix, index):
+    """prefix是否为index的前缀（共享字典只追加，旧字典是新字典的前缀）"""
+    return len(prefix) <= len(index) and index[:len(prefix)].equals(prefix)
+
+
+def _merge_dtypes(current, new):
+    """两个月份的存储类型合并为可同时容纳两者的类型"""
+    if current is None:
+        return new
+    current_categorical = isinstance(current, pd.CategoricalDtype)
+    new_categorical = isinstance(new, pd.CategoricalDtype)
+    if current_categorical and new_categorical:
+        if _is_prefix(current.categories, new.categories):
+            return new
+        if _is_prefix(new.categories, current.categories):
+            return current
+        extra = new.categories.difference(current.categories, sort=False)
+        return pd.CategoricalDtype(current.categories.append(extra))
+    if current_categorical or new_categorical:
+        return np.dtype(object)
+    if (current.kind in 'iuf' and new.kind in 'iuf') or current.kind == new.kind == 'M':
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+def _nullable(dtype):
+    """缺失值需要的存储类型：整数列改为float64"""
+    if not isinstance(dtype, pd.CategoricalDtype) and dtype.kind in 'iu':
+        return np.dtype(np.float64)
+    return dtype
+
+
+def _empty_buffer(dtype, size):
+    """以缺失值填充的缓冲区"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return np.full(size, -1, dtype=_codes_dtype(len(dtype.categories)))
+    if dtype.kind == 'f':
+        return np.full(size, np.nan, dtype=dtype)
+    if dtype.kind == 'M':
+        return np.full(size, np.datetime64('NaT'), dtype=dtype)
+    if dtype.kind == 'O':
+        return np.full(size, None, dtype=object)
+    return np.zeros(size, dtype=dtype)
+
+
+def _storage_values(values, source_dtype, target_dtype):
+    """把一段数据转为目标存储类型：Categorical返回编码（字典不同时按取值重新编码）"""
+    if isinstance(target_dtype, pd.CategoricalDtype):
+        if isinstance(source_dtype, pd.CategoricalDtype):
+            codes = values
+            if not _is_prefix(source_dtype.categories, target_dtype.categories):
+                mapping = target_dtype.categories.get_indexer(source_dtype.categories)
+                codes = np.where(codes >= 0, mapping[np.maximum(codes, 0)], -1)
+            return codes.astype(_codes_dtype(len(target_dtype.categories)), copy=False)
+        raise TypeError("非Categorical数据不能写入Categorical列")
+    if isinstance(source_dtype, pd.CategoricalDtype):
+        return np.asarray(pd.Categorical.from_codes(values, dtype=source_dtype)).astype(target_dtype)
+    return values.astype(target_dtype, copy=False)
+
+
+class MonthTable:
+    def __init__(self):
+        """多月份列式表：每列一个连续数组，按月份分区记录行偏移，Categorical列共用一份字典
+
+        单月读取是数组切片构成的零拷贝DataFrame；跨月份汇总在整列上一次向量化完成。
+        追加月份写入数组尾部，已有的切片不受影响；替换或移除的分区只标记失效，
+        在容量不足或列类型需要扩展而重新分配时一并压缩。
+        """
+        self._lock = threading.RLock()
+        self._dtypes = {}
+        self._buffers = {}
+        self._partitions = {}
+        self._length = 0
+        self._capacity = 0
+
+    # ---- 读取 ----
+
+    @property
+    def months(self):
+        """表中的月份（按写入顺序）"""
+        with self._lock:
+            return list(self._partitions)
+
+    def __contains__(self, month_key):
+        return month_key in self._partitions
+
+    def __len__(self):
+        """存活分区的总行数"""
+        with self._lock:
+            return sum(stop - start for start, stop, _, _ in self._partitions.values())
+
+    def offsets(self, month_key):
+        """月份在各列数组中的(起始, 结束)行偏移"""
+        with self._lock:
+            start, stop, _, _ = self._partitions[month_key]
+            return start, stop
+
+    def stats(self):
+        """行数、已分配容量、失效行数"""
+        with self._lock:
+            live = len(self)
+            return {'rows': live, 'capacity': self._capacity, 'stale_rows': self._length - live}
+
+    def frame(self, month_key):
+        """月份数据：各列为表中数组切片的零拷贝DataFrame（列顺序与写入时一致）"""
+        with self._lock:
+            start, stop, columns, index = self._partitions[month_key]
+            buffers = {name: self._buffers[name] for name in columns}
+            dtypes = {name: self._dtypes[name] for name in columns}
+        data = {}
+        for name in columns:
+            values = buffers[name][start:stop]
+            if isinstance(dtypes[name], pd.CategoricalDtype):
+                # 不使用validate参数（pandas 2.1起才支持），编码检查只是一次范围比较
+                values = pd.Categorical.from_codes(values, dtype=dtypes[name])
+            data[name] = pd.Series(values, index=index, name=name, copy=False)
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def aggregate(self, metric, by=None, months=None):
+        """一次向量化遍历按月份（可再按Categorical维度by）汇总metric：count、sum、mean
+
+        months默认全部月份；只读取所选月份的分区，单个月份的汇总与其行数成正比。
+        返回以月份（及by）为索引、只含有数据分组的DataFrame。
+        """
+        with self._lock:
+            months = [month for month in (months if months is not None else self._partitions)
+                      if month in self._partitions]
+            offsets = [self._partitions[month][:2] for month in months]
+            values = self._buffers.get(metric)
+            codes = self._buffers.get(by) if by is not None else None
+            dtype = self._dtypes.get(by) if by is not None else None
+        if values is None or (by is not None and codes is None):
+            return pd.DataFrame(columns=['count', 'sum', 'mean'])
+
+        # 所选分区依次拼接，每行所属分区的编号
+        sizes = np.array([stop - start for start, stop in offsets], dtype=np.int64)
+        partition = np.repeat(np.arange(len(months), dtype=np.int64), sizes)
+        values = np.concatenate([values[start:stop] for start, stop in offsets] or [np.empty(0)])
+        values = values.astype(np.float64, copy=False)
+        valid = ~np.isnan(values)
+
+        if by is None:
+            group_count = 1
+            keys = partition
+            index = pd.Index(months, name='月份')
+        else:
+            group_count = len(dtype.categories)
+            codes = np.concatenate([codes[start:stop] for start, stop in offsets] or [np.empty(0)])
+            codes = codes.astype(np.int64)
+            valid &= codes >= 0
+            keys = partition * group_count + codes
+            index = pd.MultiIndex.from_product([months, dtype.categories], names=['月份', by])
+
+        size = len(months) * group_count
+        count = np.bincount(keys[valid], minlength=size)
+        total = np.bincount(keys[valid], weights=values[valid], minlength=size)
+        result = pd.DataFrame({'count': count, 'sum': total}, index=index)
+        result = result[result['count'] > 0]
+        result['mean'] = result['sum'] / result['count']
+        return result
+
+    # ---- 写入 ----
+
+    def put(self, month_key, df):
+        """写入(或替换)一个月份，返回该月的零拷贝DataFrame"""
+        with self._lock:
+            self._partitions.pop(month_key, None)
+
+            # 合并后的列类型；本月缺少的列、已有月份缺少的新列需要能表示缺失值
+            live = bool(self._partitions)
+            dtypes = dict(self._dtypes)
+            for name in df.columns:
+                merged = _merge_dtypes(dtypes.get(name), _column_dtype(df[name]))
+                dtypes[name] = _nullable(merged) if live and name not in self._dtypes else merged
+            for name in self._dtypes:
+                if name not in df.columns:
+                    dtypes[name] = _nullable(dtypes[name])
+
+            if self._length + len(df) > self._capacity or any(
+                    self._storage_dtype(dtypes[name]) != self._buffers[name].dtype for name in self._buffers) or any(
+                    name not in self._buffers for name in dtypes):
+                self._reallocate(dtypes, len(df))
+            else:
+                self._dtypes = dtypes
+
+            start, stop = self._length, self._length + len(df)
+            for name, buffer in self._buffers.items():
+                if name in df.columns:
+                    series = df[name]
+                    values = series.cat.codes.to_numpy() if isinstance(series.dtype, pd.CategoricalDtype) \
+                        else series.to_numpy()
+                    buffer[start:stop] = _storage_values(values, _column_dtype(series), self._dtypes[name])
+                else:
+                    buffer[start:stop] = _empty_buffer(self._dtypes[name], stop - start)
+            self._length = stop
+            self._partitions[month_key] = (start, stop, list(df.columns), df.index)
+        return self.frame(month_key)
+
+    def remove(self, month_key):
+        """移除一个月份（分区标记失效，已取出的DataFrame仍然有效）"""
+        with self._lock:
+            self._partitions.pop(month_key, None)
+
+    def clear(self):
+        """清空所有月份"""
+        with self._lock:
+            self._dtypes = {}
+            self._buffers = {}
+            self._partitions = {}
+            self._length = 0
+            self._capacity = 0
+
+    @staticmethod
+    def _storage_dtype(dtype):
+        if isinstance(dtype, pd.CategoricalDtype):
+            return _codes_dtype(len(dtype.categories))
+        return dtype
+
+    def _reallocate(self, dtypes, extra_rows):
+        """按新的列类型重新分配数组并压缩掉失效分区；已取出的切片仍引用旧数组，不受影响"""
+        live_rows = sum(stop - start for start, stop, _, _ in self._partitions.values())
+        capacity = int((live_rows + extra_rows) * GROWTH_FACTOR) + 1
+        buffers = {name: _empty_buffer(dtype, capacity) for name, dtype in dtypes.items()}
+
+        position = 0
+        partitions = {}
+        for month_key, (start, stop, columns, index) in self._partitions.items():
+            size = stop - start
+            for name in columns:
+                buffers[name][position:position + size] = _storage_values(
+                    self._buffers[name][start:stop], self._dtypes[name], dtypes[name])
+            partitions[month_key] = (position, position + size, columns, index)
+            position += size
+
+        self._dtypes = dtypes
+        self._buffers = buffers
+        self._partitions = partitions
+        self._length = position
+        self._capacity = capacity
@@ -0,0 +1,176 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+# 设为1时对所有会话启用性能分析
+PROFILE_ENV = "DASHBOARD_PROFILE"
+
+# 性能记录日志（JSON Lines），与列式缓存同在 .cache 目录下
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "profiling.jsonl")
+
+# 内存中保留的最近记录数
+DEFAULT_MAX_RECORDS = 5000
+
+
+class Profiler:
+    def __init__(self, log_path=DEFAULT_LOG_PATH, max_records=DEFAULT_MAX_RECORDS):
+        """热点路径计时：记录每个方法及其计算、图表、序列化阶段的耗时、处理行数和发送字节数"""
+        self.log_path = log_path
+        self.force = os.environ.get(PROFILE_ENV) == "1"
+        self._records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._runs = itertools.count(1)
+        self._local = threading.local()
+
+    # ---- 运行上下文（按线程，即按会话脚本线程） ----
+
+    def begin_run(self, session=None, enabled=False):
+        """开始一次脚本运行，之后本线程内的计时记录归属于该会话与运行编号"""
+        # 上一次运行未正常结束时，先写出其缓冲的记录
+        self.flush()
+        self._local.enabled = enabled or self.force
+        self._local.session = session
+        self._local.run = next(self._runs)
+        self._local.stack = []
+
+    def end_run(self):
+        """结束本次运行：把缓冲的记录一次写入日志"""
+        self._local.stack = []
+        self.flush()
+
+    @property
+    def enabled(self):
+        return getattr(self._local, 'enabled', self.force)
+
+    # ---- 计时 ----
+
+    @contextmanager
+    def span(self, name, phase='compute', rows=0, sent_bytes=0):
+        """计时区间，phase为compute(计算)、figure(构建图表)或serialize(序列化发送)；
+        未启用时不做任何记录。嵌套区间的耗时计入父区间的子耗时"""
+        if not self.enabled:
+            yield None
+            return
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        frame = {'name': name, 'phase': phase, 'rows': rows, 'bytes': sent_bytes, 'child_ms': 0.0}
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            stack.pop()
+            if stack:
+                stack[-1]['child_ms'] += duration
+            self._emit({
+                'ts': time.time(),
+                'session': getattr(self._local, 'session', None),
+                'run': getattr(self._local, 'run', None),
+                'name': name,
+                'phase': phase,
+                'parent': stack[-1]['name'] if stack else None,
+                'duration_ms': round(duration, 3),
+                'self_ms': round(duration - frame['child_ms'], 3),
+                'rows': int(frame['rows']),
+                'bytes': int(frame['bytes'])
+            })
+
+    def add(self, rows=0, sent_bytes=0):
+        """累加当前区间处理的行数、发送的字节数"""
+        stack = getattr(self._local, 'stack', None)
+        if self.enabled and stack:
+            stack[-1]['rows'] += rows
+            stack[-1]['bytes'] += sent_bytes
+
+    def _emit(self, record):
+        # 加锁期间只追加到内存，日志文件在运行结束时统一写入
+        with self._lock:
+            self._records.append(record)
+            if self.log_path:
+                self._pending.append(record)
+
+    def flush(self):
+        """把缓冲的记录追加到日志文件"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in pending)
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+        except OSError:
+            # 日志写入失败不影响页面
+            pass
+
+    # ---- 查询 ----
+
+    def records(self, session=None, run=None):
+        """内存中的计时记录，可按会话、运行编号筛选"""
+        with self._lock:
+            records = list(self._records)
+        return [record for record in records
+                if (session is None or record['session'] == session) and (run is None or record['run'] == run)]
+
+    def last_run(self, session=None):
+        """某会话最近一次运行的编号"""
+        runs = [record['run'] for record in self.records(session)]
+        return max(runs) if runs else None
+
+    def summary(self, session=None, run=None):
+        """按(名称, 阶段)汇总：次数、总耗时、自身耗时、行数、字节数，按总耗时降序"""
+        records = self.records(session, run)
+        if not records:
+            return pd.DataFrame(columns=['名称', '阶段', '次数', '总耗时(ms)', '自身耗时(ms)', '行数', '字节数'])
+        df = pd.DataFrame(records)
+        result = df.groupby(['name', 'phase'], sort=False).agg(
+            次数=('duration_ms', 'size'),
+            总耗时=('duration_ms', 'sum'),
+            自身耗时=('self_ms', 'sum'),
+            行数=('rows', 'sum'),
+            字节数=('bytes', 'sum')
+        ).reset_index()
+        result = result.rename(columns={'name': '名称', 'phase': '阶段', '总耗时': '总耗时(ms)', '自身耗时': '自身耗时(ms)'})
+        return result.sort_values('总耗时(ms)', ascending=False).round(1).reset_index(drop=True)
+
+    def clear(self, session=None):
+        """清空内存中的记录（默认全部）"""
+        with self._lock:
+            if session is None:
+                self._records.clear()
+            else:
+                kept = [record for record in self._records if record['session'] != session]
+                self._records.clear()
+                self._records.extend(kept)
+
+
+# 进程内共享的性能分析器
+PROFILER = Profiler()
+
+
+def profiled(name=None, phase='compute'):
+    """方法计时装饰器：参数中的DataFrame行数计入处理行数"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            rows = sum(len(value) for value in itertools.chain(args, kwargs.values())
+                       if isinstance(value, pd.DataFrame))
+            with PROFILER.span(label, phase, rows=rows):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
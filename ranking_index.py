@@ -0,0 +1,104 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# 可排名的指标
+RANK_METRICS = ['最终收益值', '销售利润', '总收益']
+
+# 排名可按其筛选的维度
+RANK_FILTER_DIMENSIONS = ['大区', '顾问编制']
+
+# 定位单个顾问的键
+ADVISER_KEY_COLUMNS = ['顾问名称', '门店名称']
+
+
+def _stable_order(values, descending):
+    """与nlargest/nsmallest(keep='first')一致的排序：数值相同时行号小者在前，NaN不参与排名"""
+    positions = np.flatnonzero(~np.isnan(values))
+    keys = -values[positions] if descending else values[positions]
+    return positions[np.argsort(keys, kind='stable')].astype(np.int32)
+
+
+class RankingIndex:
+    def __init__(self, df, metrics=RANK_METRICS, dimensions=RANK_FILTER_DIMENSIONS):
+        """单月排名索引：加载时为每个指标及每种筛选组合预排序，查询只需切片"""
+        self.metrics = [name for name in metrics if name in df.columns]
+        self.dimensions = [name for name in dimensions if name in df.columns]
+        self.size = len(df)
+        self._df = df
+        self._adviser_positions = None
+
+        # 每种筛选组合下各分组的行号
+        groups = {(): {(): np.arange(self.size)}}
+        for length in range(1, len(self.dimensions) + 1):
+            for combo in itertools.combinations(self.dimensions, length):
+                indices = df.groupby(list(combo), observed=True, sort=False).indices
+                groups[combo] = {key if isinstance(key, tuple) else (key,): positions
+                                 for key, positions in indices.items()}
+
+        # (指标, 筛选维度, 取值) -> (降序行号, 升序行号)
+        self._orders = {}
+        self._ranks = {}
+        for metric in self.metrics:
+            values = df[metric].to_numpy(dtype=np.float64)
+            for combo, members in groups.items():
+                for key, positions in members.items():
+                    positions = np.sort(positions)
+                    sub_values = values[positions]
+                    self._orders[(metric, combo, key)] = (positions[_stable_order(sub_values, True)],
+                                                          positions[_stable_order(sub_values, False)])
+            # 全量排名（1为最高），NaN为0
+            descending = self._orders[(metric, (), ())][0]
+            ranks = np.zeros(self.size, dtype=np.int32)
+            ranks[descending] = np.arange(1, len(descending) + 1, dtype=np.int32)
+            self._ranks[metric] = ranks
+
+    def _lookup(self, metric, filters):
+        """按筛选条件取出预排序的行号"""
+        filters = {name: value for name, value in (filters or {}).items() if value is not None}
+        combo = tuple(name for name in self.dimensions if name in filters)
+        if len(combo) != len(filters):
+            raise KeyError(f"不支持的筛选维度: {set(filters) - set(combo)}")
+        key = tuple(filters[name] for name in combo)
+        empty = np.empty(0, dtype=np.int32)
+        return self._orders.get((metric, combo, key), (empty, empty))
+
+    def count(self, metric, filters=None):
+        """筛选后参与排名的人数"""
+        return len(self._lookup(metric, filters)[0])
+
+    def top(self, metric, k, filters=None):
+        """前k名的行号（等价于nlargest）"""
+        return self._lookup(metric, filters)[0][:k]
+
+    def bottom(self, metric, k, filters=None):
+        """后k名的行号（等价于nsmallest）"""
+        return self._lookup(metric, filters)[1][:k]
+
+    def rank_of(self, metric, position):
+        """某行在整月中的名次（1为最高），无数值时为None"""
+        rank = int(self._ranks[metric][position])
+        return rank or None
+
+    def percentile_rank(self, metric, position):
+        """某行超过的顾问百分比"""
+        rank = self.rank_of(metric, position)
+        total = self.count(metric)
+        if rank is None or total == 0:
+            return None
+        return (total - rank) / total * 100
+
+    def find_adviser(self, name, store=None):
+        """按顾问名称（可选门店名称）查找行号"""
+        if self._adviser_positions is None:
+            if ADVISER_KEY_COLUMNS[0] not in self._df.columns:
+                self._adviser_positions = {}
+            else:
+                names = self._df[ADVISER_KEY_COLUMNS[0]].astype(str)
+                self._adviser_positions = pd.Series(np.arange(self.size)).groupby(names.to_numpy()).indices
+        positions = self._adviser_positions.get(str(name), np.empty(0, dtype=np.int64))
+        if store is not None and ADVISER_KEY_COLUMNS[1] in self._df.columns and len(positions):
+            stores = self._df[ADVISER_KEY_COLUMNS[1]].to_numpy()[positions]
+            positions = positions[stores == store]
+        return positions
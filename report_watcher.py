@@ -0,0 +1,154 @@
+import glob
+import os
+import threading
+import time
+
+from aggregation import DEFAULT_SKETCH_K, MonthCube
+from ingestion import DEFAULT_MAX_WORKERS, REPORT_PREFIX, ingest_files, normalize_month_frame, parse_report_name
+from month_store import file_signature
+from ranking_index import RankingIndex
+
+# 默认轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+def build_month_entry(df, sketch_k=DEFAULT_SKETCH_K, **metadata):
+    """由规范化后的月度数据构建仓库条目：数据、聚合立方体、排名索引及元数据；sketch_k为分位数摘要精度参数"""
+    return dict(metadata, data=df, cube=MonthCube.build(df, sketch_k=sketch_k), ranking=RankingIndex(df))
+
+
+def scan_reports(directory):
+    """扫描目录中的报表文件，返回({月份: (文件路径, 日期, 签名)}, 日期格式不正确的文件名列表)"""
+    reports, skipped = {}, []
+    for file_path in glob.glob(os.path.join(directory, f"{REPORT_PREFIX}*.xlsx")):
+        filename = os.path.basename(file_path)
+        month_key, file_date = parse_report_name(filename)
+        if file_date is None:
+            skipped.append(filename)
+            continue
+        try:
+            reports[month_key] = (file_path, file_date, file_signature(file_path))
+        except OSError:
+            # 扫描期间文件被删除或替换
+            continue
+    return reports, skipped
+
+
+def refresh_month_store(store, reports, excel_cache=None, max_workers=DEFAULT_MAX_WORKERS,
+                        on_progress=None, remove_missing=False, sketch_k=DEFAULT_SKETCH_K):
+    """只重新解析缺失或文件已变化的月份并写入共享仓库
+
+    reports为scan_reports的结果；remove_missing为True时同时移除文件已删除的月份。
+    返回(已更新的月份, 已移除的月份)。
+    """
+    with store.loading():
+        pending = [(os.path.basename(file_path), file_path)
+                   for month_key, (file_path, _, signature) in reports.items()
+                   if not store.is_current(month_key, signature)]
+        signatures = {os.path.basename(file_path): signature for file_path, _, signature in reports.values()}
+
+        updated = []
+        if pending:
+            results = ingest_files(pending, max_workers=max_workers, on_progress=on_progress, cache=excel_cache)
+            for result in results:
+                if result.error:
+                    continue
+                # 规范化为紧凑类型后写入列式表，条目中的数据是表中的零拷贝切片；
+                # 月份、日期、来源作为月份级元数据保存，不再逐行重复
+                df = store.table.put(result.month_key, normalize_month_frame(result.data, store.categories))
+                store.put(result.month_key, build_month_entry(
+                    df,
+                    sketch_k=sketch_k,
+                    table=store.table,
+                    month=result.month_key,
+                    date=result.file_date,
+                    file_path=result.name,
+                    source='github'
+                ), signatures[result.name])
+                updated.append(result.month_key)
+
+        removed = []
+        if remove_missing:
+            for month_key in store.months():
+                if month_key not in reports:
+                    store.remove(month_key)
+                    removed.append(month_key)
+    return updated, removed
+
+
+class ReportWatcher:
+    def __init__(self, store, directory, excel_cache=None, interval=DEFAULT_POLL_INTERVAL,
+                 max_workers=DEFAULT_MAX_WORKERS, on_change=None, sketch_k=DEFAULT_SKETCH_K):
+        """报表文件监视器：后台线程按修改时间轮询目录，只重新解析新增或变化的月份并原子替换到共享仓库
+
+        on_change(已更新的月份, 已移除的月份)在仓库更新后调用，用于使依赖这些月份的缓存失效。
+        """
+        self.store = store
+        self.directory = directory
+        self.excel_cache = excel_cache
+        self.interval = interval
+        self.max_workers = max_workers
+        self.sketch_k = sketch_k
+        self.on_change = on_change
+        self.last_scan = None
+        self.last_change = None
+        self.last_error = None
+        self._snapshot = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动后台轮询线程（重复调用无副作用）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="report-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """停止轮询线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.last_error = str(e)
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """扫描一次目录；文件签名有变化时同步共享仓库，返回(已更新的月份, 已移除的月份)"""
+        reports, _ = scan_reports(self.directory)
+        snapshot = {month_key: signature for month_key, (_, _, signature) in reports.items()}
+        self.last_scan = time.time()
+        if snapshot == self._snapshot:
+            return [], []
+
+        # 仓库为空时不主动加载，等待首个会话加载后再开始同步
+        if not self.store.months():
+            self._snapshot = snapshot
+            return [], []
+
+        errors = {}
+
+        def on_progress(result, done, total):
+            if result.error:
+                errors[result.month_key] = result.error
+
+        updated, removed = refresh_month_store(self.store, reports, self.excel_cache, self.max_workers,
+                                               on_progress=on_progress, remove_missing=True, sketch_k=self.sketch_k)
+        # 解析失败的月份（如文件正在复制）不记入快照，下次轮询时重试
+        self._snapshot = {month_key: signature for month_key, signature in snapshot.items() if month_key not in errors}
+        self.last_error = "; ".join(f"{month_key}: {error}" for month_key, error in errors.items()) or None
+        if updated or removed:
+            self.last_change = time.time()
+            if self.on_change:
+                self.on_change(updated, removed)
+        return updated, removed
@@ -8,14 +8,54 @@ import glob
 import warnings
 import requests
 import io
+import threading
+import functools
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import sys
 
 # 添加自定义模块路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from data_cache import ColumnarCache, bytes_content_hash
+from data_grid import DEFAULT_PAGE_SIZE, PAGE_SIZES, SEARCH_COLUMNS, DataGrid
+from month_store import MonthStore, next_data_version
+from month_table import MonthTable
+from figure_cache import FigureCache
+from formatting import (COUNT, CURRENCY, PERCENT, SIGNED_COUNT, SIGNED_CURRENCY, SIGNED_PERCENT, number_columns,
+                        style_signs)
+from profiling import PROFILE_ENV, PROFILER, profiled
+from export import EXPORT_FORMATS, ExportCache, export_bundle, export_frame
+from aggregation import SKETCH_K_ENV, MonthCube, configured_sketch_k
+from adviser_index import AdviserIndex
+from analytics import (COMPARISON_DIMENSIONS, COMPARISON_STATS, PROFIT_BINS, SALES_BINS, adviser_type_stats,
+                       member_value_analysis, month_over_month, overview_stats, profit_distribution, region_gap_matrix,
+                       region_performance, sales_profit_distribution, top_bottom_comparison, trend_table)
+from binning import parse_edges
+from ranking_index import RankingIndex
+from report_watcher import (DEFAULT_POLL_INTERVAL, ReportWatcher, build_month_entry, refresh_month_store,
+                            scan_reports)
+from ingestion import (DEFAULT_MAX_WORKERS, ingest_files, normalize_month_frame, parse_report_name,
+                       read_excel_projected, report_sort_key)
+
 warnings.filterwarnings('ignore')
 
+# 启用写时复制：各会话拿到的共享月度数据视图零拷贝，且修改互不影响
+try:
+    pd.set_option('mode.copy_on_write', True)
+except (KeyError, pd.errors.OptionError):
+    pass
+
+# 分位数摘要精度参数（环境变量DASHBOARD_SKETCH_K），共享仓库、上传文件与后台监视器统一使用
+SKETCH_K = configured_sketch_k()
+
+# 环比对比中维度取值较多时，变化量最大、最小各显示的行数
+MOM_DISPLAY_ROWS = 50
+
+# 月份条目中的数据来源标记及其显示名称（页面与导出文件一致）
+SOURCE_LABELS = {'github': "GitHub仓库", 'uploaded': "上传文件"}
+
 # 设置页面配置
 st.set_page_config(
     page_title="营养顾问绩效评估系统",
@@ -63,12 +103,194 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def get_month_store():
+    """获取进程级共享的月度数据仓库"""
+    return MonthStore()
+
+
+@st.cache_resource
+def get_figure_cache():
+    """获取进程级共享的图表缓存"""
+    return FigureCache()
+
+
+@st.cache_resource
+def get_export_cache():
+    """获取进程级共享的导出文件缓存"""
+    return ExportCache()
+
+
+@st.cache_resource
+def get_report_watcher():
+    """获取进程级唯一的报表文件监视器：文件变化时热更新共享仓库，并使相关月份的缓存失效"""
+    figure_cache = get_figure_cache()
+    export_cache = get_export_cache()
+
+    def on_change(updated, removed):
+        for month_key in updated + removed:
+            figure_cache.invalidate(month_key)
+            export_cache.invalidate(month_key)
+
+    return ReportWatcher(get_month_store(), os.path.dirname(os.path.abspath(__file__)),
+                         excel_cache=ColumnarCache(reader=read_excel_projected), on_change=on_change,
+                         sketch_k=SKETCH_K).start()
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def _analysis_result(name, key, _compute):
+    """跨会话共享的分析结果缓存：按(分析名称, (月份, 数据版本, 参数))缓存，_compute不参与哈希"""
+    return _compute()
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _data_grid(month, version, _df):
+    """跨会话共享的分页表格（含搜索索引与各列排序结果），按(月份, 数据版本)缓存"""
+    return DataGrid(_df)
+
+
+# 无界面运行（如批量报告）时接收图表、表格和指标的输出对象，按线程设置
+_output_capture = threading.local()
+
+
+@contextmanager
+def capture_output(sink):
+    """在本线程内把图表、表格、指标交给sink.figure/sink.table/sink.metric，而不发送到页面"""
+    previous = getattr(_output_capture, 'sink', None)
+    _output_capture.sink = sink
+    try:
+        yield sink
+    finally:
+        _output_capture.sink = previous
+
+
+@contextmanager
+def _sent_bytes():
+    """统计区间内发送给浏览器的消息字节数：读取Streamlit已生成的消息大小，不重复序列化"""
+    sent = [0]
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        yield sent
+        return
+    enqueue = ctx._enqueue
+
+    def counting(msg):
+        sent[0] += msg.ByteSize()
+        enqueue(msg)
+
+    ctx._enqueue = counting
+    try:
+        yield sent
+    finally:
+        ctx._enqueue = enqueue
+
+
+def _metric(label, value, *args, **kwargs):
+    """显示指标"""
+    sink = getattr(_output_capture, 'sink', None)
+    if sink is not None:
+        return sink.metric(label, value, kwargs.get('delta', args[0] if args else None))
+    return st.metric(label, value, *args, **kwargs)
+
+
+def _plotly_chart(figure, **kwargs):
+    """渲染Plotly图表；启用性能分析时记录序列化耗时与实际发送的字节数"""
+    sink = getattr(_output_capture, 'sink', None)
+    if sink is not None:
+        return sink.figure(figure)
+    if not PROFILER.enabled:
+        return st.plotly_chart(figure, **kwargs)
+    with PROFILER.span('st.plotly_chart', phase='serialize'):
+        with _sent_bytes() as sent:
+            result = st.plotly_chart(figure, **kwargs)
+        PROFILER.add(sent_bytes=sent[0])
+        return result
+
+
+def _show_dataframe(data, **kwargs):
+    """渲染表格；启用性能分析时记录序列化耗时、行数与实际发送的字节数"""
+    sink = getattr(_output_capture, 'sink', None)
+    if sink is not None:
+        return sink.table(data)
+    if not PROFILER.enabled:
+        return st.dataframe(data, **kwargs)
+    df = data.data if hasattr(data, 'data') and isinstance(data.data, pd.DataFrame) else data
+    with PROFILER.span('st.dataframe', phase='serialize', rows=len(df)):
+        with _sent_bytes() as sent:
+            result = st.dataframe(data, **kwargs)
+        PROFILER.add(sent_bytes=sent[0])
+        return result
+
+
+def render_edges_input(label, default_edges, key):
+    """分段边界设置：输入内部边界（逗号分隔），首尾边界沿用默认值；输入无效时使用默认边界"""
+    default_text = ", ".join(f"{value:g}" for value in default_edges[1:-1])
+    with st.expander("⚙️ 分段设置"):
+        text = st.text_input(label, value=default_text, key=key)
+    edges = parse_edges(text or default_text, default_edges[0], default_edges[-1])
+    if edges is None:
+        st.warning("分段边界需为递增的数字，已使用默认分段")
+        return tuple(default_edges)
+    return edges
+
+
+def render_data_grid(grid, key, filters=None, filter_columns=('大区', '顾问编制')):
+    """分页表格：搜索、筛选、排序、列选择在服务端完成，只发送当前页
+
+    filters为固定的{列: 取值}筛选条件，filter_columns中的列提供下拉筛选。
+    """
+    filters = dict(filters or {})
+    searchable = [name for name in SEARCH_COLUMNS if name in grid.columns]
+    filter_columns = [name for name in filter_columns if name in grid.columns and name not in filters]
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        search = st.text_input(f"搜索{'/'.join(searchable)}", key=f"{key}_search",
+                               placeholder="输入关键字") if searchable else None
+    with col2:
+        sort_by = st.selectbox("排序列", options=["不排序"] + grid.columns, key=f"{key}_sort")
+    with col3:
+        ascending = st.selectbox("排序方式", options=["降序", "升序"], key=f"{key}_order") == "升序"
+
+    if filter_columns:
+        for column, col in zip(filter_columns, st.columns(len(filter_columns))):
+            with col:
+                options = grid.distinct(column, filters)
+                value = st.selectbox(f"筛选{column}", options=["全部"] + options, key=f"{key}_filter_{column}")
+                if value != "全部":
+                    filters[column] = value
+
+    columns = st.multiselect("显示列", options=grid.columns, default=grid.columns, key=f"{key}_columns")
+
+    positions = grid.select(search, filters, None if sort_by == "不排序" else sort_by, ascending)
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("每页行数", options=PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                 key=f"{key}_page_size")
+    with col2:
+        page = st.number_input("页码", min_value=1, value=1, step=1, key=f"{key}_page")
+
+    result = grid.page(positions, page, page_size, columns)
+    st.caption(f"共 {result.total_rows:,} 条，第 {result.page}/{result.page_count} 页")
+    _show_dataframe(result.data, use_container_width=True)
+    return result
+
+
 class NutritionAdviserDashboard:
-    def __init__(self):
+    def __init__(self, month_store=None, figure_cache=None, export_cache=None):
         """营养顾问绩效评估仪表板"""
         self.monthly_data = {}
         self.data_source = "github"  # 默认使用GitHub源
-
+        self.excel_cache = ColumnarCache(reader=read_excel_projected)  # Excel列式缓存（只含投影列）
+        self.month_store = month_store if month_store is not None else MonthStore()  # GitHub数据共享仓库
+        self._store_handle = self.month_store.attach(self)
+        self.max_workers = DEFAULT_MAX_WORKERS  # 并行解析进程数
+        self.month_table = MonthTable()  # 本会话独有月份（上传文件等）的列式表
+        self.adviser_index = AdviserIndex()  # 跨月份顾问索引
+        self.figure_cache = figure_cache if figure_cache is not None else FigureCache()  # 图表缓存
+        self.export_cache = export_cache if export_cache is not None else ExportCache()  # 导出文件缓存
+
+    @profiled()
     def load_from_github(self):
         """从GitHub仓库加载Excel文件"""
         try:
@@ -86,42 +308,31 @@ class NutritionAdviserDashboard:
 
             st.sidebar.success(f"✅ 从GitHub仓库找到 {len(excel_files)} 个Excel文件")
 
-            for file_path in excel_files:
-                try:
-                    # 从文件名提取月份信息
-                    filename = os.path.basename(file_path)
-
-                    if "利润模型评估报告_原始收益值_" in filename:
-                        date_str = filename.replace("利润模型评估报告_原始收益值_", "").replace(".xlsx", "")
-
-                        # 尝试解析日期
-                        try:
-                            file_date = datetime.strptime(date_str, "%Y%m")
-                            month_key = file_date.strftime("%Y年%m月")
-
-                            # 读取Excel文件
-                            df = pd.read_excel(file_path)
+            # 从文件名提取月份信息，跳过日期格式不正确的文件
+            reports, skipped = scan_reports(current_dir)
+            for filename in skipped:
+                st.sidebar.warning(f"文件名日期格式不正确 {filename}")
 
-                            # 添加月份标识列
-                            df['月份'] = month_key
-                            df['日期'] = file_date
-                            df['数据来源'] = 'GitHub仓库'
+            # 只解析共享仓库中缺失或文件已变化的月份，其他会话已加载的直接复用
+            if any(not self.month_store.is_current(month_key, signature)
+                   for month_key, (_, _, signature) in reports.items()):
+                progress = st.sidebar.progress(0.0, text="正在解析Excel文件...")
 
-                            # 存储数据
-                            self.monthly_data[month_key] = {
-                                'data': df,
-                                'date': file_date,
-                                'file_path': filename,
-                                'source': 'github'
-                            }
-
-                            st.sidebar.success(f"✅ 已加载: {month_key}")
+                def on_progress(result, done, total):
+                    progress.progress(done / total, text=f"已完成 {done}/{total}")
+                    if result.error:
+                        st.sidebar.error(f"加载文件失败 {result.name}: {result.error}")
+                    else:
+                        st.sidebar.success(f"✅ 已解析: {result.month_key}")
 
-                        except ValueError as e:
-                            st.sidebar.warning(f"文件名日期格式不正确 {filename}: {str(e)}")
+                refresh_month_store(self.month_store, reports, self.excel_cache, self.max_workers,
+                                    on_progress=on_progress, sketch_k=SKETCH_K)
 
-                except Exception as e:
-                    st.sidebar.error(f"加载文件失败 {file_path}: {str(e)}")
+            # 存储数据（共享仓库的零拷贝视图）
+            for month_key in sorted(reports, key=lambda key: reports[key][1]):
+                if month_key in self.month_store:
+                    self._set_month(month_key, self.month_store.view(month_key))
+                    st.sidebar.success(f"✅ 已加载: {month_key}")
 
             return len(excel_files) > 0
 
@@ -129,59 +340,121 @@ class NutritionAdviserDashboard:
             st.sidebar.error(f"从GitHub加载数据失败: {str(e)}")
             return False
 
+    @profiled()
     def load_from_upload(self, uploaded_files):
-        """从上传的文件加载数据"""
+        """从上传的文件加载数据：按文件内容哈希复用已解析的月份，只解析新增或变化的文件"""
         if not uploaded_files:
             return False
 
-        loaded_count = 0
-        for uploaded_file in uploaded_files:
-            try:
-                # 从文件名提取月份信息
-                filename = uploaded_file.name
-
-                # 提取月份
-                if "利润模型评估报告_原始收益值_" in filename:
-                    date_str = filename.replace("利润模型评估报告_原始收益值_", "").replace(".xlsx", "")
-                    try:
-                        file_date = datetime.strptime(date_str, "%Y%m")
-                        month_key = file_date.strftime("%Y年%m月")
-                    except:
-                        month_key = filename.replace(".xlsx", "")
-                else:
-                    month_key = filename.replace(".xlsx", "")
-
-                # 读取Excel文件
-                df = pd.read_excel(uploaded_file)
+        files = [(f.name, f.getvalue()) for f in uploaded_files]
+        hashes = {name: bytes_content_hash(content) for name, content in files}
 
-                # 添加月份标识列
-                df['月份'] = month_key
-                df['日期'] = datetime.now()
-                df['数据来源'] = '上传文件'
+        # 内容未变的月份直接复用，其余交给解析
+        reused, pending = {}, []
+        for name, content in files:
+            month_key, _ = parse_report_name(name)
+            entry = self.monthly_data.get(month_key)
+            if entry is not None and entry.get('source') == 'uploaded' and entry.get('content_hash') == hashes[name]:
+                reused[name] = entry
+            else:
+                pending.append((name, content))
 
-                # 存储数据
-                self.monthly_data[month_key] = {
-                    'data': df,
-                    'date': datetime.now(),
-                    'file_path': f"上传文件: {filename}",
-                    'source': 'uploaded'
-                }
+        results = {}
+        if pending:
+            progress = st.sidebar.progress(0.0, text=f"正在解析 {len(pending)} 个新增或变化的上传文件...")
 
-                loaded_count += 1
-                st.sidebar.success(f"✅ 已加载上传文件: {month_key} (共{len(df)}条记录)")
+            def on_progress(result, done, total):
+                progress.progress(done / total, text=f"已完成 {done}/{total}")
+                if result.error:
+                    st.sidebar.error(f"❌ 处理上传文件 {result.name} 时出错: {result.error}")
+                else:
+                    st.sidebar.success(f"✅ 已加载上传文件: {result.month_key} (共{len(result.data)}条记录)")
+
+            # 并行解析新增或变化的上传文件
+            for result in ingest_files(pending, max_workers=self.max_workers, on_progress=on_progress):
+                results[result.name] = result
+        if reused:
+            st.sidebar.info(f"♻️ {len(reused)} 个上传文件内容未变化，已复用解析结果")
+
+        # 本次上传中没有的月份（包括其他数据源的月份）移除，结果与重新加载全部上传文件一致
+        loaded = {}
+        for name in sorted(hashes, key=report_sort_key):
+            if name in reused:
+                entry = reused[name]
+                month_key = entry['month']
+            else:
+                result = results[name]
+                if result.error:
+                    continue
+                # 规范化为紧凑类型后写入本会话的列式表；月份、日期、来源作为月份级元数据保存，不再逐行重复
+                month_key = result.month_key
+                df = self.month_table.put(month_key, normalize_month_frame(result.data, self.month_store.categories))
+                entry = build_month_entry(
+                    df,
+                    sketch_k=SKETCH_K,
+                    table=self.month_table,
+                    month=month_key,
+                    file_path=f"上传文件: {name}",
+                    source='uploaded',
+                    content_hash=hashes[name]
+                )
+            # 复用的月份保留数据版本号，各类缓存继续有效
+            loaded[month_key] = dict(entry, date=datetime.now())
 
-            except Exception as e:
-                st.sidebar.error(f"❌ 处理上传文件 {uploaded_file.name} 时出错: {str(e)}")
+        for month_key in [month_key for month_key in self.monthly_data if month_key not in loaded]:
+            self.remove_month(month_key)
+        for month_key, entry in loaded.items():
+            self._set_month(month_key, entry)
 
-        return loaded_count > 0
+        return len(loaded) > 0
 
     def set_data_source(self, source):
         """设置数据源"""
         self.data_source = source
 
+    def _set_month(self, month_key, entry):
+        """新增或替换一个月份，同时增量更新跨月份顾问索引"""
+        entry.setdefault('version', next_data_version())
+        if entry.get('table') is None:
+            # 不是从列式表取出的数据写入本会话的列式表，跨月份汇总统一在表上完成
+            entry['data'] = self.month_table.put(month_key, entry['data'])
+            entry['table'] = self.month_table
+        self.monthly_data[month_key] = entry
+        self.adviser_index.update(month_key, entry['date'], entry['data'], self.get_ranking_index(month_key))
+
+    def sync_with_store(self):
+        """把共享仓库中已更新或已移除的GitHub月份同步到本会话，返回是否有变化"""
+        changed = False
+        for month_key, entry in list(self.monthly_data.items()):
+            if entry.get('source') != 'github':
+                continue
+            version = self.month_store.version(month_key)
+            if self.month_store.is_removed(month_key):
+                self.remove_month(month_key)
+                changed = True
+            elif version is not None and version != entry.get('version'):
+                self._set_month(month_key, self.month_store.view(month_key))
+                changed = True
+        # 仓库中新增的月份
+        if self.monthly_data and all(entry.get('source') == 'github' for entry in self.monthly_data.values()):
+            for month_key in self.month_store.months():
+                if month_key not in self.monthly_data:
+                    self._set_month(month_key, self.month_store.view(month_key))
+                    changed = True
+        return changed
+
+    def remove_month(self, month_key):
+        """移除一个月份，同时更新本会话列式表与跨月份顾问索引"""
+        entry = self.monthly_data.pop(month_key, None)
+        if entry is not None and entry.get('table') is self.month_table:
+            self.month_table.remove(month_key)
+        self.adviser_index.remove(month_key)
+
     def clear_data(self):
         """清空数据"""
         self.monthly_data = {}
+        self.month_table.clear()
+        self.adviser_index.clear()
 
     def get_available_months(self):
         """获取可用的月份列表"""
@@ -193,7 +466,139 @@ class NutritionAdviserDashboard:
 
     def get_month_data(self, month):
         """获取指定月份的数据"""
-        return self.monthly_data.get(month, {}).get('data', pd.DataFrame())
+        df = self.monthly_data.get(month, {}).get('data', pd.DataFrame())
+        PROFILER.add(rows=len(df))
+        return df
+
+    def get_month_cube(self, month):
+        """获取指定月份的聚合立方体（加载时预先构建）"""
+        entry = self.monthly_data.get(month)
+        if entry is None:
+            return MonthCube.build(pd.DataFrame())
+        if 'cube' not in entry:
+            entry['cube'] = MonthCube.build(entry['data'], sketch_k=SKETCH_K)
+        return entry['cube']
+
+    def _is_month_frame(self, df, month):
+        """df是否就是已加载月份的数据本身（而不是筛选后的子集或其他来源的数据）"""
+        entry = self.monthly_data.get(month)
+        return entry is not None and df is entry['data']
+
+    def _cube_for(self, df, month=None):
+        """图表使用的聚合立方体：df为已加载月份的数据时读取预建立方体，否则由df临时构建"""
+        if self._is_month_frame(df, month):
+            return self.get_month_cube(month)
+        return MonthCube.build(df, sketch_k=SKETCH_K)
+
+    def get_ranking_index(self, month):
+        """获取指定月份的排名索引（加载时预先构建）"""
+        entry = self.monthly_data.get(month)
+        if entry is None:
+            return RankingIndex(pd.DataFrame())
+        if 'ranking' not in entry:
+            entry['ranking'] = RankingIndex(entry['data'])
+        return entry['ranking']
+
+    def _ranking_for(self, df, month=None):
+        """排名使用的索引：df为已加载月份的数据时读取预建索引，否则由df临时构建"""
+        if self._is_month_frame(df, month):
+            return self.get_ranking_index(month)
+        return RankingIndex(df)
+
+    def get_data_grid(self, month):
+        """获取指定月份的分页表格，按(月份, 数据版本)跨会话共享"""
+        version = self.get_month_version(month)
+        if version is None:
+            return DataGrid(self.get_month_data(month))
+        return _data_grid(month, version, self.get_month_data(month))
+
+    def get_month_version(self, month):
+        """获取指定月份的数据版本号"""
+        return self.monthly_data.get(month, {}).get('version')
+
+    def _cached_version(self, month, df):
+        """缓存使用的数据版本：给出的df不是该月份的数据本身时为None（不使用缓存）"""
+        if df is not None and not self._is_month_frame(df, month):
+            return None
+        return self.get_month_version(month)
+
+    def _cached_figure(self, month, view, params, builder, df=None):
+        """按(月份, 数据版本, 视图, 参数)读取缓存图表，未命中时调用builder构建；
+        图表由df绘制而df不是该月份的数据本身时不使用缓存"""
+        version = self._cached_version(month, df)
+        if version is None:
+            with PROFILER.span(view, phase='figure'):
+                return builder()
+        with PROFILER.span(view, phase='figure'):
+            return self.figure_cache.get_or_build((month, version, view, params), builder)
+
+    def _cached_analysis(self, month, name, params, compute, df=None):
+        """按(月份, 数据版本, 分析, 参数)读取缓存的分析结果，未命中时调用compute计算；
+        结果由df计算而df不是该月份的数据本身时不使用缓存"""
+        version = self._cached_version(month, df)
+        with PROFILER.span(name, phase='compute'):
+            if version is None:
+                return compute()
+            return _analysis_result(name, (month, version, params), compute)
+
+    def get_month_trend(self, month):
+        """单个月份的趋势汇总（总体、各顾问编制的count、sum、mean），按(月份, 数据版本)缓存
+
+        只读取该月在列式表中的分区；新增或替换一个月份时，其他月份的汇总直接命中缓存。
+        """
+        entry = self.monthly_data[month]
+        table = entry.get('table')
+
+        def compute():
+            if table is None:
+                empty = pd.DataFrame(columns=['count', 'sum', 'mean'])
+                return empty, empty
+            return (table.aggregate('最终收益值', months=[month]),
+                    table.aggregate('最终收益值', by='顾问编制', months=[month]))
+
+        return _analysis_result('month_trend', (month, entry.get('version')), compute)
+
+    def get_trend_table(self):
+        """多月份趋势表：由各月份缓存的汇总行拼接，只有新增或变化的月份需要重新汇总"""
+        dates = {month_key: entry['date'] for month_key, entry in self.monthly_data.items()}
+        key = tuple(sorted((month_key, entry.get('version'), dates[month_key])
+                           for month_key, entry in self.monthly_data.items()))
+
+        def compute():
+            rows = [self.get_month_trend(month_key) for month_key in self.monthly_data]
+            overall = [row[0] for row in rows if not row[0].empty]
+            by_type = [row[1] for row in rows if not row[1].empty]
+            return trend_table(pd.concat(overall) if overall else pd.DataFrame(columns=['mean']),
+                               pd.concat(by_type) if by_type else pd.DataFrame(columns=['mean']), dates)
+
+        with PROFILER.span('trend_table', phase='compute'):
+            return _analysis_result('trend_table', key, compute)
+
+    def get_export_frame(self, month, region=None):
+        """导出用的月度数据：可按大区筛选，并附加月份、日期、数据来源列"""
+        entry = self.monthly_data.get(month)
+        if entry is None:
+            return pd.DataFrame()
+        df = entry['data']
+        if region is not None and '大区' in df.columns:
+            df = df[df['大区'] == region]
+        return df.assign(**{
+            '月份': month,
+            '日期': entry['date'],
+            '数据来源': SOURCE_LABELS.get(entry.get('source'), "未知")
+        })
+
+    def export_month(self, month, fmt, region=None):
+        """生成单月导出文件，按(月份, 数据版本, 格式, 筛选条件)缓存"""
+        key = ((month,), (self.get_month_version(month),), fmt, region)
+        return self.export_cache.get_or_build(key, lambda: export_frame(self.get_export_frame(month, region), fmt))
+
+    def export_months(self, months, fmt):
+        """把多个月份打包为一个zip文件，按月份及其数据版本缓存"""
+        months = tuple(months)
+        key = (months, tuple(self.get_month_version(month) for month in months), fmt, None)
+        return self.export_cache.get_or_build(key, lambda: export_bundle(
+            [(f"营养顾问数据_{month}", self.get_export_frame(month)) for month in months], fmt))
 
     def get_previous_month(self, current_month):
         """获取上一个月份的数据"""
@@ -206,6 +611,7 @@ class NutritionAdviserDashboard:
             return months[current_index + 1]  # 因为是倒序排列
         return None
 
+    @profiled()
     def create_member_value_analysis(self, selected_month):
         """创建会员价值贡献分析"""
         st.header(f"📈 会员价值贡献分析 - {selected_month}")
@@ -216,228 +622,224 @@ class NutritionAdviserDashboard:
             st.warning("当月数据中没有会员价值贡献或大区信息")
             return
 
+        # 获取上月数据
+        previous_month = self.get_previous_month(selected_month)
+        previous_cube = None
+        if previous_month:
+            previous_month_data = self.get_month_data(previous_month)
+            if not previous_month_data.empty and '会员价值贡献' in previous_month_data.columns and '大区' in previous_month_data.columns:
+                previous_cube = self.get_month_cube(previous_month)
+
+        # 对比结果同时依赖上月数据版本
+        compare_params = (previous_month, self.get_month_version(previous_month)) if previous_cube is not None else ()
+        current_cube = self.get_month_cube(selected_month)
+        analysis = self._cached_analysis(selected_month, 'member_value', compare_params,
+                                         lambda: member_value_analysis(current_cube, previous_cube))
+
         # 功能1: 各区域会员价值贡献总量柱状图
         st.subheader("1. 各区域会员价值贡献总量")
 
-        # 计算各区域会员价值贡献总量
-        region_member_value = current_month_data.groupby('大区')['会员价值贡献'].sum().reset_index()
-        region_member_value = region_member_value.sort_values('会员价值贡献', ascending=True)
+        def build_fig1():
+            # 创建柱状图
+            fig1 = px.bar(
+                analysis.region_totals,
+                y='大区',
+                x='会员价值贡献',
+                orientation='h',
+                title=f"{selected_month} 各区域会员价值贡献总量",
+                color='会员价值贡献',
+                color_continuous_scale='Viridis',
+                text_auto='.0f'
+            )
+            fig1.update_layout(
+                yaxis_title="大区",
+                xaxis_title="会员价值贡献总量（元）",
+                height=500
+            )
+            return fig1
 
-        # 创建柱状图
-        fig1 = px.bar(
-            region_member_value,
-            y='大区',
-            x='会员价值贡献',
-            orientation='h',
-            title=f"{selected_month} 各区域会员价值贡献总量",
-            color='会员价值贡献',
-            color_continuous_scale='Viridis',
-            text_auto='.0f'
-        )
-        fig1.update_layout(
-            yaxis_title="大区",
-            xaxis_title="会员价值贡献总量（元）",
-            height=500
-        )
-        st.plotly_chart(fig1, use_container_width=True)
+        fig1 = self._cached_figure(selected_month, 'member_value_total', (), build_fig1)
+        _plotly_chart(fig1, use_container_width=True)
 
         # 显示详细数据
         st.subheader("各区域会员价值贡献详细数据")
 
-        # 计算各区域的统计指标
-        region_stats = current_month_data.groupby('大区').agg({
-            '会员价值贡献': ['sum', 'mean', 'count']
-        }).round(0)
+        # 格式化显示（保持数值类型）
+        _show_dataframe(analysis.region_stats, use_container_width=True,
+                        column_config=number_columns({'贡献总量': CURRENCY, '人均贡献': CURRENCY}))
 
-        region_stats.columns = ['贡献总量', '人均贡献', '顾问人数']
-        region_stats = region_stats.reset_index()
-        region_stats = region_stats.sort_values('贡献总量', ascending=False)
+        # 功能2: 当月与上月各区域会员价值贡献对比
+        st.subheader("2. 当月与上月各区域会员价值贡献对比")
 
-        # 添加排名
-        region_stats['排名'] = range(1, len(region_stats) + 1)
-        region_stats = region_stats[['排名', '大区', '贡献总量', '人均贡献', '顾问人数']]
+        if not previous_month:
+            st.info("没有上月数据可用于对比分析")
+            return
+        if analysis.comparison is None:
+            st.warning(f"上月({previous_month})数据中没有会员价值贡献或大区信息")
+            return
 
-        # 格式化显示
-        region_stats['贡献总量'] = region_stats['贡献总量'].apply(lambda x: f"¥{x:,.0f}")
-        region_stats['人均贡献'] = region_stats['人均贡献'].apply(lambda x: f"¥{x:,.0f}")
+        result = analysis.comparison
+        comparison = result.table
+
+        def build_fig2():
+            # 创建变化量柱状图
+            fig2 = px.bar(
+                comparison,
+                x='大区',
+                y='变化量',
+                title=f"{selected_month} 与 {previous_month} 各区域会员价值贡献变化量",
+                color='变化量',
+                color_continuous_scale='RdYlGn',
+                text_auto='+.0f'
+            )
+            fig2.update_layout(
+                xaxis_title="大区",
+                yaxis_title="变化量（元）",
+                height=400
+            )
+            fig2.update_traces(texttemplate='%{y:+,.0f}元')
+            return fig2
+
+        fig2 = self._cached_figure(selected_month, 'member_value_change', compare_params, build_fig2)
+        _plotly_chart(fig2, use_container_width=True)
+
+        def build_fig3():
+            # 创建变化百分比柱状图
+            fig3 = px.bar(
+                comparison,
+                x='大区',
+                y='变化百分比',
+                title=f"{selected_month} 与 {previous_month} 各区域会员价值贡献变化百分比",
+                color='变化百分比',
+                color_continuous_scale='RdYlGn',
+                text_auto='+.1f'
+            )
+            fig3.update_layout(
+                xaxis_title="大区",
+                yaxis_title="变化百分比 (%)",
+                height=400
+            )
+            fig3.update_traces(texttemplate='%{y:+.1f}%')
+            return fig3
 
-        st.dataframe(region_stats, use_container_width=True)
+        fig3 = self._cached_figure(selected_month, 'member_value_change_pct', compare_params, build_fig3)
+        _plotly_chart(fig3, use_container_width=True)
 
-        # 功能2: 当月与上月各区域会员价值贡献对比
-        st.subheader("2. 当月与上月各区域会员价值贡献对比")
+        # 创建对比折线图
+        st.subheader("各区域会员价值贡献趋势对比")
 
-        # 获取上月数据
-        previous_month = self.get_previous_month(selected_month)
+        def build_fig4():
+            # 准备数据：每个大区依次为上月、当月两个点
+            trend_df = pd.DataFrame({
+                '大区': np.repeat(comparison['大区'].to_numpy(), 2),
+                '贡献值': comparison[['上月贡献', '当月贡献']].to_numpy().ravel(),
+                '月份': np.tile([previous_month, selected_month], len(comparison))
+            })
 
-        if previous_month:
-            previous_month_data = self.get_month_data(previous_month)
+            # 创建折线图
+            fig4 = px.line(
+                trend_df,
+                x='月份',
+                y='贡献值',
+                color='大区',
+                markers=True,
+                title=f"各区域会员价值贡献趋势对比 ({previous_month} → {selected_month})",
+                line_shape='spline'
+            )
+            fig4.update_layout(
+                xaxis_title="月份",
+                yaxis_title="会员价值贡献（元）",
+                height=500,
+                legend_title="大区"
+            )
+            return fig4
 
-            if not previous_month_data.empty and '会员价值贡献' in previous_month_data.columns and '大区' in previous_month_data.columns:
-                # 计算当月各区域会员价值贡献总量
-                current_summary = current_month_data.groupby('大区')['会员价值贡献'].sum().reset_index()
-                current_summary.columns = ['大区', '当月贡献']
-
-                # 计算上月各区域会员价值贡献总量
-                previous_summary = previous_month_data.groupby('大区')['会员价值贡献'].sum().reset_index()
-                previous_summary.columns = ['大区', '上月贡献']
-
-                # 合并数据
-                comparison = pd.merge(current_summary, previous_summary, on='大区', how='outer')
-                comparison = comparison.fillna(0)
-
-                # 计算变化量和变化百分比
-                comparison['变化量'] = comparison['当月贡献'] - comparison['上月贡献']
-                comparison['变化百分比'] = (comparison['变化量'] / comparison['上月贡献'] * 100).round(1)
-                comparison = comparison.fillna(0)
-
-                # 创建变化量柱状图
-                fig2 = px.bar(
-                    comparison,
-                    x='大区',
-                    y='变化量',
-                    title=f"{selected_month} 与 {previous_month} 各区域会员价值贡献变化量",
-                    color='变化量',
-                    color_continuous_scale='RdYlGn',
-                    text_auto='+.0f'
-                )
-                fig2.update_layout(
-                    xaxis_title="大区",
-                    yaxis_title="变化量（元）",
-                    height=400
-                )
-                fig2.update_traces(texttemplate='%{y:+,.0f}元')
-                st.plotly_chart(fig2, use_container_width=True)
-
-                # 创建变化百分比柱状图
-                fig3 = px.bar(
-                    comparison,
-                    x='大区',
-                    y='变化百分比',
-                    title=f"{selected_month} 与 {previous_month} 各区域会员价值贡献变化百分比",
-                    color='变化百分比',
-                    color_continuous_scale='RdYlGn',
-                    text_auto='+.1f'
-                )
-                fig3.update_layout(
-                    xaxis_title="大区",
-                    yaxis_title="变化百分比 (%)",
-                    height=400
-                )
-                fig3.update_traces(texttemplate='%{y:+.1f}%')
-                st.plotly_chart(fig3, use_container_width=True)
-
-                # 创建对比折线图
-                st.subheader("各区域会员价值贡献趋势对比")
-
-                # 准备数据
-                trend_data = []
-                for _, row in comparison.iterrows():
-                    trend_data.append({
-                        '大区': row['大区'],
-                        '贡献值': row['上月贡献'],
-                        '月份': previous_month
-                    })
-                    trend_data.append({
-                        '大区': row['大区'],
-                        '贡献值': row['当月贡献'],
-                        '月份': selected_month
-                    })
-
-                trend_df = pd.DataFrame(trend_data)
-
-                # 创建折线图
-                fig4 = px.line(
-                    trend_df,
-                    x='月份',
-                    y='贡献值',
-                    color='大区',
-                    markers=True,
-                    title=f"各区域会员价值贡献趋势对比 ({previous_month} → {selected_month})",
-                    line_shape='spline'
-                )
-                fig4.update_layout(
-                    xaxis_title="月份",
-                    yaxis_title="会员价值贡献（元）",
-                    height=500,
-                    legend_title="大区"
-                )
-                st.plotly_chart(fig4, use_container_width=True)
-
-                # 显示详细对比数据
-                st.subheader("详细对比数据")
-
-                # 格式化显示
-                display_comparison = comparison.copy()
-                display_comparison['当月贡献'] = display_comparison['当月贡献'].apply(lambda x: f"¥{x:,.0f}")
-                display_comparison['上月贡献'] = display_comparison['上月贡献'].apply(lambda x: f"¥{x:,.0f}")
-                display_comparison['变化量'] = display_comparison['变化量'].apply(lambda x: f"¥{x:+,.0f}")
-                display_comparison['变化百分比'] = display_comparison['变化百分比'].apply(lambda x: f"{x:+.1f}%")
-
-                # 添加颜色标记函数
-                def color_style(val):
-                    if isinstance(val, str):
-                        if '¥+' in val or '¥0' in val:
-                            return 'color: green; font-weight: bold'
-                        elif '¥-' in val:
-                            return 'color: red; font-weight: bold'
-                    if isinstance(val, str) and '%' in val:
-                        try:
-                            num = float(val.replace('%', '').replace('+', ''))
-                            if num > 0:
-                                return 'color: green; font-weight: bold'
-                            elif num < 0:
-                                return 'color: red; font-weight: bold'
-                        except:
-                            pass
-                    return ''
-
-                # 应用样式
-                styled_df = display_comparison.style.applymap(color_style, subset=['变化量', '变化百分比'])
-                st.dataframe(styled_df, use_container_width=True)
-
-                # 显示关键发现
-                st.subheader("💡 关键发现")
-
-                # 找出增长最快和下降最多的区域
-                if not comparison.empty:
-                    # 增长最快的区域
-                    top_growth = comparison.nlargest(1, '变化百分比')
-                    if not top_growth.empty:
-                        top_region = top_growth.iloc[0]['大区']
-                        top_growth_pct = top_growth.iloc[0]['变化百分比']
-                        top_growth_val = top_growth.iloc[0]['变化量']
-
-                        st.success(
-                            f"**增长最快**: {top_region} 区域会员价值贡献增长 {top_growth_pct:.1f}% (¥{top_growth_val:+,.0f})")
-
-                    # 下降最多的区域
-                    bottom_growth = comparison.nsmallest(1, '变化百分比')
-                    if not bottom_growth.empty and bottom_growth.iloc[0]['变化百分比'] < 0:
-                        bottom_region = bottom_growth.iloc[0]['大区']
-                        bottom_growth_pct = bottom_growth.iloc[0]['变化百分比']
-                        bottom_growth_val = bottom_growth.iloc[0]['变化量']
-
-                        st.error(
-                            f"**需关注**: {bottom_region} 区域会员价值贡献下降 {abs(bottom_growth_pct):.1f}% (¥{bottom_growth_val:+,.0f})")
-
-                    # 计算总体变化
-                    total_current = current_summary['当月贡献'].sum()
-                    total_previous = previous_summary['上月贡献'].sum()
-                    total_change = total_current - total_previous
-                    total_change_pct = (total_change / total_previous * 100) if total_previous != 0 else 0
-
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("当月总贡献", f"¥{total_current:,.0f}")
-                    with col2:
-                        st.metric("上月总贡献", f"¥{total_previous:,.0f}")
-                    with col3:
-                        st.metric("总体变化", f"{total_change_pct:+.1f}%", f"¥{total_change:+,.0f}")
-            else:
-                st.warning(f"上月({previous_month})数据中没有会员价值贡献或大区信息")
-        else:
-            st.info("没有上月数据可用于对比分析")
+        fig4 = self._cached_figure(selected_month, 'member_value_trend', compare_params, build_fig4)
+        _plotly_chart(fig4, use_container_width=True)
+
+        # 显示详细对比数据
+        st.subheader("详细对比数据")
+
+        # 格式化显示：变化量、变化百分比按正负号着色
+        formats = {'当月贡献': CURRENCY, '上月贡献': CURRENCY, '变化量': SIGNED_CURRENCY, '变化百分比': SIGNED_PERCENT}
+        styled_df = style_signs(comparison, ['变化量', '变化百分比'], formats, zero_positive=('变化量',))
+        _show_dataframe(styled_df, use_container_width=True, column_config=number_columns(formats))
+
+        # 显示关键发现
+        st.subheader("💡 关键发现")
+
+        if not comparison.empty:
+            # 增长最快的区域
+            if result.top_growth is not None:
+                st.success(
+                    f"**增长最快**: {result.top_growth['大区']} 区域会员价值贡献增长 "
+                    f"{result.top_growth['变化百分比']:.1f}% (¥{result.top_growth['变化量']:+,.0f})")
+
+            # 下降最多的区域
+            if result.bottom_decline is not None:
+                st.error(
+                    f"**需关注**: {result.bottom_decline['大区']} 区域会员价值贡献下降 "
+                    f"{abs(result.bottom_decline['变化百分比']):.1f}% (¥{result.bottom_decline['变化量']:+,.0f})")
+
+            # 总体变化
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                _metric("当月总贡献", f"¥{result.total_current:,.0f}")
+            with col2:
+                _metric("上月总贡献", f"¥{result.total_previous:,.0f}")
+            with col3:
+                _metric("总体变化", f"{result.total_change_pct:+.1f}%", f"¥{result.total_change:+,.0f}")
 
+        self.create_month_over_month_section(selected_month, previous_month)
+
+    def create_month_over_month_section(self, selected_month, previous_month):
+        """任意指标、任意维度的环比对比：所有指标一次计算，切换指标只是取列"""
+        st.subheader("📊 各指标环比对比")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            by = st.selectbox("对比维度", COMPARISON_DIMENSIONS, key="mom_dimension")
+        with col2:
+            stat = st.selectbox("统计口径", list(COMPARISON_STATS), format_func=COMPARISON_STATS.get,
+                                key="mom_stat")
+
+        current_cube = self.get_month_cube(selected_month)
+        previous_cube = self.get_month_cube(previous_month)
+        current_data = self.get_month_data(selected_month)
+        previous_data = self.get_month_data(previous_month)
+        if by not in current_data.columns or by not in previous_data.columns:
+            st.warning(f"数据中没有{by}信息")
+            return
+
+        params = (previous_month, self.get_month_version(previous_month), by, stat)
+        result = self._cached_analysis(selected_month, 'month_over_month', params, lambda: month_over_month(
+            current_cube, previous_cube, by, stat=stat, df=current_data, previous_df=previous_data))
+        if not result.metrics:
+            st.warning("两个月份没有共同的指标")
+            return
+
+        value_format = (COUNT, SIGNED_COUNT) if stat == 'count' else (CURRENCY, SIGNED_CURRENCY)
+
+        # 全部指标的整体变化
+        totals = result.totals()
+        formats = {'当月': value_format[0], '上月': value_format[0], '变化量': value_format[1],
+                   '变化百分比': SIGNED_PERCENT}
+        _show_dataframe(style_signs(totals, ['变化量', '变化百分比'], formats), use_container_width=True,
+                        column_config=number_columns(formats))
+
+        # 单个指标在各维度取值上的变化
+        metric = st.selectbox("指标", result.metrics, key="mom_metric")
+        table = result.table(metric).sort_values('变化量', ascending=False)
+        if len(table) > 2 * MOM_DISPLAY_ROWS:
+            # 取值很多时（如门店）只发送增长、下降最多的部分
+            st.caption(f"共 {len(table):,} 个{by}，显示变化量最大和最小的各 {MOM_DISPLAY_ROWS} 个")
+            table = pd.concat([table.head(MOM_DISPLAY_ROWS), table.tail(MOM_DISPLAY_ROWS)])
+        formats = {f'当月{metric}': value_format[0], f'上月{metric}': value_format[0], '变化量': value_format[1],
+                   '变化百分比': SIGNED_PERCENT}
+        _show_dataframe(style_signs(table, ['变化量', '变化百分比'], formats), use_container_width=True,
+                        column_config=number_columns(formats))
+
+    @profiled()
     def create_overview_dashboard(self, selected_month):
         """创建概览仪表板"""
         st.header(f"📊📊 营养顾问绩效评估概览 - {selected_month}")
@@ -450,39 +852,29 @@ class NutritionAdviserDashboard:
         # 显示数据来源
         if selected_month in self.monthly_data:
             data_source_info = self.monthly_data[selected_month]
-            source_type = data_source_info.get('source', 'unknown')
-            if source_type == 'github':
-                data_source = "GitHub仓库"
-            elif source_type == 'uploaded':
-                data_source = "上传文件"
-            else:
-                data_source = "未知"
+            data_source = SOURCE_LABELS.get(data_source_info.get('source'), "未知")
             st.caption(f"📁📁 数据来源: {data_source}")
 
         # 关键指标卡片 - 将"收益"改为"人效价值"
+        cube = self.get_month_cube(selected_month)
+        stats = self._cached_analysis(selected_month, 'overview', (), lambda: overview_stats(df, cube))
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            total_advisers = len(df)
-            st.metric("总评估人数", f"{total_advisers}人")
+            _metric("总评估人数", f"{stats.total_advisers}人")
 
         with col2:
-            avg_profit = df['最终收益值'].mean() if '最终收益值' in df.columns else 0
-            st.metric("平均人效价值", f"¥{avg_profit:,.0f}")  # 修改这里
+            _metric("平均人效价值", f"¥{stats.avg_profit:,.0f}")  # 修改这里
 
         with col3:
-            total_profit = df['最终收益值'].sum() if '最终收益值' in df.columns else 0
-            st.metric("总人效价值", f"¥{total_profit:,.0f}")  # 修改这里
+            _metric("总人效价值", f"¥{stats.total_profit:,.0f}")  # 修改这里
 
         with col4:
-            # 计算高绩效顾问比例（收益前20%）
-            if '最终收益值' in df.columns and len(df) > 0:
-                threshold = df['最终收益值'].quantile(0.8)
-                high_performers = len(df[df['最终收益值'] >= threshold])
-                percentage = (high_performers / len(df)) * 100
-                st.metric("高绩效顾问比例", f"{percentage:.1f}%")
+            # 高绩效顾问比例（收益前20%）
+            if stats.high_performer_pct is not None:
+                _metric("高绩效顾问比例", f"{stats.high_performer_pct:.1f}%")
             else:
-                st.metric("高绩效顾问比例", "0%")
+                _metric("高绩效顾问比例", "0%")
 
         # 第一行：人效价值分布和顾问类型分析
         col1, col2 = st.columns(2)
@@ -505,6 +897,7 @@ class NutritionAdviserDashboard:
             else:
                 st.info("需要多个月份数据才能显示趋势分析")
 
+    @profiled()
     def create_profit_distribution_chart(self, df, month):
         """创建人效价值分布图表"""  # 修改标题注释
         st.subheader("📈📈 人效价值分布情况")  # 修改这里
@@ -514,35 +907,35 @@ class NutritionAdviserDashboard:
             return
 
         # 人效价值分段  # 修改这里
-        profit_bins = [-float('inf'), 0, 10000, 50000, 100000, 200000, float('inf')]
-        profit_labels = ['亏损(<0)', '低人效价值(0-1万)', '中低人效价值(1-5万)',  # 修改这里
-                         '中人效价值(5-10万)', '中高人效价值(10-20万)', '高人效价值(>20万)']  # 修改这里
-
-        df_copy = df.copy()
-        df_copy['人效价值分段'] = pd.cut(df_copy['最终收益值'], bins=profit_bins, labels=profit_labels)  # 修改这里
-        distribution = df_copy['人效价值分段'].value_counts().reindex(profit_labels)  # 修改这里
-
-        # 创建饼图
-        fig = px.pie(
-            values=distribution.values,
-            names=distribution.index,
-            title=f"{month} 人效价值分布",  # 修改这里
-            color_discrete_sequence=px.colors.sequential.RdBu
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        fig.update_layout(showlegend=False, height=400)
+        edges = render_edges_input("人效价值分段边界（元）", PROFIT_BINS, key="profit_edges")
+        result = self._cached_analysis(month, 'profit_distribution', (edges,),
+                                       lambda: profit_distribution(df, self._cube_for(df, month), edges), df=df)
+
+        def build_figure():
+            # 创建饼图
+            fig = px.pie(
+                values=result.distribution.values,
+                names=result.distribution.index,
+                title=f"{month} 人效价值分布",  # 修改这里
+                color_discrete_sequence=px.colors.sequential.RdBu
+            )
+            fig.update_traces(textposition='inside', textinfo='percent+label')
+            fig.update_layout(showlegend=False, height=400)
+            return fig
 
-        st.plotly_chart(fig, use_container_width=True)
+        fig = self._cached_figure(month, 'profit_distribution', (edges,), build_figure, df=df)
+        _plotly_chart(fig, use_container_width=True)
 
         # 显示统计信息
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("最高人效价值", f"¥{df['最终收益值'].max():,.0f}")  # 修改这里
+            _metric("最高人效价值", f"¥{result.maximum:,.0f}")  # 修改这里
         with col2:
-            st.metric("中位数", f"¥{df['最终收益值'].median():,.0f}")
+            _metric("中位数", f"¥{result.median:,.0f}")
         with col3:
-            st.metric("最低人效价值", f"¥{df['最终收益值'].min():,.0f}")  # 修改这里
+            _metric("最低人效价值", f"¥{result.minimum:,.0f}")  # 修改这里
 
+    @profiled()
     def create_adviser_type_chart(self, df, month):
         """创建顾问类型分析图表 - 简化版本，只显示平均人效价值图表"""  # 修改标题注释
         st.subheader("👥👥 各类型顾问表现")
@@ -551,40 +944,39 @@ class NutritionAdviserDashboard:
             st.warning("缺少必要的数据列")
             return
 
-        # 按顾问类型分组统计
-        type_stats = df.groupby('顾问编制').agg({
-            '最终收益值': ['count', 'mean', 'median', 'std']
-        }).round(0)
-
-        # 简化列名
-        type_stats.columns = ['人数', '平均人效价值', '中位人效价值', '标准差']  # 修改这里
-        type_stats = type_stats.reset_index()
+        # 按顾问类型分组统计（读取预聚合立方体）
+        type_stats = self._cached_analysis(month, 'adviser_type', (),
+                                           lambda: adviser_type_stats(self._cube_for(df, month)), df=df).table
 
         # 创建柱状图
-        fig = px.bar(
-            type_stats,
-            x='顾问编制',
-            y='平均人效价值',  # 修改这里
-            title=f"{month} 各类型顾问平均人效价值",  # 修改这里
-            color='平均人效价值',  # 修改这里
-            color_continuous_scale='Viridis',
-            text_auto='.0f'
-        )
-        fig.update_layout(
-            xaxis_title="顾问类型",
-            yaxis_title="平均人效价值（元）",  # 修改这里
-            height=400
-        )
+        def build_figure():
+            fig = px.bar(
+                type_stats,
+                x='顾问编制',
+                y='平均人效价值',  # 修改这里
+                title=f"{month} 各类型顾问平均人效价值",  # 修改这里
+                color='平均人效价值',  # 修改这里
+                color_continuous_scale='Viridis',
+                text_auto='.0f'
+            )
+            fig.update_layout(
+                xaxis_title="顾问类型",
+                yaxis_title="平均人效价值（元）",  # 修改这里
+                height=400
+            )
+            return fig
 
-        st.plotly_chart(fig, use_container_width=True)
+        fig = self._cached_figure(month, 'adviser_type', (), build_figure, df=df)
+        _plotly_chart(fig, use_container_width=True)
 
         # 显示简单统计表
         st.subheader("各类型顾问基本统计")
         display_stats = type_stats[['顾问编制', '人数', '平均人效价值']]  # 修改这里
         display_stats.columns = ['顾问类型', '人数', '平均人效价值(元)']  # 修改这里
-        display_stats['平均人效价值(元)'] = display_stats['平均人效价值(元)'].apply(lambda x: f"¥{x:,.0f}")  # 修改这里
-        st.dataframe(display_stats, use_container_width=True)
+        _show_dataframe(display_stats, use_container_width=True,
+                        column_config=number_columns({'平均人效价值(元)': CURRENCY}))
 
+    @profiled()
     def create_region_analysis_chart(self, df, month):
         """创建大区分析图表 - 简化版本"""
         st.subheader("🌍🌍 大区绩效分析")
@@ -593,66 +985,65 @@ class NutritionAdviserDashboard:
             st.warning("缺少大区数据")
             return
 
-        # 按大区分组统计
-        region_stats = df.groupby('大区').agg({
-            '最终收益值': ['mean', 'count']
-        }).round(0)
-
-        region_stats.columns = ['平均人效价值', '顾问人数']  # 修改这里
-        region_stats = region_stats.reset_index()
+        # 按大区分组统计，按平均人效价值排序（读取预聚合立方体）
+        performance = self._cached_analysis(month, 'region_analysis', (),
+                                            lambda: region_performance(self._cube_for(df, month)), df=df)
+        region_stats = performance.table
 
         if len(region_stats) == 0:
             st.warning("没有大区数据可显示")
             return
 
-        # 按平均人效价值排序  # 修改这里
-        region_stats = region_stats.sort_values('平均人效价值', ascending=True)  # 修改这里
-
         # 创建水平条形图 - 更简洁
-        fig = px.bar(
-            region_stats,
-            y='大区',
-            x='平均人效价值',  # 修改这里
-            orientation='h',
-            title=f"{month} 各区域绩效对比",
-            color='平均人效价值',  # 修改这里
-            color_continuous_scale='RdYlGn',
-            text_auto='.0f'
-        )
-        fig.update_layout(
-            yaxis_title="大区",
-            xaxis_title="平均人效价值（元）",  # 修改这里
-            height=400,
-            showlegend=False
-        )
+        def build_figure():
+            fig = px.bar(
+                region_stats,
+                y='大区',
+                x='平均人效价值',  # 修改这里
+                orientation='h',
+                title=f"{month} 各区域绩效对比",
+                color='平均人效价值',  # 修改这里
+                color_continuous_scale='RdYlGn',
+                text_auto='.0f'
+            )
+            fig.update_layout(
+                yaxis_title="大区",
+                xaxis_title="平均人效价值（元）",  # 修改这里
+                height=400,
+                showlegend=False
+            )
+            return fig
+
+        fig = self._cached_figure(month, 'region_analysis', (), build_figure, df=df)
 
-        st.plotly_chart(fig, use_container_width=True)
+        _plotly_chart(fig, use_container_width=True)
 
         # 识别强项和弱项区域
         st.subheader("区域表现分析")
 
-        if len(region_stats) > 1:
-            best_region = region_stats.loc[region_stats['平均人效价值'].idxmax()]  # 修改这里
-            worst_region = region_stats.loc[region_stats['平均人效价值'].idxmin()]  # 修改这里
+        if performance.best is not None:
+            best_region = performance.best
+            worst_region = performance.worst
 
             col1, col2 = st.columns(2)
             with col1:
                 st.success(f"🏆🏆 最佳表现: {best_region['大区']}")
-                st.metric("平均人效价值", f"¥{best_region['平均人效价值']:,.0f}")  # 修改这里
-                st.metric("顾问人数", f"{best_region['顾问人数']}人")
+                _metric("平均人效价值", f"¥{best_region['平均人效价值']:,.0f}")  # 修改这里
+                _metric("顾问人数", f"{best_region['顾问人数']}人")
 
             with col2:
                 st.error(f"📉📉 需改进: {worst_region['大区']}")
-                st.metric("平均人效价值", f"¥{worst_region['平均人效价值']:,.0f}")  # 修改这里
-                st.metric("顾问人数", f"{worst_region['顾问人数']}人")
+                _metric("平均人效价值", f"¥{worst_region['平均人效价值']:,.0f}")  # 修改这里
+                _metric("顾问人数", f"{worst_region['顾问人数']}人")
 
         # 显示详细数据表
         st.subheader("各区域详细数据")
         display_data = region_stats[['大区', '顾问人数', '平均人效价值']]  # 修改这里
         display_data.columns = ['大区', '顾问人数', '平均人效价值(元)']  # 修改这里
         display_data = display_data.sort_values('平均人效价值(元)', ascending=False)  # 修改这里
-        st.dataframe(display_data, use_container_width=True)
+        _show_dataframe(display_data, use_container_width=True)
 
+    @profiled()
     def create_trend_analysis_chart(self, selected_month):
         """创建趋势分析图表"""
         st.subheader("📅📅 多月份趋势分析")
@@ -661,31 +1052,12 @@ class NutritionAdviserDashboard:
             st.info("需要至少两个月份的数据才能进行趋势分析")
             return
 
-        # 准备趋势数据
-        trend_data = []
-        for month, data_info in self.monthly_data.items():
-            df = data_info['data']
-            if '最终收益值' in df.columns and '顾问编制' in df.columns:
-                # 总体平均人效价值  # 修改这里
-                overall_avg = df['最终收益值'].mean()
-
-                # 各类型顾问平均人效价值  # 修改这里
-                type_avgs = df.groupby('顾问编制')['最终收益值'].mean().to_dict()
-
-                trend_data.append({
-                    '月份': month,
-                    '日期': data_info['date'],
-                    '总体平均人效价值': overall_avg,  # 修改这里
-                    **type_avgs
-                })
-
-        if not trend_data:
+        # 按各月份数据版本缓存的趋势表，数据未变时重新运行不再遍历任何数据
+        trend_df = self.get_trend_table()
+        if trend_df.empty:
             st.warning("没有足够的数据进行趋势分析")
             return
 
-        trend_df = pd.DataFrame(trend_data)
-        trend_df = trend_df.sort_values('日期')
-
         # 创建趋势图
         fig = go.Figure()
 
@@ -722,7 +1094,7 @@ class NutritionAdviserDashboard:
             showlegend=True
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        _plotly_chart(fig, use_container_width=True)
 
         # 显示变化情况
         st.subheader("月度变化分析")
@@ -735,7 +1107,7 @@ class NutritionAdviserDashboard:
 
             col1, col2 = st.columns(2)
             with col1:
-                st.metric(
+                _metric(
                     "总体平均人效价值",  # 修改这里
                     f"¥{latest['总体平均人效价值']:,.0f}",  # 修改这里
                     f"{change_percent:+.1f}%"
@@ -753,11 +1125,12 @@ class NutritionAdviserDashboard:
                             best_type = col
 
                 if best_type:
-                    st.metric(
+                    _metric(
                         "进步最大类型",
                         best_type,
                         f"¥{best_value:+.0f}"
                     )
+    @profiled()
     def create_sales_profit_analysis(self, selected_month):
         """创建销售利润分布分析 - 新增选项卡"""
         st.header(f"📊 销售利润分布分析 - {selected_month}")
@@ -772,36 +1145,17 @@ class NutritionAdviserDashboard:
             st.warning("缺少销售利润或顾问编制数据")
             return
 
-        # 定义销售利润坎级
-        sales_bins = [0, 20000, 50000, 100000, float('inf')]
-        sales_labels = ['2万以下', '2-5万', '5-10万', '10万以上']
-
-        # 为每个顾问添加销售利润坎级
-        df_copy = df.copy()
-        df_copy['销售利润坎级'] = pd.cut(df_copy['销售利润'], bins=sales_bins, labels=sales_labels)
-
-        # 计算各类型顾问在不同坎级的人数
-        sales_distribution = df_copy.groupby(['顾问编制', '销售利润坎级']).size().unstack(fill_value=0)
-
-        # 计算各坎级占比
-        sales_percentage = sales_distribution.div(sales_distribution.sum(axis=1), axis=0) * 100
-
-        # 合并数量和占比
-        sales_summary = pd.DataFrame()
-        for label in sales_labels:
-            if label in sales_distribution.columns:
-                sales_summary[f'{label}人数'] = sales_distribution[label]
-
-        # 添加总人数
-        sales_summary['总人数'] = sales_distribution.sum(axis=1)
-        sales_summary = sales_summary.reset_index()
-
-        # 重命名列
-        sales_summary.columns.name = ''
+        # 各类型顾问在不同销售利润坎级的人数与占比
+        edges = render_edges_input("销售利润坎级边界（元）", SALES_BINS, key="sales_edges")
+        result = self._cached_analysis(selected_month, 'sales_profit', (edges,),
+                                       lambda: sales_profit_distribution(df, edges))
+        sales_summary = result.summary
+        sales_distribution = result.counts
+        sales_percentage = result.percentages
 
         # 显示表格
         st.subheader("各类型顾问销售利润分布统计")
-        st.dataframe(sales_summary, use_container_width=True)
+        _show_dataframe(sales_summary, use_container_width=True)
 
         # 销售利润分布可视化 - 两个图表横向并排
         st.subheader("销售利润分布可视化")
@@ -810,114 +1164,125 @@ class NutritionAdviserDashboard:
         with col1:
             # 利润分布图表
             st.subheader("利润分布")
-            self.create_stacked_bar_chart(sales_distribution, selected_month, "left")
+            self.create_stacked_bar_chart(sales_distribution, selected_month, "left", edges)
 
         with col2:
             # 利润分布百分比图表
             st.subheader("利润分布百分比")
-            self.create_stacked_percentage_chart(sales_percentage, selected_month, "right")
-
-    def create_stacked_bar_chart(self, sales_distribution, month, key_suffix=""):
-        """使用go.Figure创建堆叠条形图"""
-        # 获取顾问类型和坎级标签
-        adviser_types = sales_distribution.index.tolist()
-        sales_labels = sales_distribution.columns.tolist()
-
-        # 创建图形
-        fig = go.Figure()
-
-        # 定义颜色
-        colors = ['#8dd3c7', '#ffffb4', '#bebadb', '#fb8072']
-
-        # 为每个坎级添加一个条形图轨迹
-        for i, label in enumerate(sales_labels):
-            # 获取当前坎级的数据
-            y_data = sales_distribution[label]
+            self.create_stacked_percentage_chart(sales_percentage, selected_month, "right", edges)
+
+    @profiled()
+    def create_stacked_bar_chart(self, sales_distribution, month, key_suffix="", edges=()):
+        """使用go.Figure创建堆叠条形图；edges为坎级边界，用于区分缓存的图表"""
+        def build_figure():
+            # 获取顾问类型和坎级标签
+            adviser_types = sales_distribution.index.tolist()
+            sales_labels = sales_distribution.columns.tolist()
+
+            # 创建图形
+            fig = go.Figure()
+
+            # 定义颜色
+            colors = ['#8dd3c7', '#ffffb4', '#bebadb', '#fb8072']
+
+            # 为每个坎级添加一个条形图轨迹
+            for i, label in enumerate(sales_labels):
+                # 获取当前坎级的数据
+                y_data = sales_distribution[label]
+
+                # 创建文本标注
+                text_positions = []
+                for j, value in enumerate(y_data):
+                    if value == 0:
+                        text_positions.append("")
+                    else:
+                        text_positions.append(f"{int(value)}")
+
+                fig.add_trace(go.Bar(
+                    name=label,
+                    x=adviser_types,
+                    y=y_data,
+                    text=text_positions,
+                    textposition='outside',
+                    textfont=dict(size=12, color='black'),
+                    marker_color=colors[i % len(colors)],
+                    hovertemplate=f"<b>{label}</b><br>顾问类型: %{{x}}<br>人数: %{{y}}<br><extra></extra>"
+                ))
 
-            # 创建文本标注
-            text_positions = []
-            for j, value in enumerate(y_data):
-                if value == 0:
-                    text_positions.append("")
-                else:
-                    text_positions.append(f"{int(value)}")
-
-            fig.add_trace(go.Bar(
-                name=label,
-                x=adviser_types,
-                y=y_data,
-                text=text_positions,
-                textposition='outside',
-                textfont=dict(size=12, color='black'),
-                marker_color=colors[i % len(colors)],
-                hovertemplate=f"<b>{label}</b><br>顾问类型: %{{x}}<br>人数: %{{y}}<br><extra></extra>"
-            ))
+            # 更新布局
+            fig.update_layout(
+                title=dict(text=f"{month} 各类型顾问销售利润分布", font=dict(size=16)),
+                xaxis=dict(title="顾问类型", title_font=dict(size=12), tickfont=dict(size=10)),
+                yaxis=dict(title="人数", title_font=dict(size=12), tickfont=dict(size=10)),
+                barmode='stack',
+                height=400,
+                showlegend=True,
+                margin=dict(l=50, r=50, t=60, b=50),
+            )
 
-        # 更新布局
-        fig.update_layout(
-            title=dict(text=f"{month} 各类型顾问销售利润分布", font=dict(size=16)),
-            xaxis=dict(title="顾问类型", title_font=dict(size=12), tickfont=dict(size=10)),
-            yaxis=dict(title="人数", title_font=dict(size=12), tickfont=dict(size=10)),
-            barmode='stack',
-            height=400,
-            showlegend=True,
-            margin=dict(l=50, r=50, t=60, b=50),
-        )
+            # 确保y轴有足够的空间显示外部文本
+            max_value = sales_distribution.sum(axis=1).max()
+            fig.update_yaxes(range=[0, max_value * 1.15])
+            return fig
 
-        # 确保y轴有足够的空间显示外部文本
-        max_value = sales_distribution.sum(axis=1).max()
-        fig.update_yaxes(range=[0, max_value * 1.15])
+        fig = self._cached_figure(month, 'stacked_bar', (key_suffix, edges), build_figure)
 
         # 使用唯一的key
-        st.plotly_chart(fig, use_container_width=True, key=f"stacked_bar_{month}_{key_suffix}")
-
-    def create_stacked_percentage_chart(self, sales_percentage, month, key_suffix=""):
-        """使用go.Figure创建百分比堆叠条形图"""
-        # 获取顾问类型和坎级标签
-        adviser_types = sales_percentage.index.tolist()
-        sales_labels = sales_percentage.columns.tolist()
-
-        # 创建图形
-        fig = go.Figure()
+        _plotly_chart(fig, use_container_width=True, key=f"stacked_bar_{month}_{key_suffix}")
+
+    @profiled()
+    def create_stacked_percentage_chart(self, sales_percentage, month, key_suffix="", edges=()):
+        """使用go.Figure创建百分比堆叠条形图；edges为坎级边界，用于区分缓存的图表"""
+        def build_figure():
+            # 获取顾问类型和坎级标签
+            adviser_types = sales_percentage.index.tolist()
+            sales_labels = sales_percentage.columns.tolist()
+
+            # 创建图形
+            fig = go.Figure()
+
+            # 定义颜色
+            colors = ['#8dd3c7', '#ffffb4', '#bebadb', '#fb8072']
+
+            # 为每个坎级添加一个条形图轨迹
+            for i, label in enumerate(sales_labels):
+                # 计算文本位置
+                text_positions = []
+                for j, value in enumerate(sales_percentage[label]):
+                    if value < 5:
+                        text_positions.append('outside')
+                    else:
+                        text_positions.append('inside')
+
+                fig.add_trace(go.Bar(
+                    name=label,
+                    x=adviser_types,
+                    y=sales_percentage[label],
+                    text=[f"{v:.1f}%" for v in sales_percentage[label]],
+                    textposition=text_positions,
+                    textfont=dict(size=12, color='black'),
+                    marker_color=colors[i % len(colors)],
+                    hovertemplate=f"<b>{label}</b><br>顾问类型: %{{x}}<br>百分比: %{{y:.1f}}%<br><extra></extra>"
+                ))
 
-        # 定义颜色
-        colors = ['#8dd3c7', '#ffffb4', '#bebadb', '#fb8072']
+            # 更新布局
+            fig.update_layout(
+                title=f"{month} 各类型顾问销售利润分布百分比",
+                xaxis_title="顾问类型",
+                yaxis_title="百分比 (%)",
+                barmode='stack',
+                height=400,
+                showlegend=True,
+            )
+            return fig
 
-        # 为每个坎级添加一个条形图轨迹
-        for i, label in enumerate(sales_labels):
-            # 计算文本位置
-            text_positions = []
-            for j, value in enumerate(sales_percentage[label]):
-                if value < 5:
-                    text_positions.append('outside')
-                else:
-                    text_positions.append('inside')
-
-            fig.add_trace(go.Bar(
-                name=label,
-                x=adviser_types,
-                y=sales_percentage[label],
-                text=[f"{v:.1f}%" for v in sales_percentage[label]],
-                textposition=text_positions,
-                textfont=dict(size=12, color='black'),
-                marker_color=colors[i % len(colors)],
-                hovertemplate=f"<b>{label}</b><br>顾问类型: %{{x}}<br>百分比: %{{y:.1f}}%<br><extra></extra>"
-            ))
-
-        # 更新布局
-        fig.update_layout(
-            title=f"{month} 各类型顾问销售利润分布百分比",
-            xaxis_title="顾问类型",
-            yaxis_title="百分比 (%)",
-            barmode='stack',
-            height=400,
-            showlegend=True,
-        )
+        fig = self._cached_figure(month, 'stacked_percentage', (key_suffix, edges), build_figure)
 
         # 使用唯一的key
-        st.plotly_chart(fig, use_container_width=True, key=f"stacked_percentage_{month}_{key_suffix}")
+        _plotly_chart(fig, use_container_width=True, key=f"stacked_percentage_{month}_{key_suffix}")
 
-    def create_region_strengths_weaknesses(self, df, region, previous_month_data=None):
+    @profiled()
+    def create_region_strengths_weaknesses(self, df, region, previous_month_data=None, month=None):
         """创建区域优势与劣势报告"""
         st.subheader(f"📋 {region} 区域优势与劣势分析")
 
@@ -925,53 +1290,16 @@ class NutritionAdviserDashboard:
             st.warning("无法进行区域分析")
             return
 
-        # 筛选指定区域数据
-        region_data = df[df['大区'] == region]
-        if region_data.empty:
+        # 所有大区的差异矩阵按月份缓存，切换大区只是取其中一行
+        result = self.get_region_gap_matrix(df, month).comparison(region)
+        if result is None:
             st.warning(f"没有找到 {region} 的数据")
             return
-
-        # 计算区域平均值
-        region_avg_sales = region_data['销售利润'].mean() if '销售利润' in region_data.columns else 0
-        region_avg_new_customer = region_data['新客贡献'].mean() if '新客贡献' in region_data.columns else 0
-        region_avg_member_value = region_data['会员价值贡献'].mean() if '会员价值贡献' in region_data.columns else 0
-        region_avg_trial = region_data['试饮获客贡献'].mean() if '试饮获客贡献' in region_data.columns else 0
-        region_avg_internal = region_data['A+B内码贡献'].mean() if 'A+B内码贡献' in region_data.columns else 0
-
-        # 计算全区域平均值
-        overall_avg_sales = df['销售利润'].mean() if '销售利润' in df.columns else 0
-        overall_avg_new_customer = df['新客贡献'].mean() if '新客贡献' in df.columns else 0
-        overall_avg_member_value = df['会员价值贡献'].mean() if '会员价值贡献' in df.columns else 0
-        overall_avg_trial = df['试饮获客贡献'].mean() if '试饮获客贡献' in df.columns else 0
-        overall_avg_internal = df['A+B内码贡献'].mean() if 'A+B内码贡献' in df.columns else 0
+        metrics_df = result.metrics
 
         # 优势与劣势分析
         st.subheader("✅ 优势与薄弱环节分析")
 
-        # 创建指标数据框
-        metrics_data = {
-            '指标': ['销售利润', '新客贡献', '会员价值', '试饮获客', 'A+B内码贡献'],
-            f'{region}区域平均值': [
-                region_avg_sales,
-                region_avg_new_customer,
-                region_avg_member_value,
-                region_avg_trial,
-                region_avg_internal
-            ],
-            '全区域平均值': [
-                overall_avg_sales,
-                overall_avg_new_customer,
-                overall_avg_member_value,
-                overall_avg_trial,
-                overall_avg_internal
-            ]
-        }
-
-        metrics_df = pd.DataFrame(metrics_data)
-        metrics_df['差异'] = metrics_df[f'{region}区域平均值'] - metrics_df['全区域平均值']
-        metrics_df['差异百分比'] = (metrics_df['差异'] / metrics_df['全区域平均值'] * 100).round(1)
-        metrics_df = metrics_df.fillna(0)
-
         # 使用百分比差异条形图
         st.subheader("📊 与全区域平均的百分比差异")
 
@@ -993,26 +1321,17 @@ class NutritionAdviserDashboard:
         )
         fig.update_traces(texttemplate='%{x:.1f}%', textposition='outside')
 
-        st.plotly_chart(fig, use_container_width=True)
+        _plotly_chart(fig, use_container_width=True)
 
         # 使用并列条形图显示实际数值
         st.subheader("📈 各指标实际数值对比")
 
-        # 准备数据用于并列条形图
-        comparison_data = []
-        for _, row in metrics_df.iterrows():
-            comparison_data.append({
-                '指标': row['指标'],
-                '数值': row[f'{region}区域平均值'],
-                '类型': f'{region}区域'
-            })
-            comparison_data.append({
-                '指标': row['指标'],
-                '数值': row['全区域平均值'],
-                '类型': '全区域平均'
-            })
-
-        comparison_df = pd.DataFrame(comparison_data)
+        # 准备数据用于并列条形图：每个指标依次为本区域、全区域平均
+        comparison_df = pd.DataFrame({
+            '指标': np.repeat(metrics_df['指标'].to_numpy(), 2),
+            '数值': metrics_df[[result.region_column, '全区域平均值']].to_numpy().ravel(),
+            '类型': np.tile([f'{region}区域', '全区域平均'], len(metrics_df))
+        })
 
         # 创建并列条形图
         fig2 = px.bar(
@@ -1030,42 +1349,22 @@ class NutritionAdviserDashboard:
             height=400
         )
 
-        st.plotly_chart(fig2, use_container_width=True)
+        _plotly_chart(fig2, use_container_width=True)
 
         # 使用表格显示详细数据
         st.subheader("📋 详细指标数据")
 
-        # 格式化数值显示
-        display_df = metrics_df.copy()
-        for col in [f'{region}区域平均值', '全区域平均值', '差异']:
-            if col in display_df.columns:
-                display_df[col] = display_df[col].apply(lambda x: f"¥{x:,.0f}" if pd.notnull(x) else "¥0")
-
-        display_df['差异百分比'] = display_df['差异百分比'].apply(lambda x: f"{x:+.1f}%" if pd.notnull(x) else "0.0%")
-
-        # 添加颜色标记函数
-        def color_percentage(val):
-            if isinstance(val, str) and '%' in val:
-                try:
-                    num = float(val.replace('%', '').replace('+', ''))
-                    if num > 0:
-                        return 'color: green; font-weight: bold'
-                    elif num < 0:
-                        return 'color: red; font-weight: bold'
-                except:
-                    pass
-            return ''
-
-        # 显示表格
-        styled_df = display_df.style.applymap(color_percentage, subset=['差异百分比'])
-        st.dataframe(styled_df, use_container_width=True)
+        # 格式化数值显示：差异百分比按正负号着色
+        formats = {result.region_column: CURRENCY, '全区域平均值': CURRENCY, '差异': CURRENCY,
+                   '差异百分比': SIGNED_PERCENT}
+        styled_df = style_signs(metrics_df, ['差异百分比'], formats)
+        _show_dataframe(styled_df, use_container_width=True, column_config=number_columns(formats))
 
         # 显示关键绩效指标
         st.subheader("🎯 关键绩效指标")
 
         # 选择最重要的3个指标进行KPI展示
-        top_metrics = metrics_df.nlargest(3, '差异百分比')
-        bottom_metrics = metrics_df.nsmallest(3, '差异百分比')
+        top_metrics = result.top_metrics
 
         col1, col2, col3 = st.columns(3)
         metrics_cols = [col1, col2, col3]
@@ -1076,13 +1375,13 @@ class NutritionAdviserDashboard:
                 metric_name = row['指标']
 
                 if metric_value > 0:
-                    st.metric(
+                    _metric(
                         label=f"✅ {metric_name}",
                         value=f"+{metric_value:.1f}%",
                         delta=f"优于平均 {metric_value:.1f}%"
                     )
                 else:
-                    st.metric(
+                    _metric(
                         label=f"⚠️ {metric_name}",
                         value=f"{metric_value:.1f}%",
                         delta=f"低于平均 {abs(metric_value):.1f}%"
@@ -1092,8 +1391,8 @@ class NutritionAdviserDashboard:
         st.subheader("📝 区域表现总结")
 
         # 计算优势指标数量
-        advantage_count = len(metrics_df[metrics_df['差异百分比'] > 0])
-        disadvantage_count = len(metrics_df[metrics_df['差异百分比'] < 0])
+        advantage_count = len(result.advantages)
+        disadvantage_count = len(result.disadvantages)
 
         col1, col2 = st.columns(2)
 
@@ -1101,8 +1400,7 @@ class NutritionAdviserDashboard:
             if advantage_count > 0:
                 st.success(f"**优势领域**: {region}区域在 {advantage_count} 个指标上优于全区域平均")
                 # 列出具体优势指标
-                advantage_metrics = metrics_df[metrics_df['差异百分比'] > 0]['指标'].tolist()
-                st.write(f"优势指标: {', '.join(advantage_metrics)}")
+                st.write(f"优势指标: {', '.join(result.advantages)}")
             else:
                 st.info("**暂无显著优势指标**")
 
@@ -1110,8 +1408,7 @@ class NutritionAdviserDashboard:
             if disadvantage_count > 0:
                 st.error(f"**需改进领域**: {region}区域在 {disadvantage_count} 个指标上低于全区域平均")
                 # 列出具体需改进指标
-                disadvantage_metrics = metrics_df[metrics_df['差异百分比'] < 0]['指标'].tolist()
-                st.write(f"需改进指标: {', '.join(disadvantage_metrics)}")
+                st.write(f"需改进指标: {', '.join(result.disadvantages)}")
             else:
                 st.success("**所有指标均达到或超过全区域平均水平**")
 
@@ -1119,15 +1416,64 @@ class NutritionAdviserDashboard:
         if disadvantage_count > 0:
             st.subheader("💡 改进建议")
 
-            # 找出差异最大的需改进指标
-            if not metrics_df[metrics_df['差异百分比'] < 0].empty:
-                worst_metric = metrics_df[metrics_df['差异百分比'] < 0].nsmallest(1, '差异百分比').iloc[0]
-                worst_metric_name = worst_metric['指标']
-                worst_metric_gap = abs(worst_metric['差异百分比'])
+            # 差异最大的需改进指标
+            if result.worst_metric is not None:
+                worst_metric_name = result.worst_metric['指标']
+                worst_metric_gap = abs(result.worst_metric['差异百分比'])
 
                 st.info(
                     f"**重点关注**: {worst_metric_name} 指标低于全区域平均 {worst_metric_gap:.1f}%，建议优先改进此领域。")
 
+    def get_region_gap_matrix(self, df, month=None):
+        """所有大区各指标与全区域平均的差异矩阵，按(月份, 数据版本)缓存"""
+        return self._cached_analysis(month, 'region_gap_matrix', (),
+                                     lambda: region_gap_matrix(self._cube_for(df, month)), df=df)
+
+    @profiled()
+    def create_region_gap_heatmap(self, df, month):
+        """全部大区优劣势对比：按平均差异百分比排序的热力图与排名表"""
+        st.subheader("🗺️ 全部大区优劣势对比")
+
+        if df.empty or '大区' not in df.columns:
+            st.warning("无法进行区域分析")
+            return
+
+        matrix = self.get_region_gap_matrix(df, month)
+        if not matrix.regions:
+            st.warning("没有区域数据可显示")
+            return
+        ranked = matrix.gap_pct.loc[matrix.ranking['大区']]
+
+        def build_figure():
+            # 行按排名从上到下，颜色以0为中心
+            fig = go.Figure(go.Heatmap(
+                z=ranked.to_numpy(),
+                x=ranked.columns.tolist(),
+                y=ranked.index.tolist(),
+                colorscale='RdYlGn',
+                zmid=0,
+                text=ranked.to_numpy(),
+                texttemplate='%{text:+.1f}%',
+                hovertemplate="大区: %{y}<br>指标: %{x}<br>差异: %{z:+.1f}%<extra></extra>",
+                colorbar=dict(title="差异百分比 (%)")
+            ))
+            fig.update_layout(
+                title=f"{month} 各大区与全区域平均的差异百分比（按平均差异排序）",
+                xaxis_title="指标",
+                yaxis_title="大区",
+                yaxis=dict(autorange='reversed'),
+                height=max(400, 40 * len(ranked) + 120)
+            )
+            return fig
+
+        fig = self._cached_figure(month, 'region_gap_heatmap', (), build_figure, df=df)
+        _plotly_chart(fig, use_container_width=True)
+
+        _show_dataframe(style_signs(matrix.ranking, ['平均差异百分比'], {'平均差异百分比': SIGNED_PERCENT}),
+                        use_container_width=True, hide_index=True,
+                        column_config=number_columns({'平均差异百分比': SIGNED_PERCENT}))
+
+    @profiled()
     def create_performance_comparison(self, df, month):
         """创建前100名与后100名营养顾问的优劣势分析"""
         st.subheader("🏆 前100名 vs 后100名 营养顾问优劣势分析")
@@ -1141,60 +1487,21 @@ class NutritionAdviserDashboard:
             st.warning(f"数据量不足（当前{len(df)}条记录），需要至少200条记录才能进行前100名与后100名对比分析")
             return
 
-        # 获取前100名和后100名
-        top_100 = df.nlargest(100, '最终收益值')
-        bottom_100 = df.nsmallest(100, '最终收益值')
-
-        # 计算各项指标的平均值
-        comparison_data = {
-            '指标': ['销售利润', '新客贡献', '会员价值贡献', '试饮获客贡献', 'A+B内码贡献', '总收益'],
-            '前100名平均值': [
-                top_100['销售利润'].mean() if '销售利润' in top_100.columns else 0,
-                top_100['新客贡献'].mean() if '新客贡献' in top_100.columns else 0,
-                top_100['会员价值贡献'].mean() if '会员价值贡献' in top_100.columns else 0,
-                top_100['试饮获客贡献'].mean() if '试饮获客贡献' in top_100.columns else 0,
-                top_100['A+B内码贡献'].mean() if 'A+B内码贡献' in top_100.columns else 0,
-                top_100['总收益'].mean() if '总收益' in top_100.columns else 0
-            ],
-            '后100名平均值': [
-                bottom_100['销售利润'].mean() if '销售利润' in bottom_100.columns else 0,
-                bottom_100['新客贡献'].mean() if '新客贡献' in bottom_100.columns else 0,
-                bottom_100['会员价值贡献'].mean() if '会员价值贡献' in bottom_100.columns else 0,
-                bottom_100['试饮获客贡献'].mean() if '试饮获客贡献' in bottom_100.columns else 0,
-                bottom_100['A+B内码贡献'].mean() if 'A+B内码贡献' in bottom_100.columns else 0,
-                bottom_100['总收益'].mean() if '总收益' in bottom_100.columns else 0
-            ],
-            '全量平均值': [
-                df['销售利润'].mean() if '销售利润' in df.columns else 0,
-                df['新客贡献'].mean() if '新客贡献' in df.columns else 0,
-                df['会员价值贡献'].mean() if '会员价值贡献' in df.columns else 0,
-                df['试饮获客贡献'].mean() if '试饮获客贡献' in df.columns else 0,
-                df['A+B内码贡献'].mean() if 'A+B内码贡献' in df.columns else 0,
-                df['总收益'].mean() if '总收益' in df.columns else 0
-            ]
-        }
-
-        comparison_df = pd.DataFrame(comparison_data)
-        comparison_df['前100名优势百分比'] = (
-                (comparison_df['前100名平均值'] - comparison_df['后100名平均值']) / comparison_df[
-            '后100名平均值'] * 100).round(1)
-        comparison_df['前100名vs全量优势百分比'] = (
-                (comparison_df['前100名平均值'] - comparison_df['全量平均值']) / comparison_df[
-            '全量平均值'] * 100).round(1)
-        comparison_df = comparison_df.fillna(0)
+        # 前100名与后100名各项指标对比（排名读取预排序索引，全量平均值读取预聚合立方体）
+        result = self._cached_analysis(month, 'performance_comparison', (100,), lambda: top_bottom_comparison(
+            df, self._ranking_for(df, month), self._cube_for(df, month), size=100), df=df)
+        comparison_df = result.table
 
         # 显示关键指标对比
         st.subheader("📊 关键指标对比")
 
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("前100名平均收益", f"¥{top_100['最终收益值'].mean():,.0f}")
+            _metric("前100名平均收益", f"¥{result.top_mean:,.0f}")
         with col2:
-            st.metric("后100名平均收益", f"¥{bottom_100['最终收益值'].mean():,.0f}")
+            _metric("后100名平均收益", f"¥{result.bottom_mean:,.0f}")
         with col3:
-            advantage = ((top_100['最终收益值'].mean() - bottom_100['最终收益值'].mean()) / bottom_100[
-                '最终收益值'].mean() * 100)
-            st.metric("前100名优势", f"{advantage:.1f}%")
+            _metric("前100名优势", f"{result.advantage:.1f}%")
 
         # 创建对比条形图
         fig = px.bar(
@@ -1211,7 +1518,7 @@ class NutritionAdviserDashboard:
             yaxis_title="平均值（元）",
             height=400
         )
-        st.plotly_chart(fig, use_container_width=True)
+        _plotly_chart(fig, use_container_width=True)
 
         # 显示优势百分比
         st.subheader("📈 前100名优势分析")
@@ -1232,33 +1539,26 @@ class NutritionAdviserDashboard:
             height=400
         )
         fig2.update_traces(texttemplate='%{y:.1f}%')
-        st.plotly_chart(fig2, use_container_width=True)
+        _plotly_chart(fig2, use_container_width=True)
 
         # 显示详细对比表格
         st.subheader("📋 详细对比数据")
 
-        # 格式化显示
-        display_df = comparison_df.copy()
-        for col in ['前100名平均值', '后100名平均值', '全量平均值']:
-            display_df[col] = display_df[col].apply(lambda x: f"¥{x:,.0f}" if pd.notnull(x) else "¥0")
-
-        display_df['前100名优势百分比'] = display_df['前100名优势百分比'].apply(lambda x: f"{x:+.1f}%")
-        display_df['前100名vs全量优势百分比'] = display_df['前100名vs全量优势百分比'].apply(lambda x: f"{x:+.1f}%")
-
-        st.dataframe(display_df, use_container_width=True)
+        # 格式化显示（保持数值类型）
+        _show_dataframe(comparison_df, use_container_width=True, column_config=number_columns({
+            '前100名平均值': CURRENCY, '后100名平均值': CURRENCY, '全量平均值': CURRENCY,
+            '前100名优势百分比': SIGNED_PERCENT, '前100名vs全量优势百分比': SIGNED_PERCENT}))
 
         # 显示关键发现
         st.subheader("💡 关键发现与建议")
 
-        # 找出最大优势指标
-        max_advantage_row = comparison_df.loc[comparison_df['前100名优势百分比'].idxmax()]
-        max_advantage_metric = max_advantage_row['指标']
-        max_advantage = max_advantage_row['前100名优势百分比']
+        # 最大优势指标
+        max_advantage_metric = result.max_advantage['指标']
+        max_advantage = result.max_advantage['前100名优势百分比']
 
-        # 找出最小优势指标（可能是劣势）
-        min_advantage_row = comparison_df.loc[comparison_df['前100名优势百分比'].idxmin()]
-        min_advantage_metric = min_advantage_row['指标']
-        min_advantage = min_advantage_row['前100名优势百分比']
+        # 最小优势指标（可能是劣势）
+        min_advantage_metric = result.min_advantage['指标']
+        min_advantage = result.min_advantage['前100名优势百分比']
 
         col1, col2 = st.columns(2)
 
@@ -1275,11 +1575,10 @@ class NutritionAdviserDashboard:
                 st.info("💡 建议: 仍有提升空间，可针对性优化")
 
         # 顾问类型分布对比
-        if '顾问编制' in df.columns:
+        if result.top_types is not None:
             st.subheader("👥 顾问类型分布对比")
-
-            top_types = top_100['顾问编制'].value_counts()
-            bottom_types = bottom_100['顾问编制'].value_counts()
+            top_types = result.top_types
+            bottom_types = result.bottom_types
 
             col1, col2 = st.columns(2)
 
@@ -1290,7 +1589,7 @@ class NutritionAdviserDashboard:
                     names=top_types.index,
                     title="前100名顾问类型分布"
                 )
-                st.plotly_chart(fig3, use_container_width=True)
+                _plotly_chart(fig3, use_container_width=True)
 
             with col2:
                 st.write("**后100名顾问类型分布**")
@@ -1299,7 +1598,318 @@ class NutritionAdviserDashboard:
                     names=bottom_types.index,
                     title="后100名顾问类型分布"
                 )
-                st.plotly_chart(fig4, use_container_width=True)
+                _plotly_chart(fig4, use_container_width=True)
+
+
+def begin_profiling_run():
+    """性能分析：开始一次运行，计时记录归属于当前会话"""
+    PROFILER.begin_run(session=id(st.session_state.dashboard),
+                       enabled=st.session_state.get("profiling_enabled", False))
+
+
+def profiled_fragment(func):
+    """片段单独重新运行时不经过main()，为其开始并结束一次独立的性能分析运行，
+    以免记录沿用上一次整页运行的编号；整页运行中调用时不做处理"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        if ctx is None or not ctx.fragment_ids_this_run:
+            return func(*args, **kwargs)
+        begin_profiling_run()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            PROFILER.end_run()
+    return wrapper
+
+
+@st.fragment
+@profiled_fragment
+@profiled()
+def render_region_report_section(dashboard, selected_month):
+    """区域分析报告（独立片段，控件变化时只重新运行本部分）"""
+    # 获取上月数据
+    previous_month = dashboard.get_previous_month(selected_month)
+    previous_month_data = None
+    if previous_month:
+        previous_month_data = dashboard.get_month_data(previous_month)
+
+    df = dashboard.get_month_data(selected_month)
+    if not df.empty and '大区' in df.columns:
+        # 选择要分析的大区
+        regions = df['大区'].dropna().unique().tolist()
+        selected_region = st.selectbox("选择要分析的大区", options=regions, key="analysis_region")
+
+        # 创建区域优势与劣势报告
+        dashboard.create_region_strengths_weaknesses(df, selected_region, previous_month_data,
+                                                     month=selected_month)
+
+        # 全部大区对比，与上面的单个大区报告共用同一个差异矩阵
+        dashboard.create_region_gap_heatmap(df, selected_month)
+    else:
+        st.warning("没有区域数据可显示")
+
+
+@st.fragment
+@profiled_fragment
+@profiled()
+def render_ranking_section(dashboard, selected_month):
+    """绩效排名（独立片段，控件变化时只重新运行本部分）"""
+    df = dashboard.get_month_data(selected_month)
+    if not df.empty and '最终收益值' in df.columns:
+        ranking = dashboard.get_ranking_index(selected_month)
+
+        # 添加排名选项 - 使用3列布局
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            rank_by = st.selectbox(
+                "排名依据",
+                options=["最终收益值", "销售利润", "总收益"],
+                index=0
+            )
+        with col2:
+            rank_type = st.selectbox(
+                "排名类型",
+                options=["前N名", "后N名"],
+                index=0
+            )
+
+        # 按大区、顾问编制筛选（排名索引已为每种组合预排序）
+        filters = {}
+        filter_columns = st.columns(len(ranking.dimensions)) if ranking.dimensions else []
+        for column, dimension in zip(filter_columns, ranking.dimensions):
+            with column:
+                options = ["全部"] + sorted(df[dimension].dropna().unique().tolist())
+                choice = st.selectbox(f"筛选{dimension}", options=options, index=0,
+                                      key=f"rank_filter_{dimension}")
+                if choice != "全部":
+                    filters[dimension] = choice
+
+        # 筛选后人数不超过10人时不显示滑块（最小值须小于最大值），全部列出
+        max_n = min(200, ranking.count(rank_by, filters))
+        with col3:
+            if max_n > 10:
+                top_n = st.slider("显示N名", 10, max_n, min(20, max_n))
+            else:
+                top_n = max_n
+                st.info(f"筛选后共{max_n}名顾问，全部显示")
+
+        # 计算排名
+        if rank_type == "前N名":
+            ranked_df = df.iloc[ranking.top(rank_by, top_n, filters)]
+            rank_title = f"前{top_n}名"
+        else:
+            ranked_df = df.iloc[ranking.bottom(rank_by, top_n, filters)]
+            rank_title = f"后{top_n}名"
+
+        st.subheader(f"{rank_title}绩效排名")
+
+        # 选择要显示的列
+        display_columns = []
+        for col in ['顾问名称', '顾问编制', '大区', '区域', '门店名称',
+                    '最终收益值', '销售利润', '总收益']:
+            if col in ranked_df.columns:
+                display_columns.append(col)
+
+        ranked_df = ranked_df[display_columns]
+        ranked_df['排名'] = range(1, len(ranked_df) + 1)
+
+        # 重新排列列顺序，将排名放在第一列
+        cols = ['排名'] + [col for col in ranked_df.columns if col != '排名']
+        ranked_df = ranked_df[cols]
+
+        _show_dataframe(ranked_df, use_container_width=True)
+
+        # 查询单个顾问的全月排名
+        adviser_name = st.text_input("查询顾问排名", placeholder="输入顾问名称", key="rank_adviser_query")
+        if adviser_name:
+            positions = ranking.find_adviser(adviser_name.strip())
+            if len(positions) == 0:
+                st.info(f"未找到顾问: {adviser_name}")
+            else:
+                matched = df.iloc[positions][[col for col in display_columns if col in df.columns]]
+                matched.insert(0, '全月排名', [ranking.rank_of(rank_by, position) for position in positions])
+                matched['超过顾问比例'] = pd.to_numeric(
+                    [ranking.percentile_rank(rank_by, position) for position in positions], errors='coerce')
+                _show_dataframe(matched, use_container_width=True,
+                                column_config=number_columns({'超过顾问比例': PERCENT}))
+
+                # 跨月份表现（读取顾问索引，每个月份只取一行）
+                if len(dashboard.adviser_index.months) > 1:
+                    st.subheader(f"{adviser_name.strip()} 各月份表现")
+                    history = dashboard.adviser_index.history(adviser_name.strip(), metric=rank_by)
+                    _show_dataframe(history, use_container_width=True, column_config=number_columns(
+                        {rank_by: CURRENCY, f'{rank_by}环比变化': SIGNED_CURRENCY}))
+
+        # 全部历史中排名大幅变动的顾问
+        if len(dashboard.adviser_index.months) > 1:
+            with st.expander(f"排名大幅变动顾问（按{rank_by}，相邻月份）"):
+                direction = st.radio("变动方向", options=[f"前{top_n}名→后{top_n}名", f"后{top_n}名→前{top_n}名"],
+                                     horizontal=True, key="rank_movers_direction")
+                source, target = ('top', 'bottom') if direction.startswith("前") else ('bottom', 'top')
+                movers = dashboard.adviser_index.movers(rank_by, top_n, source, target)
+                if movers.empty:
+                    st.info("没有符合条件的顾问")
+                else:
+                    _show_dataframe(movers, use_container_width=True, column_config=number_columns(
+                        {f'起始{rank_by}': CURRENCY, f'目标{rank_by}': CURRENCY}))
+    else:
+        st.warning("没有排名数据可显示")
+
+
+@st.fragment
+@profiled_fragment
+@profiled()
+def render_performance_section(dashboard, selected_month):
+    """前100vs后100分析（独立片段，控件变化时只重新运行本部分）"""
+    df = dashboard.get_month_data(selected_month)
+    if not df.empty and '最终收益值' in df.columns:
+        # 创建前100名与后100名对比分析
+        dashboard.create_performance_comparison(df, selected_month)
+    else:
+        st.warning("没有足够的数据进行对比分析")
+
+
+@st.fragment
+@profiled_fragment
+@profiled()
+def render_region_detail_section(dashboard, selected_month):
+    """区域详情（独立片段，控件变化时只重新运行本部分）"""
+    df = dashboard.get_month_data(selected_month)
+    if not df.empty and '大区' in df.columns:
+        # 选择要查看的大区
+        regions = df['大区'].dropna().unique().tolist()
+        selected_region = st.selectbox("选择大区", options=regions)
+
+        region_data = df[df['大区'] == selected_region]
+
+        if not region_data.empty:
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.subheader(f"{selected_region} - 关键指标")
+                _metric("顾问人数", len(region_data))
+                _metric("平均收益", f"¥{region_data['最终收益值'].mean():,.0f}")
+                _metric("总收益", f"¥{region_data['最终收益值'].sum():,.0f}")
+
+            with col2:
+                st.subheader("顾问类型分布")
+                type_dist = region_data['顾问编制'].value_counts()
+                type_dist = type_dist[type_dist > 0]
+                fig = px.pie(
+                    values=type_dist.values,
+                    names=type_dist.index,
+                    title=f"{selected_region} 顾问类型分布"
+                )
+                _plotly_chart(fig, use_container_width=True)
+
+            # 显示该区域详细数据（分页，只发送当前页）
+            st.subheader("详细数据")
+            render_data_grid(dashboard.get_data_grid(selected_month), "region_grid",
+                             filters={'大区': selected_region})
+        else:
+            st.warning(f"没有找到 {selected_region} 的数据")
+    else:
+        st.warning("没有区域数据可显示")
+
+
+@st.fragment
+@profiled_fragment
+@profiled()
+def render_raw_data_section(dashboard, selected_month):
+    """原始数据（独立片段，控件变化时只重新运行本部分）"""
+    df = dashboard.get_month_data(selected_month)
+    if not df.empty:
+        render_data_grid(dashboard.get_data_grid(selected_month), "raw_grid")
+
+        # 添加数据下载功能：文件在点击下载时才分块生成，并按月份、格式、筛选条件缓存
+        col1, col2 = st.columns(2)
+        with col1:
+            fmt = st.selectbox("导出格式", options=list(EXPORT_FORMATS.keys()),
+                               format_func=lambda name: EXPORT_FORMATS[name][0], key="export_format")
+        with col2:
+            regions = ["全部"] + (sorted(df['大区'].dropna().unique().tolist()) if '大区' in df.columns else [])
+            region = st.selectbox("导出大区", options=regions, key="export_region")
+        region = None if region == "全部" else region
+        label, extension, mime = EXPORT_FORMATS[fmt]
+
+        st.download_button(
+            label=f"下载{label}格式数据",
+            data=lambda: dashboard.export_month(selected_month, fmt, region),
+            file_name=f"营养顾问数据_{selected_month}{'_' + region if region else ''}{extension}",
+            mime=mime
+        )
+
+        months = dashboard.get_available_months()
+        if len(months) > 1:
+            st.download_button(
+                label=f"打包下载全部{len(months)}个月份（{label}）",
+                data=lambda: dashboard.export_months(months, fmt),
+                file_name=f"营养顾问数据_{len(months)}个月份.zip",
+                mime="application/zip"
+            )
+    else:
+        st.warning("没有数据可显示")
+
+
+@st.fragment
+@profiled_fragment
+@profiled()
+def render_member_value_section(dashboard, selected_month):
+    """会员价值贡献（独立片段，控件变化时只重新运行本部分）"""
+    # 创建会员价值贡献分析
+    dashboard.create_member_value_analysis(selected_month)
+
+
+@st.fragment
+@profiled_fragment
+@profiled()
+def render_sales_profit_section(dashboard, selected_month):
+    """销售利润分析（独立片段，控件变化时只重新运行本部分）"""
+    # 新增销售利润分析
+    dashboard.create_sales_profit_analysis(selected_month)
+
+
+@st.fragment(run_every=DEFAULT_POLL_INTERVAL * 2)
+def render_store_sync(dashboard):
+    """定时检查共享仓库，报表文件热更新后刷新整个页面"""
+    if dashboard.sync_with_store():
+        st.rerun(scope="app")
+
+
+def render_profiling_panel(dashboard):
+    """侧边栏性能调试面板：显示本会话最近一次运行的各方法及阶段耗时"""
+    with st.sidebar.expander("🛠️ 性能分析", expanded=False):
+        st.checkbox("启用性能分析", key="profiling_enabled",
+                    help="记录各视图的计算、图表构建、序列化耗时，以及处理行数和发送字节数")
+        if not PROFILER.enabled:
+            st.caption(f"启用后从下一次运行开始记录；设置环境变量 {PROFILE_ENV}=1 可对所有会话启用")
+            return
+        session = id(dashboard)
+        run = PROFILER.last_run(session)
+        if run is None:
+            st.caption("暂无记录")
+            return
+        summary = PROFILER.summary(session, run)
+        st.caption(f"运行 #{run}: 共 {len(PROFILER.records(session, run))} 条记录")
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        if PROFILER.log_path:
+            st.caption(f"完整记录: {PROFILER.log_path}")
+        if st.button("清空性能记录"):
+            PROFILER.clear(session)
+
+
+# 详细数据分析内容及其渲染函数（按页面显示顺序）
+DETAIL_SECTIONS = {
+    "区域分析报告": render_region_report_section,
+    "绩效排名": render_ranking_section,
+    "前100vs后100分析": render_performance_section,
+    "区域详情": render_region_detail_section,
+    "原始数据": render_raw_data_section,
+    "会员价值贡献": render_member_value_section,
+    "销售利润分析": render_sales_profit_section
+}
+
 
 def main():
         """主函数"""
@@ -1308,10 +1918,21 @@ def main():
 
         # 初始化session state
         if 'dashboard' not in st.session_state:
-            st.session_state.dashboard = NutritionAdviserDashboard()
+            st.session_state.dashboard = NutritionAdviserDashboard(month_store=get_month_store(),
+                                                                   figure_cache=get_figure_cache(),
+                                                                   export_cache=get_export_cache())
             st.session_state.data_loaded = False
             st.session_state.current_data_source = "github"
 
+        # 性能分析：本次运行的计时记录归属于当前会话
+        begin_profiling_run()
+
+        # GitHub数据源：启动文件监视器，并同步监视器或其他会话更新的月份
+        if st.session_state.data_loaded and st.session_state.current_data_source == "github":
+            get_report_watcher()
+            st.session_state.dashboard.sync_with_store()
+            render_store_sync(st.session_state.dashboard)
+
         # 侧边栏 - 数据源选择
         st.sidebar.title("📁 数据源配置")
 
@@ -1323,6 +1944,18 @@ def main():
             help="选择从GitHub仓库自动读取Excel文件，或手动上传Excel文件"
         )
 
+        # 并行解析设置
+        with st.sidebar.expander("⚙️ 加载设置"):
+            st.session_state.dashboard.max_workers = st.number_input(
+                "并行解析进程数",
+                min_value=1,
+                max_value=max(1, os.cpu_count() or 1),
+                value=min(st.session_state.dashboard.max_workers, max(1, os.cpu_count() or 1)),
+                help="同时解析Excel文件的进程数，文件较多时可适当调大"
+            )
+            st.caption(f"分位数摘要精度 k={SKETCH_K}（中位数、分位数秩误差约 {120 / SKETCH_K:.2f}%），"
+                       f"可通过环境变量 {SKETCH_K_ENV} 设置")
+
         # 根据选择的数据源显示相应界面
         if data_source == "GitHub仓库":
             st.sidebar.markdown("---")
@@ -1345,6 +1978,11 @@ def main():
                 st.sidebar.warning("⚠️ 在仓库中未找到Excel文件")
                 st.sidebar.info("请确保Excel文件与app.py在同一目录下")
 
+            # 仓库文件更新后使共享数据失效，下次加载时重新解析
+            if st.sidebar.button("♻️ 刷新共享数据", help="仓库中的Excel文件更新后，清除所有会话共享的已解析数据"):
+                st.session_state.dashboard.month_store.invalidate()
+                st.sidebar.success("✅ 共享数据已失效，请重新加载")
+
             # 加载GitHub数据按钮
             if st.sidebar.button("🔄 加载GitHub数据", type="primary"):
                 with st.spinner("正在从GitHub仓库加载数据..."):
@@ -1371,10 +2009,7 @@ def main():
             if uploaded_files:
                 if st.sidebar.button("📥 加载上传数据", type="primary"):
                     with st.spinner("正在处理上传的文件..."):
-                        # 清空现有数据
-                        st.session_state.dashboard.clear_data()
-
-                        # 加载上传文件
+                        # 加载上传文件（内容未变的文件复用已解析的月份）
                         success = st.session_state.dashboard.load_from_upload(uploaded_files)
                         if success:
                             st.session_state.data_loaded = True
@@ -1391,6 +2026,18 @@ def main():
         available_months = st.session_state.dashboard.get_available_months()
         if available_months:
             st.sidebar.success(f"✅ 已加载 {len(available_months)} 个月份的数据")
+            st.sidebar.caption(f"🔗 共享数据仓库: {len(st.session_state.dashboard.month_store.months())} 个月份, "
+                               f"{st.session_state.dashboard.month_store.session_count} 个会话")
+            if st.session_state.current_data_source == "github":
+                watcher = get_report_watcher()
+                last_change = (datetime.fromtimestamp(watcher.last_change).strftime("%H:%M:%S")
+                               if watcher.last_change else "无")
+                st.sidebar.caption(f"👀 文件监视: {'运行中' if watcher.running else '已停止'}, 最近热更新 {last_change}")
+                if watcher.last_error:
+                    st.sidebar.caption(f"⚠️ 文件监视出错: {watcher.last_error}")
+            figure_stats = st.session_state.dashboard.figure_cache.stats()
+            st.sidebar.caption(f"🖼️ 图表缓存: 命中 {figure_stats['hits']} 次, 未命中 {figure_stats['misses']} 次, "
+                               f"已缓存 {figure_stats['size']} 张")
             st.sidebar.info(
                 f"📅 可用月份: {', '.join(available_months[:3])}{'...' if len(available_months) > 3 else ''}")
         else:
@@ -1413,12 +2060,6 @@ def main():
                 index=0
             )
 
-            # 获取上月数据
-            previous_month = st.session_state.dashboard.get_previous_month(selected_month)
-            previous_month_data = None
-            if previous_month:
-                previous_month_data = st.session_state.dashboard.get_month_data(previous_month)
-
             # 显示数据概览
             st.session_state.dashboard.create_overview_dashboard(selected_month)
 
@@ -1426,144 +2067,15 @@ def main():
             st.markdown("---")
             st.header("📋 详细数据查看")
 
-            # 增加销售利润分析选项卡
-            # tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
-            #     "原始数据", "绩效排名", "前100vs后100分析", "区域详情",
-            #     "区域分析报告", "会员价值贡献", "销售利润分析"
-            # ])
-            tab5, tab2, tab3, tab4, tab1, tab6, tab7 = st.tabs([
-                "区域分析报告", "绩效排名", "前100vs后100分析", "区域详情",
-                "原始数据", "会员价值贡献", "销售利润分析"
-            ])
-
-            with tab1:
-                df = st.session_state.dashboard.get_month_data(selected_month)
-                if not df.empty:
-                    st.dataframe(df, use_container_width=True)
-
-                    # 添加数据下载功能
-                    csv = df.to_csv(index=False).encode('utf-8')
-                    st.download_button(
-                        label="下载CSV格式数据",
-                        data=csv,
-                        file_name=f"营养顾问数据_{selected_month}.csv",
-                        mime="text/csv"
-                    )
-                else:
-                    st.warning("没有数据可显示")
-
-            with tab2:
-                df = st.session_state.dashboard.get_month_data(selected_month)
-                if not df.empty and '最终收益值' in df.columns:
-                    # 添加排名选项 - 使用3列布局
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        rank_by = st.selectbox(
-                            "排名依据",
-                            options=["最终收益值", "销售利润", "总收益"],
-                            index=0
-                        )
-                    with col2:
-                        rank_type = st.selectbox(
-                            "排名类型",
-                            options=["前N名", "后N名"],
-                            index=0
-                        )
-                    with col3:
-                        top_n = st.slider("显示N名", 10, min(200, len(df)), 20)
-
-                    # 计算排名
-                    if rank_type == "前N名":
-                        ranked_df = df.nlargest(top_n, rank_by)
-                        rank_title = f"前{top_n}名"
-                    else:
-                        ranked_df = df.nsmallest(top_n, rank_by)
-                        rank_title = f"后{top_n}名"
-
-                    st.subheader(f"{rank_title}绩效排名")
-
-                    # 选择要显示的列
-                    display_columns = []
-                    for col in ['顾问名称', '顾问编制', '大区', '区域', '门店名称',
-                                '最终收益值', '销售利润', '总收益']:
-                        if col in ranked_df.columns:
-                            display_columns.append(col)
-
-                    ranked_df = ranked_df[display_columns]
-                    ranked_df['排名'] = range(1, len(ranked_df) + 1)
-
-                    # 重新排列列顺序，将排名放在第一列
-                    cols = ['排名'] + [col for col in ranked_df.columns if col != '排名']
-                    ranked_df = ranked_df[cols]
-
-                    st.dataframe(ranked_df, use_container_width=True)
-                else:
-                    st.warning("没有排名数据可显示")
-
-            with tab3:
-                df = st.session_state.dashboard.get_month_data(selected_month)
-                if not df.empty and '最终收益值' in df.columns:
-                    # 创建前100名与后100名对比分析
-                    st.session_state.dashboard.create_performance_comparison(df, selected_month)
-                else:
-                    st.warning("没有足够的数据进行对比分析")
-
-            with tab4:
-                df = st.session_state.dashboard.get_month_data(selected_month)
-                if not df.empty and '大区' in df.columns:
-                    # 选择要查看的大区
-                    regions = df['大区'].unique()
-                    selected_region = st.selectbox("选择大区", options=regions)
-
-                    region_data = df[df['大区'] == selected_region]
-
-                    if not region_data.empty:
-                        col1, col2 = st.columns(2)
-
-                        with col1:
-                            st.subheader(f"{selected_region} - 关键指标")
-                            st.metric("顾问人数", len(region_data))
-                            st.metric("平均收益", f"¥{region_data['最终收益值'].mean():,.0f}")
-                            st.metric("总收益", f"¥{region_data['最终收益值'].sum():,.0f}")
-
-                        with col2:
-                            st.subheader("顾问类型分布")
-                            type_dist = region_data['顾问编制'].value_counts()
-                            fig = px.pie(
-                                values=type_dist.values,
-                                names=type_dist.index,
-                                title=f"{selected_region} 顾问类型分布"
-                            )
-                            st.plotly_chart(fig, use_container_width=True)
-
-                        # 显示该区域详细数据
-                        st.subheader("详细数据")
-                        st.dataframe(region_data, use_container_width=True)
-                    else:
-                        st.warning(f"没有找到 {selected_region} 的数据")
-                else:
-                    st.warning("没有区域数据可显示")
-
-            with tab5:
-                df = st.session_state.dashboard.get_month_data(selected_month)
-                if not df.empty and '大区' in df.columns:
-                    # 选择要分析的大区
-                    regions = df['大区'].unique()
-                    selected_region = st.selectbox("选择要分析的大区", options=regions, key="analysis_region")
-
-                    # 创建区域优势与劣势报告
-                    st.session_state.dashboard.create_region_strengths_weaknesses(df, selected_region,
-                                                                                  previous_month_data)
-                else:
-                    st.warning("没有区域数据可显示")
-
-            with tab6:
-                # 创建会员价值贡献分析
-                st.session_state.dashboard.create_member_value_analysis(selected_month)
-
-            with tab7:
-                # 新增销售利润分析选项卡
-                st.session_state.dashboard.create_sales_profit_analysis(selected_month)
+            # 按需渲染：只计算和传输当前选中的分析内容
+            detail_section = st.radio(
+                "选择分析内容",
+                options=list(DETAIL_SECTIONS.keys()),
+                horizontal=True,
+                key="detail_section",
+                label_visibility="collapsed"
+            )
+            DETAIL_SECTIONS[detail_section](st.session_state.dashboard, selected_month)
 
         else:
             # 显示欢迎界面和使用说明
@@ -1643,10 +2155,17 @@ def main():
                     ### 文件命名规范
                     推荐使用标准命名格式，便于系统自动识别：`利润模型评估报告_原始收益值_YYYYMM.xlsx`""")
 
+        # 性能调试面板（可选）
+        render_profiling_panel(st.session_state.dashboard)
+
 
     # 注意：main() 函数不应该在这里面
 
 # main() 函数应该在这里，与类同级
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # 运行结束时写出本次运行的性能记录
+        PROFILER.end_run()
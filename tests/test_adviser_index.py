@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from adviser_index import AdviserIndex
+
+MONTHS = ['2025年05月', '2025年06月', '2025年07月']
+KEYS = ['顾问名称', '门店名称']
+
+
+def make_month(seed, size=200):
+    rng = np.random.default_rng(seed)
+    # 顾问名称与门店的组合有限，同月内会出现重复的顾问键，各月份的顾问也不完全相同
+    advisers = rng.choice(150, size)
+    return pd.DataFrame({
+        '顾问名称': [f"顾问{i % 60}" for i in advisers],
+        '门店名称': [f"门店{i // 60}" for i in advisers],
+        '大区': pd.Categorical(rng.choice(['华北', '华南'], size)),
+        '顾问编制': rng.choice(['全职', '兼职'], size),
+        '最终收益值': rng.integers(0, 40, size).astype(np.float64) * 1000,
+        '销售利润': rng.normal(0, 1000, size),
+        '总收益': rng.normal(50000, 1000, size),
+    })
+
+
+@pytest.fixture
+def frames():
+    return {month_key: make_month(seed) for seed, month_key in enumerate(MONTHS)}
+
+
+@pytest.fixture
+def index(frames):
+    index = AdviserIndex()
+    for number, (month_key, df) in enumerate(frames.items()):
+        index.update(month_key, pd.Timestamp(2025, 5 + number, 1), df)
+    return index
+
+
+def first_rows(df):
+    """重复的顾问键取第一行"""
+    return df.drop_duplicates(KEYS)
+
+
+def stable_rank(df, metric):
+    """整月名次：数值降序、并列时行号小者在前"""
+    order = df[metric].sort_values(ascending=False, kind='stable').index
+    return pd.Series(np.arange(1, len(order) + 1), index=order)
+
+
+def test_month_over_month_matches_merge(frames, index):
+    result = index.month_over_month('最终收益值', '2025年07月', '2025年06月')
+    expected = first_rows(frames['2025年06月'])[KEYS + ['最终收益值']].merge(
+        first_rows(frames['2025年07月'])[KEYS + ['最终收益值']], on=KEYS, suffixes=('_上月', '_当月'))
+    expected['变化量'] = expected['最终收益值_当月'] - expected['最终收益值_上月']
+
+    result = result.sort_values(KEYS).reset_index(drop=True)
+    expected = expected.sort_values(KEYS).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result[KEYS], expected[KEYS])
+    np.testing.assert_array_equal(result['上月最终收益值'], expected['最终收益值_上月'])
+    np.testing.assert_array_equal(result['当月最终收益值'], expected['最终收益值_当月'])
+    np.testing.assert_array_equal(result['变化量'], expected['变化量'])
+
+
+def test_history_matches_groupby(frames, index):
+    name = frames['2025年07月']['顾问名称'].iat[0]
+    result = index.history(name)
+    parts = []
+    for month_key, df in frames.items():
+        rows = first_rows(df)
+        rows = rows[rows['顾问名称'] == name].assign(月份=month_key)
+        rows['最终收益值排名'] = stable_rank(df, '最终收益值').loc[rows.index].to_numpy()
+        parts.append(rows)
+    expected = pd.concat(parts)
+    expected['最终收益值环比变化'] = expected.groupby(KEYS, sort=False)['最终收益值'].diff()
+
+    result = result.sort_values(KEYS + ['月份']).reset_index(drop=True)
+    expected = expected.sort_values(KEYS + ['月份']).reset_index(drop=True)
+    for column in ['月份', '顾问名称', '门店名称', '顾问编制']:
+        assert result[column].tolist() == expected[column].tolist()
+    for column in ['最终收益值', '销售利润', '总收益', '最终收益值排名', '最终收益值环比变化']:
+        np.testing.assert_array_equal(result[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize('source, target', [('top', 'bottom'), ('bottom', 'top'), ('top', 'top')])
+def test_movers_match_naive(frames, index, source, target):
+    k = 40
+    result = index.movers('最终收益值', k, source, target)
+
+    def group(df, side):
+        values = df['最终收益值']
+        return values.sort_values(ascending=side == 'bottom', kind='stable').index[:k]
+
+    records = []
+    for previous_month, month_key in zip(MONTHS, MONTHS[1:]):
+        previous, current = frames[previous_month], frames[month_key]
+        # 当月取进入目标组的第一行
+        target_rows = {}
+        for row in group(current, target):
+            target_rows.setdefault(tuple(current.loc[row, KEYS]), row)
+        for row in group(previous, source):
+            key = tuple(previous.loc[row, KEYS])
+            if key in target_rows:
+                records.append((previous_month, month_key, *key,
+                                stable_rank(previous, '最终收益值')[row],
+                                stable_rank(current, '最终收益值')[target_rows[key]],
+                                previous.loc[row, '最终收益值'], current.loc[target_rows[key], '最终收益值']))
+    assert len(records) > 0
+    assert [tuple(record) for record in result.itertuples(index=False)] == records
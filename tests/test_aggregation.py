@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_app
+from aggregation import MonthCube
+
+STATS = ['count', 'sum', 'mean', 'min', 'max', 'std']
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    size = 2000
+    values = rng.normal(50000, 20000, size).round(2)
+    values[::97] = np.nan
+    return pd.DataFrame({
+        '大区': pd.Categorical(rng.choice(['华北', '华南', '华东'], size)),
+        '顾问编制': rng.choice(['全职', '兼职'], size),
+        '区域': rng.choice([f"区域{i}" for i in range(8)], size),
+        '最终收益值': values,
+        '销售利润': rng.integers(0, 100000, size).astype(np.int32),
+    })
+
+
+@pytest.mark.parametrize('by', [(), ('大区',), ('顾问编制',), ('大区', '顾问编制'), ('区域', '大区')])
+@pytest.mark.parametrize('metric', ['最终收益值', '销售利润'])
+def test_rollup_matches_groupby(df, by, metric):
+    cube = MonthCube.build(df)
+    result = cube.summary(metric, by=by, stats=STATS)
+    if by:
+        expected = df.groupby(list(by), observed=True)[metric].agg(STATS)
+        expected.index = expected.index.set_levels(
+            [level.astype(object) for level in expected.index.levels]) if len(by) > 1 else expected.index.astype(object)
+    else:
+        expected = df[metric].agg(STATS).to_frame().T
+    pd.testing.assert_frame_equal(result.reset_index(drop=not by), expected.reset_index(drop=not by),
+                                  check_dtype=False, check_names=False, check_categorical=False, rtol=1e-9)
+
+
+def test_std_of_large_integer_sums_does_not_overflow():
+    # 单元求和约2e14，其平方超出int64范围
+    values = np.random.default_rng(1).integers(0, 2_000_000_000, 200000, dtype=np.int64)
+    df = pd.DataFrame({'大区': ['华北'] * len(values), '最终收益值': values})
+    cube = MonthCube.build(df)
+    assert cube.total('最终收益值', 'std') == pytest.approx(df['最终收益值'].std(), rel=1e-6)
+    assert cube.summary('最终收益值', by=['大区'], stats=('std',))['std'].iloc[0] == pytest.approx(
+        df['最终收益值'].std(), rel=1e-6)
+
+
+def test_empty_and_missing_dimensions():
+    cube = MonthCube.build(pd.DataFrame({'最终收益值': [1.0, 2.0, 4.0]}))
+    assert cube.dimensions == []
+    assert cube.total('最终收益值', 'mean') == pytest.approx(7 / 3)
+    assert cube.total('不存在的指标') == 0
+    assert MonthCube.build(pd.DataFrame()).metrics == []
+
+
+class _Sink:
+    def __init__(self):
+        self.figures, self.tables, self.metrics = [], [], {}
+
+    def figure(self, figure):
+        self.figures.append(figure)
+
+    def table(self, data):
+        self.tables.append(getattr(data, 'data', data))
+
+    def metric(self, label, value, delta=None):
+        self.metrics[label] = value
+
+
+def _render(view, df, month):
+    sink = _Sink()
+    with streamlit_app.capture_output(sink):
+        view(df, month)
+    return sink
+
+
+def test_views_use_the_frame_they_are_given(df):
+    streamlit_app._analysis_result.clear()
+    dashboard = streamlit_app.NutritionAdviserDashboard()
+    month = '2025年06月'
+    dashboard._set_month(month, {'data': df, 'date': pd.Timestamp('2025-06-01'), 'source': 'uploaded'})
+    month_df = dashboard.get_month_data(month)
+    filtered = month_df[month_df['顾问编制'] == '全职']
+
+    # 先渲染整月数据填充缓存，筛选后的数据不能读到整月的缓存结果
+    for view in (dashboard.create_adviser_type_chart, dashboard.create_profit_distribution_chart):
+        _render(view, month_df, month)
+
+    types = _render(dashboard.create_adviser_type_chart, filtered, month).tables[0]
+    assert types['顾问类型'].tolist() == ['全职']
+    assert types['人数'].iloc[0] == filtered['最终收益值'].count()
+
+    metrics = _render(dashboard.create_profit_distribution_chart, filtered, month).metrics
+    assert metrics['最高人效价值'] == f"¥{filtered['最终收益值'].max():,.0f}"
+    assert metrics['最低人效价值'] == f"¥{filtered['最终收益值'].min():,.0f}"
+
+    # 未加载的月份由df临时构建立方体
+    regions = _render(dashboard.create_region_analysis_chart, filtered, '2099年01月').tables[-1]
+    expected = filtered.groupby('大区', observed=True)['最终收益值'].count()
+    assert regions.set_index('大区')['顾问人数'].sort_index().tolist() == expected.sort_index().tolist()
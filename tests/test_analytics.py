@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import DEFAULT_SKETCH_K, METRIC_COLUMNS, MonthCube
+from analytics import HIGH_PERFORMER_QUANTILE, REGION_COMPARISON_METRICS, adviser_type_stats, level_totals, month_over_month, overview_stats, \
+    region_gap_matrix, region_performance, top_bottom_comparison
+from ranking_index import RankingIndex
+
+
+def make_month(seed, size=3000, regions=('华北', '华南', '华东', '西南')):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        '大区': pd.Categorical(rng.choice(regions, size), categories=['华北', '华南', '华东', '西南', '东北']),
+        '顾问编制': pd.Categorical(rng.choice(['全职', '兼职', '店长'], size, p=[0.5, 0.3, 0.2])),
+        '区域': pd.Categorical(rng.choice([f"区域{i}" for i in range(10)], size)),
+        '门店名称': rng.choice([f"门店{i}" for i in range(seed * 5, seed * 5 + 40)], size),
+    })
+    for number, metric in enumerate(METRIC_COLUMNS):
+        values = rng.normal(50000 + number * 5000, 20000, size).round(2)
+        values[number::89] = np.nan
+        df[metric] = values
+    return df
+
+
+@pytest.fixture
+def df():
+    return make_month(0)
+
+
+def test_overview_stats(df):
+    stats = overview_stats(df, MonthCube.build(df))
+    values = df['最终收益值']
+    assert stats.total_advisers == len(df)
+    assert stats.avg_profit == pytest.approx(values.mean())
+    assert stats.total_profit == pytest.approx(values.sum())
+    # 阈值由分位数摘要估计，比例的误差不超过摘要的秩误差
+    expected = (values >= values.quantile(HIGH_PERFORMER_QUANTILE)).sum() / len(df) * 100
+    assert abs(stats.high_performer_pct - expected) <= 1.2 / DEFAULT_SKETCH_K * 100
+
+
+def test_adviser_type_stats(df):
+    table = adviser_type_stats(MonthCube.build(df)).table.set_index('顾问编制')
+    grouped = df.groupby('顾问编制', observed=True)['最终收益值']
+    expected = grouped.agg(['count', 'mean', 'std']).round(0)
+    np.testing.assert_array_equal(table.index.astype(str), expected.index.astype(str))
+    np.testing.assert_array_equal(table['人数'], expected['count'])
+    np.testing.assert_array_equal(table['平均人效价值'], expected['mean'])
+    np.testing.assert_array_equal(table['标准差'], expected['std'])
+    for adviser_type, group in grouped:
+        values = group.dropna()
+        share_below = (values < table.loc[adviser_type, '中位人效价值']).mean()
+        assert abs(share_below - 0.5) <= 1.2 / DEFAULT_SKETCH_K + 1 / len(values)
+
+
+def test_region_performance(df):
+    result = region_performance(MonthCube.build(df))
+    expected = df.groupby('大区', observed=True)['最终收益值'].agg(['mean', 'count']).round(0)
+    expected = expected.sort_values('mean')
+    assert result.table['大区'].astype(str).tolist() == expected.index.astype(str).tolist()
+    np.testing.assert_array_equal(result.table['平均人效价值'], expected['mean'])
+    np.testing.assert_array_equal(result.table['顾问人数'], expected['count'])
+    assert result.best['大区'] == expected.index[-1] and result.worst['大区'] == expected.index[0]
+
+
+@pytest.mark.parametrize('size', [10, 100])
+def test_top_bottom_comparison(df, size):
+    result = top_bottom_comparison(df, RankingIndex(df), MonthCube.build(df), size)
+    values = df['最终收益值'].dropna()
+    top = df.loc[values.sort_values(ascending=False, kind='stable').index[:size]]
+    bottom = df.loc[values.sort_values(kind='stable').index[:size]]
+
+    table = result.table.set_index('指标')
+    for metric in table.index:
+        assert table.loc[metric, f'前{size}名平均值'] == pytest.approx(top[metric].mean())
+        assert table.loc[metric, f'后{size}名平均值'] == pytest.approx(bottom[metric].mean())
+        assert table.loc[metric, '全量平均值'] == pytest.approx(df[metric].mean())
+    assert result.top_mean == pytest.approx(top['最终收益值'].mean())
+    assert result.bottom_mean == pytest.approx(bottom['最终收益值'].mean())
+    pd.testing.assert_series_equal(result.top_types.sort_index(),
+                                   top['顾问编制'].value_counts().loc[lambda s: s > 0].sort_index())
+    pd.testing.assert_series_equal(result.bottom_types.sort_index(),
+                                   bottom['顾问编制'].value_counts().loc[lambda s: s > 0].sort_index())
+
+
+@pytest.mark.parametrize('by', ['大区', '顾问编制', '门店名称'])
+def test_level_totals_match_groupby(df, by):
+    totals = level_totals(MonthCube.build(df), by, ['最终收益值', '销售利润'], df)
+    grouped = df.groupby(by, observed=True)[['最终收益值', '销售利润']]
+    for stat in ['count', 'sum']:
+        result = totals.xs(stat, axis=1, level=1)
+        expected = grouped.agg(stat)
+        # 索引为按取值排序的维度取值
+        expected = expected.set_axis(expected.index.astype(object)).sort_index()
+        np.testing.assert_array_equal(result.index.astype(str), expected.index.astype(str))
+        np.testing.assert_allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+
+
+@pytest.mark.parametrize('by', ['大区', '门店名称'])
+@pytest.mark.parametrize('stat', ['sum', 'mean', 'count'])
+def test_month_over_month_matches_groupby_diff(by, stat):
+    metrics = ['最终收益值', '会员价值贡献']
+    # 两个月份的大区、门店不完全相同，只在一个月份出现的取值另一月份按0计
+    current = make_month(1, regions=('华北', '华南', '西南'))
+    previous = make_month(2, size=2500, regions=('华北', '华南', '东北'))
+    result = month_over_month(MonthCube.build(current), MonthCube.build(previous), by, metrics, stat,
+                              df=current, previous_df=previous)
+
+    def values(df):
+        table = df.groupby(by, observed=True)[metrics].agg(stat)
+        table.index = table.index.astype(object)
+        return table
+
+    index = values(current).index.union(values(previous).index)
+    expected_current = values(current).reindex(index).fillna(0)
+    expected_previous = values(previous).reindex(index).fillna(0)
+    expected_change = expected_current - expected_previous
+    for table, expected in [(result.current, expected_current), (result.previous, expected_previous),
+                            (result.change, expected_change),
+                            (result.change_pct, (expected_change / expected_previous * 100).round(1).fillna(0))]:
+        assert table.index.tolist() == expected.index.tolist()
+        np.testing.assert_allclose(table.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-9)
+    np.testing.assert_allclose(result.total_current, current[metrics].agg(stat))
+    np.testing.assert_allclose(result.total_previous, previous[metrics].agg(stat))
+
+    table = result.table('会员价值贡献')
+    assert table[by].tolist() == index.tolist()
+    np.testing.assert_allclose(table['变化量'], expected_change['会员价值贡献'])
+
+
+def test_region_gap_matrix_matches_group_means(df):
+    # 缺少的指标均值与差异记为0
+    df = df.drop(columns=['A+B内码贡献'])
+    matrix = region_gap_matrix(MonthCube.build(df))
+    labels = [label for label, _ in REGION_COMPARISON_METRICS]
+    columns = [column for _, column in REGION_COMPARISON_METRICS]
+
+    means = df.groupby('大区', observed=True)[columns[:-1]].mean().reindex(columns=columns, fill_value=0)
+    # 立方体上卷的大区按取值排序
+    means = means.set_axis(means.index.astype(object)).set_axis(labels, axis=1).sort_index()
+    overall = df[columns[:-1]].mean().reindex(columns, fill_value=0).set_axis(labels)
+    gaps = means - overall
+    gap_pct = (gaps / overall * 100).round(1).fillna(0)
+
+    assert matrix.regions == means.index.tolist()
+    for result, expected in [(matrix.region_means, means), (matrix.gaps, gaps), (matrix.gap_pct, gap_pct)]:
+        np.testing.assert_allclose(result.loc[means.index, labels].to_numpy(), expected.to_numpy(), atol=1e-6)
+    np.testing.assert_allclose(matrix.overall_means[labels].to_numpy(), overall.to_numpy())
+    assert (matrix.gaps['A+B内码贡献'] == 0).all() and (matrix.gap_pct['A+B内码贡献'] == 0).all()
+
+    expected_ranking = gap_pct.mean(axis=1).round(1).sort_values(ascending=False, kind='stable')
+    assert matrix.ranking['大区'].tolist() == expected_ranking.index.tolist()
+    np.testing.assert_allclose(matrix.ranking['平均差异百分比'], expected_ranking)
+    assert matrix.ranking['排名'].tolist() == list(range(1, len(expected_ranking) + 1))
+
+    region = expected_ranking.index[0]
+    comparison = matrix.comparison(region)
+    np.testing.assert_allclose(comparison.metrics['差异'], gaps.loc[region], atol=1e-6)
+    assert comparison.advantages == [label for label in labels if gap_pct.loc[region, label] > 0]
+    assert comparison.disadvantages == [label for label in labels if gap_pct.loc[region, label] < 0]
+    assert matrix.comparison('东北') is None
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmark import compare, make_month
+from ingestion import PROJECTED_COLUMNS
+
+
+def test_make_month_is_reproducible():
+    month = datetime(2025, 6, 1)
+    pd.testing.assert_frame_equal(make_month(500, month, seed=3), make_month(500, month, seed=3))
+    assert not make_month(500, month, seed=3).equals(make_month(500, month, seed=4))
+    assert not make_month(500, month).equals(make_month(500, datetime(2025, 7, 1)))
+
+
+def test_make_month_matches_report_layout():
+    df = make_month(1000, datetime(2025, 6, 1))
+    assert list(df.columns) == PROJECTED_COLUMNS
+    assert len(df) == 1000
+    # 按最终收益值降序，类型内排名与pandas按编制分组排名一致
+    assert df['最终收益值'].is_monotonic_decreasing
+    expected = df.groupby('顾问编制')['最终收益值'].rank(ascending=False, method='first').astype(int)
+    np.testing.assert_array_equal(df['类型内收益排名'], expected)
+    assert df['顾问id'].is_unique
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {'results': {'fast': {'median': 0.001}, 'slow': {'median': 1.0}, 'same': {'median': 1.0}}}
+    results = {'fast': {'median': 0.002}, 'slow': {'median': 1.5}, 'same': {'median': 1.1},
+               'new': {'median': 0.5}}
+    table, regressions = compare(results, baseline)
+    # 'fast'变慢一倍但不足最小差值，视为计时噪声
+    assert regressions == ['slow']
+    table = table.set_index('基准')
+    assert pd.isna(table.loc['new', '基线(s)'])
+    assert table.loc['slow', '比值'] == 1.5
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from binning import bin_codes, parse_edges, segment_counts, segment_labels
+
+EDGES = (-np.inf, 0, 10000, 50000, np.inf)
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    values = rng.normal(20000, 30000, 500)
+    values[::50] = np.nan
+    # 恰好落在边界上的值归入左侧分段（左开右闭）
+    values[1:4] = [0, 10000, 50000]
+    return pd.DataFrame({
+        '最终收益值': values,
+        '顾问编制': pd.Categorical(rng.choice(['全职', '兼职', '店员'], 500), categories=['全职', '兼职', '店员', '其他']),
+        '大区': rng.choice(['华北', '华南'], 500)
+    })
+
+
+def test_bin_codes_match_pd_cut():
+    values = np.array([-5.0, 0.0, 1.0, 10000.0, 10000.5, 1e9, np.nan])
+    expected = pd.cut(values, EDGES).codes
+    np.testing.assert_array_equal(bin_codes(values, EDGES), expected)
+
+    # 超出有限边界的值与pd.cut一样不计入任何分段
+    bounded = (0, 10, 20)
+    values = np.array([-1.0, 0.0, 5.0, 20.0, 21.0])
+    np.testing.assert_array_equal(bin_codes(values, bounded), pd.cut(values, bounded).codes)
+
+
+def test_segment_counts_match_value_counts(df):
+    labels = segment_labels(EDGES)
+    result = segment_counts(df, '最终收益值', EDGES)
+    expected = pd.cut(df['最终收益值'], EDGES, labels=labels).value_counts(sort=False)
+    assert list(result.index) == labels
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+    assert result.index.name == '最终收益值'
+    assert segment_counts(df, '最终收益值', EDGES, name='收益分段').index.name == '收益分段'
+
+
+@pytest.mark.parametrize('by', ['顾问编制', '大区'])
+def test_segment_counts_by_dimension_match_crosstab(df, by):
+    labels = segment_labels(EDGES)
+    result = segment_counts(df, '最终收益值', EDGES, by=by)
+    segments = pd.cut(df['最终收益值'], EDGES, labels=labels)
+    expected = pd.crosstab(df[by], segments).reindex(columns=labels, fill_value=0)
+    expected = expected[expected.sum(axis=1) > 0]
+    assert list(result.index) == list(expected.index)
+    assert list(result.columns) == labels
+    np.testing.assert_array_equal(result.to_numpy(), expected.to_numpy())
+    # 没有数据的取值（Categorical中的“其他”）不出现在结果中
+    assert '其他' not in result.index
+
+
+def test_segment_labels_and_parse_edges():
+    assert segment_labels(EDGES) == ['0以下', '0-1万', '1-5万', '5万以上']
+    assert segment_labels((0, 10000, 20000, np.inf)) == ['1万以下', '1-2万', '2万以上']
+    assert parse_edges('10000，50000', 0) == (0, 10000.0, 50000.0, np.inf)
+    assert parse_edges('50000, 10000') is None
+    assert parse_edges('abc') is None
+
+
+def test_sales_profit_distribution_matches_crosstab():
+    from analytics import SALES_BINS, SALES_LABELS, sales_profit_distribution
+
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'销售利润': rng.gamma(2, 20000, 400),
+                       '顾问编制': rng.choice(['全职', '兼职', '店员'], 400)})
+    result = sales_profit_distribution(df)
+    segments = pd.cut(df['销售利润'], SALES_BINS, labels=SALES_LABELS)
+    expected = pd.crosstab(df['顾问编制'], segments).reindex(columns=SALES_LABELS, fill_value=0)
+    np.testing.assert_array_equal(result.counts.to_numpy(), expected.to_numpy())
+    np.testing.assert_allclose(result.percentages.to_numpy(),
+                               expected.div(expected.sum(axis=1), axis=0).to_numpy() * 100)
+    assert result.summary['总人数'].tolist() == expected.sum(axis=1).tolist()
+
+
+def test_profit_distribution_with_custom_edges():
+    from aggregation import MonthCube
+    from analytics import profit_distribution
+
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({'最终收益值': rng.normal(30000, 40000, 300), '大区': rng.choice(['华北', '华南'], 300)})
+    edges = (-np.inf, 0, 20000, np.inf)
+    result = profit_distribution(df, MonthCube.build(df), edges)
+    expected = pd.cut(df['最终收益值'], edges).value_counts(sort=False)
+    assert list(result.distribution.index) == segment_labels(edges)
+    np.testing.assert_array_equal(result.distribution.to_numpy(), expected.to_numpy())
+    assert result.maximum == df['最终收益值'].max()
+    assert result.minimum == df['最终收益值'].min()
+    # 两个单元合并后超出摘要容量，中位数为估计值
+    assert abs((df['最终收益值'] < result.median).mean() - 0.5) <= 1.2 / 200
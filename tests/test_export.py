@@ -0,0 +1,86 @@
+import gzip
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_app
+from export import ExportCache, export_bundle, export_frame, iter_csv_chunks
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    size = 1234
+    values = rng.normal(50000, 10000, size).round(2)
+    values[::17] = np.nan
+    return pd.DataFrame({
+        '大区': pd.Categorical(rng.choice(['华北', '华南'], size)),
+        '顾问名称': [f"顾问{i}" for i in range(size)],
+        '最终收益值': values,
+        '顾问id': np.arange(size, dtype=np.int32),
+    })
+
+
+@pytest.mark.parametrize('chunk_rows', [100, 1234, 50_000])
+def test_csv_chunks_match_to_csv(df, chunk_rows):
+    content = export_frame(df, 'csv', chunk_rows=chunk_rows)
+    assert content == df.to_csv(index=False).encode('utf-8')
+    assert gzip.decompress(export_frame(df, 'csv.gz', chunk_rows=chunk_rows)) == content
+    assert sum(1 for _ in iter_csv_chunks(df, chunk_rows)) == -(-len(df) // chunk_rows)
+
+
+def test_empty_frame_exports_header():
+    empty = pd.DataFrame(columns=['大区', '最终收益值'])
+    assert export_frame(empty, 'csv') == empty.to_csv(index=False).encode('utf-8')
+
+
+def test_parquet_round_trip(df):
+    restored = pd.read_parquet(io.BytesIO(export_frame(df, 'parquet', chunk_rows=100)))
+    pd.testing.assert_frame_equal(restored, df)
+
+
+def test_bundle_contains_every_frame(df):
+    frames = [('六月', df), ('七月', df.iloc[:10])]
+    with zipfile.ZipFile(io.BytesIO(export_bundle(frames, 'csv', chunk_rows=100))) as archive:
+        assert archive.namelist() == ['六月.csv', '七月.csv']
+        assert archive.read('七月.csv') == df.iloc[:10].to_csv(index=False).encode('utf-8')
+    with zipfile.ZipFile(io.BytesIO(export_bundle(frames, 'csv.gz'))) as archive:
+        assert archive.getinfo('六月.csv.gz').compress_type == zipfile.ZIP_STORED
+    with pytest.raises(ValueError):
+        export_frame(df, 'xlsx')
+
+
+def test_export_cache_evicts_and_invalidates():
+    cache = ExportCache(max_bytes=10)
+    builds = []
+
+    def builder(content):
+        return lambda: builds.append(content) or content
+
+    assert cache.get_or_build((('6月',), (1,), 'csv', None), builder(b'aaaa')) == b'aaaa'
+    assert cache.get_or_build((('6月',), (1,), 'csv', None), builder(b'xxxx')) == b'aaaa'
+    cache.get_or_build((('7月',), (2,), 'csv', None), builder(b'bbbb'))
+    cache.get_or_build((('6月', '7月'), (1, 2), 'csv', None), builder(b'cccc'))
+    # 超出容量时淘汰最久未使用的文件
+    assert len(cache) == 2 and builds == [b'aaaa', b'bbbb', b'cccc']
+    cache.invalidate('7月')
+    assert len(cache) == 0
+    # 超过容量的文件不缓存
+    cache.get_or_build((('8月',), (3,), 'csv', None), builder(b'x' * 11))
+    assert len(cache) == 0
+
+
+def test_export_frame_adds_month_columns_and_source_names(df):
+    dashboard = streamlit_app.NutritionAdviserDashboard()
+    dashboard._set_month('2025年06月', {'data': df, 'date': pd.Timestamp('2025-06-01'), 'source': 'uploaded'})
+    exported = dashboard.get_export_frame('2025年06月', region='华北')
+    expected = df[df['大区'] == '华北']
+    assert len(exported) == len(expected)
+    assert list(exported.columns) == list(df.columns) + ['月份', '日期', '数据来源']
+    assert set(exported['数据来源']) == {'上传文件'}
+    content = dashboard.export_month('2025年06月', 'csv', '华北')
+    assert content == exported.to_csv(index=False).encode('utf-8')
+    assert dashboard.export_month('2025年06月', 'csv', '华北') is content
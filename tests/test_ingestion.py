@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import make_month, write_report
+from ingestion import PROJECTED_COLUMNS, downcast_metric, normalize_month_frame, read_excel_projected
+from month_store import CategoryRegistry
+
+
+@pytest.fixture
+def report(tmp_path):
+    df = make_month(300, pd.Timestamp('2025-06-01'), seed=3)
+    # 报表新增的列、数值和文本混合的列，以及部分空单元格
+    df['备注'] = [None if i % 7 == 0 else f"备注{i}" for i in range(len(df))]
+    df['新增指标'] = [None if i % 5 == 0 else i * 1.5 for i in range(len(df))]
+    df['混合列'] = [i if i % 2 else f"文本{i}" for i in range(len(df))]
+    df.loc[::11, '销售利润'] = None
+    df.loc[::13, '门店名称'] = None
+    path = tmp_path / 'report.xlsx'
+    write_report(df, path)
+    return path
+
+
+def test_matches_read_excel_with_unknown_columns(report):
+    result = read_excel_projected(str(report))
+    expected = pd.read_excel(report)
+    # 投影列在前，其余列按报表中的顺序排在后面
+    assert list(result.columns) == PROJECTED_COLUMNS + ['备注', '新增指标', '混合列']
+    pd.testing.assert_frame_equal(result, expected[result.columns], check_dtype=False)
+    assert result['新增指标'].dtype == np.float64
+    assert result['备注'].isna().sum() == expected['备注'].isna().sum()
+
+
+def test_projection_only(report):
+    columns = ['大区', '最终收益值', '不存在的列']
+    result = read_excel_projected(report.read_bytes(), columns=columns, keep_unknown=False)
+    expected = pd.read_excel(report, usecols=['大区', '最终收益值'])
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('values, dtype', [
+    ([1.0, 2.0, -3.0], np.int32),
+    ([1.5, np.nan, 100.25], np.float32),
+    ([1, 2, 3], np.int32),
+    ([1.0, np.nan], np.float32),
+    ([2 ** 40, 1], np.float32),
+    ([0.1, 0.2], np.float64),
+    ([2 ** 60 + 1, 0], np.int64),
+])
+def test_downcast_metric_is_lossless(values, dtype):
+    series = pd.Series(values, index=[f"r{i}" for i in range(len(values))], name='销售利润')
+    result = downcast_metric(series)
+    assert result.dtype == dtype
+    # 压缩后还原的取值与原列完全一致
+    pd.testing.assert_series_equal(result.astype(series.dtype), series)
+
+
+def test_normalize_month_frame_shares_categories():
+    registry = CategoryRegistry()
+    june = pd.DataFrame({'大区': ['华北', '华南', None], '顾问名称': ['甲', '乙', '丙'],
+                         '最终收益值': [100.0, 250.0, np.nan]})
+    july = pd.DataFrame({'大区': ['华东', '华北', '华北'], '顾问名称': ['丁', '甲', '乙'],
+                         '最终收益值': [1.0, 2.0, 3.0]})
+    first = normalize_month_frame(june, registry)
+    second = normalize_month_frame(july, registry)
+
+    # 同一取值在各月份的编码一致，字典只追加
+    assert list(second['大区'].cat.categories) == ['华北', '华南', '华东']
+    assert first['大区'].cat.codes.tolist() == [0, 1, -1]
+    assert second['大区'].cat.codes.tolist() == [2, 0, 0]
+    # 维度取值与非维度列保持不变
+    for original, normalized in [(june, first), (july, second)]:
+        assert normalized['大区'].astype(object).where(normalized['大区'].notna(), None).tolist() \
+            == original['大区'].tolist()
+        pd.testing.assert_series_equal(normalized['顾问名称'], original['顾问名称'])
+        pd.testing.assert_series_equal(normalized['最终收益值'].astype(np.float64), original['最终收益值'])
+    assert first['最终收益值'].dtype == np.float32 and second['最终收益值'].dtype == np.int32
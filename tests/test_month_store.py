@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_app
+from month_store import MonthStore
+from report_watcher import build_month_entry
+
+MONTHS = {'2025年06月': 0, '2025年07月': 1}
+
+
+def load_shared(store, month_key, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'顾问编制': pd.Categorical(rng.choice(['全职', '兼职'], 100)),
+                       '最终收益值': rng.normal(50000, 9000, 100)})
+    data = store.table.put(month_key, df)
+    store.put(month_key, build_month_entry(data, table=store.table, month=month_key, source='github',
+                                           date=pd.Timestamp(f"{month_key[:4]}-{month_key[5:7]}-01")))
+    return df
+
+
+@pytest.fixture
+def store():
+    streamlit_app._analysis_result.clear()
+    store = MonthStore()
+    for month_key, seed in MONTHS.items():
+        load_shared(store, month_key, seed)
+    return store
+
+
+def session(store):
+    dashboard = streamlit_app.NutritionAdviserDashboard(month_store=store)
+    for month_key in store.months():
+        dashboard._set_month(month_key, store.view(month_key))
+    return dashboard
+
+
+def test_invalidate_keeps_other_sessions_working(store):
+    first, second = session(store), session(store)
+    before = second.get_trend_table()
+    streamlit_app._analysis_result.clear()
+
+    first.month_store.invalidate()
+    assert store.months() == []
+    # 其他会话的跨月份汇总仍由表中数据计算，结果不变
+    pd.testing.assert_frame_equal(second.get_trend_table(), before)
+    assert not second.sync_with_store()
+
+    # 重新加载后替换分区，各会话同步到新版本
+    replaced = load_shared(store, '2025年06月', 9)
+    load_shared(store, '2025年07月', 1)
+    assert second.sync_with_store()
+    trend = second.get_trend_table().set_index('月份')
+    assert trend.loc['2025年06月', '总体平均人效价值'] == pytest.approx(replaced['最终收益值'].mean())
+
+
+def test_views_share_the_columnar_table(store):
+    view = store.view('2025年06月')
+    assert view['table'] is store.table
+    np.testing.assert_array_equal(view['data']['最终收益值'].to_numpy(),
+                                  store.table.frame('2025年06月')['最终收益值'].to_numpy())
+    store.remove('2025年07月')
+    assert store.is_removed('2025年07月')
+    assert '2025年07月' not in store.table
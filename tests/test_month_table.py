@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from month_table import MonthTable
+
+
+def month_frame(regions, values, region_categories=None, value_dtype=np.int32):
+    regions = pd.Categorical(regions, categories=region_categories)
+    return pd.DataFrame({'大区': regions, '最终收益值': np.asarray(values, dtype=value_dtype)})
+
+
+def assert_same_values(actual, expected):
+    """取值一致即可：表中的列可能被扩展为更宽的类型、Categorical字典可能被追加"""
+    assert list(actual.columns) == list(expected.columns)
+    for name in expected.columns:
+        left, right = actual[name], expected[name]
+        if isinstance(right.dtype, pd.CategoricalDtype):
+            left, right = left.astype(object), right.astype(object)
+        pd.testing.assert_series_equal(left, right, check_dtype=False)
+
+
+def test_put_returns_frame_equal_to_input():
+    table = MonthTable()
+    df = month_frame(['华北', '华南', '华北'], [10, 20, 30])
+    pd.testing.assert_frame_equal(table.put('2025年06月', df), df)
+    pd.testing.assert_frame_equal(table.frame('2025年06月'), df)
+    assert table.months == ['2025年06月']
+    assert len(table) == 3
+
+
+def test_aggregate_matches_pandas_groupby():
+    table = MonthTable()
+    months = {
+        '2025年06月': month_frame(['华北', '华南', '华北', '华东'], [10, 20, 30, 5], ['华北', '华南', '华东']),
+        '2025年07月': month_frame(['华南', '华南', None], [7, 9, 100], ['华北', '华南', '华东']),
+    }
+    for month_key, df in months.items():
+        table.put(month_key, df)
+    combined = pd.concat([df.assign(月份=month_key) for month_key, df in months.items()])
+
+    result = table.aggregate('最终收益值')
+    expected = combined.groupby('月份')['最终收益值'].agg(['count', 'sum', 'mean'])
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    result = table.aggregate('最终收益值', by='大区')
+    expected = combined.groupby(['月份', '大区'], observed=True)['最终收益值'].agg(['count', 'sum', 'mean'])
+    expected.index = pd.MultiIndex.from_tuples(expected.index, names=expected.index.names)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_dtype_widening_keeps_earlier_months():
+    table = MonthTable()
+    june = month_frame(['华北', '华南'], [10, 20])
+    july = month_frame(['华北'], [2.5], value_dtype=np.float64)
+    table.put('2025年06月', june)
+    table.put('2025年07月', july)
+    assert table.frame('2025年06月')['最终收益值'].dtype == np.float64
+    assert_same_values(table.frame('2025年06月'), june)
+    assert_same_values(table.frame('2025年07月'), july)
+
+
+def test_missing_columns_are_filled_with_nan():
+    table = MonthTable()
+    june = month_frame(['华北', '华南'], [10, 20])
+    july = june.assign(销售利润=[1.5, 2.5])
+    table.put('2025年06月', june)
+    table.put('2025年07月', july)
+    assert list(table.frame('2025年06月').columns) == list(june.columns)
+    assert_same_values(table.frame('2025年07月'), july)
+    assert table.aggregate('销售利润').index.tolist() == ['2025年07月']
+
+
+def test_categorical_remapping_for_unrelated_dictionaries():
+    table = MonthTable()
+    june = month_frame(['华北', '华南', None], [1, 2, 3], ['华北', '华南'])
+    # 字典不是前一个月份的前缀，编码需要重新映射
+    july = month_frame(['西南', '华南', '华北'], [4, 5, 6], ['西南', '华南', '华北'])
+    table.put('2025年06月', june)
+    table.put('2025年07月', july)
+    categories = table.frame('2025年07月')['大区'].cat.categories
+    assert list(categories) == ['华北', '华南', '西南']
+    assert_same_values(table.frame('2025年06月'), june)
+    assert_same_values(table.frame('2025年07月'), july)
+
+    result = table.aggregate('最终收益值', by='大区')
+    assert result.loc[('2025年07月', '西南'), 'sum'] == 4
+    assert ('2025年06月', '西南') not in result.index
+
+
+def test_replace_and_remove():
+    table = MonthTable()
+    table.put('2025年06月', month_frame(['华北'], [1]))
+    table.put('2025年07月', month_frame(['华南', '华南'], [2, 3]))
+    replaced = month_frame(['华东'], [9])
+    table.put('2025年06月', replaced)
+    assert_same_values(table.frame('2025年06月'), replaced)
+    assert table.stats()['rows'] == 3
+
+    table.remove('2025年07月')
+    assert table.months == ['2025年06月']
+    assert table.aggregate('最终收益值')['sum'].tolist() == [9]
+    with pytest.raises(KeyError):
+        table.frame('2025年07月')
+
+    table.clear()
+    assert table.months == [] and len(table) == 0
+
+
+def test_reallocate_compacts_and_keeps_taken_frames_valid():
+    table = MonthTable()
+    frames = {}
+    for month in range(12):
+        month_key = f"2025年{month + 1:02d}月"
+        frames[month_key] = month_frame(['华北', '华南'] * (month + 1), np.arange(2 * (month + 1)) + month)
+        table.put(month_key, frames[month_key])
+    taken = table.frame('2025年01月')
+
+    for month_key in list(frames)[:6]:
+        table.put(month_key, frames[month_key])
+    # 替换的月份写入尾部，旧分区只标记失效
+    assert table.stats()['stale_rows'] > 0
+    # 追加一个超过剩余容量的月份，触发重新分配并压缩失效分区
+    table.put('2026年01月', month_frame(['华东'] * 1000, np.ones(1000)))
+    assert table.stats()['stale_rows'] == 0
+    assert table.stats()['rows'] == sum(len(df) for df in frames.values()) + 1000
+    for month_key, df in frames.items():
+        assert_same_values(table.frame(month_key), df)
+    assert_same_values(taken, frames['2025年01月'])
@@ -0,0 +1,65 @@
+import json
+
+from profiling import PROFILER, Profiler
+
+
+def test_records_are_buffered_until_the_run_ends(tmp_path):
+    profiler = Profiler(log_path=str(tmp_path / 'logs' / 'profiling.jsonl'))
+    profiler.begin_run(session='a', enabled=True)
+    with profiler.span('outer', rows=10):
+        with profiler.span('inner', phase='figure'):
+            profiler.add(rows=5, sent_bytes=100)
+    assert not (tmp_path / 'logs').exists()
+
+    profiler.end_run()
+    lines = [json.loads(line) for line in (tmp_path / 'logs' / 'profiling.jsonl').read_text().splitlines()]
+    assert [record['name'] for record in lines] == ['inner', 'outer']
+    inner, outer = lines
+    assert (inner['parent'], inner['rows'], inner['bytes']) == ('outer', 5, 100)
+    assert outer['self_ms'] <= outer['duration_ms']
+
+    summary = profiler.summary('a', profiler.last_run('a')).set_index('名称')
+    assert summary.loc['outer', '次数'] == 1 and summary.loc['outer', '行数'] == 10
+
+
+def test_disabled_runs_record_nothing():
+    profiler = Profiler(log_path=None)
+    profiler.begin_run(session='a', enabled=False)
+    with profiler.span('view') as frame:
+        assert frame is None
+    profiler.end_run()
+    assert profiler.records() == []
+
+
+def _render_app():
+    import pandas as pd
+    import plotly.express as px
+
+    import streamlit_app
+    from profiling import PROFILER
+
+    PROFILER.begin_run(session='render_test', enabled=True)
+    streamlit_app._plotly_chart(px.bar(x=['a', 'b'], y=[3, 4]))
+    streamlit_app._show_dataframe(pd.DataFrame({'值': range(50)}))
+    PROFILER.end_run()
+
+
+def test_sent_bytes_come_from_the_sent_messages(monkeypatch):
+    from plotly.basedatatypes import BaseFigure
+    from streamlit.testing.v1 import AppTest
+
+    calls = []
+    to_json = BaseFigure.to_json
+    monkeypatch.setattr(BaseFigure, 'to_json', lambda self, *args, **kwargs: calls.append(1) or to_json(
+        self, *args, **kwargs))
+    monkeypatch.setattr(PROFILER, 'log_path', None)
+    PROFILER.clear('render_test')
+
+    app = AppTest.from_function(_render_app, default_timeout=30).run()
+    assert not app.exception
+    # 不为统计字节数再序列化一次图表
+    assert calls == []
+    records = {record['name']: record for record in PROFILER.records('render_test')}
+    assert records['st.plotly_chart']['bytes'] > 0
+    assert records['st.dataframe']['rows'] == 50 and records['st.dataframe']['bytes'] > 0
+    PROFILER.clear('render_test')
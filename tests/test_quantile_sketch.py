@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import MonthCube, QuantileSketch
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def sketch_of(values, k=200):
+    values = np.asarray(values, dtype=np.float64)
+    return QuantileSketch.from_sorted(np.sort(values[~np.isnan(values)]), k)
+
+
+def max_rank_error(sketch, values):
+    """各分位点估计值在真实数据中的秩与目标分位数之差的最大值（占样本数的比例）"""
+    values = np.sort(values)
+    estimates = np.array([sketch.quantile(q) for q in QUANTILES])
+    lower = np.searchsorted(values, estimates, side='left') / len(values)
+    upper = np.searchsorted(values, estimates, side='right') / len(values)
+    return np.max(np.maximum(lower - QUANTILES, QUANTILES - upper).clip(min=0))
+
+
+def test_small_sketch_is_exact_and_matches_pandas():
+    values = pd.Series([5.0, 1.0, 3.0, np.nan, 2.0, 3.0, 8.0])
+    sketch = sketch_of(values)
+    assert sketch.exact
+    assert sketch.count == values.count()
+    for q in (0, 0.1, 0.25, 0.5, 0.9, 1):
+        assert sketch.quantile(q) == pytest.approx(values.quantile(q))
+    assert sketch.rank(3.0) == (values < 3.0).sum()
+    assert sketch.rank(3.0, inclusive=True) == (values <= 3.0).sum()
+    assert sketch.count_at_least(3.0) == (values >= 3.0).sum()
+
+
+def test_empty_sketch():
+    sketch = sketch_of([])
+    assert sketch.count == 0
+    assert np.isnan(sketch.quantile(0.5))
+
+
+def test_merging_exact_sketches_stays_exact():
+    parts = [pd.Series([1.0, 4.0, 9.0]), pd.Series([2.0, 2.0]), pd.Series([7.0])]
+    merged = QuantileSketch.merge_all(sketch_of(part) for part in parts)
+    combined = pd.concat(parts)
+    assert merged.exact
+    assert merged.quantile(0.5) == pytest.approx(combined.quantile(0.5))
+    assert sketch_of(parts[0]).merge(sketch_of(parts[1])).count == 5
+
+
+@pytest.mark.parametrize('k', [100, 200, 400])
+def test_single_sketch_error_bound(k):
+    values = np.random.default_rng(0).lognormal(10, 1, 20000)
+    sketch = sketch_of(values, k)
+    assert not sketch.exact
+    assert sketch.count == len(values)
+    assert max_rank_error(sketch, values) <= 0.6 / k * 1.5
+
+
+@pytest.mark.parametrize('k', [100, 200, 400])
+def test_merged_sketch_error_bound(k):
+    """24个月份的摘要一次合并、逐月合并，秩误差都不超过文档中的1.2/k"""
+    rng = np.random.default_rng(1)
+    months = [rng.normal(50000 + 1000 * month, 15000, 12000) for month in range(24)]
+    sketches = [sketch_of(values, k) for values in months]
+    values = np.concatenate(months)
+
+    merged = QuantileSketch.merge_all(sketches)
+    assert merged.count == len(values)
+    assert max_rank_error(merged, values) <= 1.2 / k
+
+    chained = sketches[0]
+    for sketch in sketches[1:]:
+        chained = chained.merge(sketch)
+    assert chained.count == len(values)
+    assert max_rank_error(chained, values) <= 1.2 / k
+
+
+def test_rank_estimate_of_merged_sketch():
+    rng = np.random.default_rng(2)
+    months = [rng.uniform(0, 1000, 5000) for _ in range(6)]
+    merged = QuantileSketch.merge_all(sketch_of(values) for values in months)
+    values = np.concatenate(months)
+    points = np.array([100.0, 250.0, 500.0, 900.0])
+    expected = np.array([(values < point).sum() for point in points])
+    assert np.all(np.abs(merged.rank(points) - expected) <= 1.2 / merged.k * len(values))
+    assert merged.count_at_least(500.0) == len(values) - merged.rank(500.0)
+
+
+def test_cube_quantiles_and_sliced_sketches():
+    rng = np.random.default_rng(3)
+    size = 20000
+    df = pd.DataFrame({
+        '大区': rng.choice(['华北', '华南', '华东'], size),
+        '顾问编制': rng.choice(['全职', '兼职'], size),
+        '区域': rng.choice([f"区域{i}" for i in range(12)], size),
+        '最终收益值': rng.gamma(2, 20000, size),
+    })
+    k = 200
+    cube = MonthCube.build(df, sketch_k=k)
+    values = df['最终收益值'].to_numpy()
+    # 由各单元的摘要合并得到整月结果，误差在合并后的上限之内
+    assert max_rank_error(cube.sketch('最终收益值'), values) <= 1.2 / k
+    median = cube.quantile('最终收益值', 0.5)
+    assert abs((values < median).mean() - 0.5) <= 1.2 / k
+
+    by_region = cube.quantile('最终收益值', 0.9, by=['大区'])
+    for region, group in df.groupby('大区'):
+        assert abs((group['最终收益值'] < by_region[region]).mean() - 0.9) <= 1.2 / k
+
+    sliced = cube.sketch('最终收益值', where={'大区': ['华北', '华南'], '顾问编制': '全职'})
+    subset = df[df['大区'].isin(['华北', '华南']) & (df['顾问编制'] == '全职')]['最终收益值'].to_numpy()
+    assert sliced.count == len(subset)
+    assert max_rank_error(sliced, subset) <= 1.2 / k
+    # 同一切片的合并结果被缓存
+    assert cube.sketch('最终收益值', where={'顾问编制': '全职', '大区': ('华北', '华南')}) is sliced
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ranking_index import RankingIndex
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    size = 300
+    values = rng.integers(0, 50, size).astype(np.float64) * 1000  # 大量并列值
+    values[::37] = np.nan
+    return pd.DataFrame({
+        '顾问名称': [f"顾问{i % 250}" for i in range(size)],
+        '门店名称': [f"门店{i % 7}" for i in range(size)],
+        '大区': pd.Categorical(rng.choice(['华北', '华南', '华东'], size)),
+        '顾问编制': rng.choice(['全职', '兼职'], size),
+        '最终收益值': values,
+        '销售利润': rng.normal(0, 1000, size),
+    })
+
+
+@pytest.mark.parametrize('metric', ['最终收益值', '销售利润'])
+@pytest.mark.parametrize('k', [1, 10, 100, 1000])
+def test_top_bottom_match_nlargest_nsmallest(df, metric, k):
+    ranking = RankingIndex(df)
+    values = df[metric].dropna()
+    # 稳定排序：数值并列时行号小者在前，NaN不参与排名
+    np.testing.assert_array_equal(ranking.top(metric, k),
+                                  values.sort_values(ascending=False, kind='stable').index[:k].to_numpy())
+    np.testing.assert_array_equal(ranking.bottom(metric, k), values.sort_values(kind='stable').index[:k].to_numpy())
+    if k < len(values):
+        # k不小于行数时nlargest退化为不稳定的整列排序，只在k较小时逐行比较
+        np.testing.assert_array_equal(ranking.top(metric, k), df[metric].nlargest(k).index.to_numpy())
+        np.testing.assert_array_equal(ranking.bottom(metric, k), df[metric].nsmallest(k).index.to_numpy())
+
+
+def test_filtered_rankings_match_groups(df):
+    ranking = RankingIndex(df)
+    for (region, adviser_type), group in df.groupby(['大区', '顾问编制'], observed=True):
+        filters = {'大区': region, '顾问编制': adviser_type}
+        np.testing.assert_array_equal(ranking.top('最终收益值', 5, filters),
+                                      group['最终收益值'].nlargest(5).index.to_numpy())
+        np.testing.assert_array_equal(ranking.bottom('最终收益值', 5, filters),
+                                      group['最终收益值'].nsmallest(5).index.to_numpy())
+        assert ranking.count('最终收益值', filters) == group['最终收益值'].count()
+    region_only = df[df['大区'] == '华北']['最终收益值']
+    np.testing.assert_array_equal(ranking.top('最终收益值', 10, {'大区': '华北', '顾问编制': None}),
+                                  region_only.nlargest(10).index.to_numpy())
+    assert len(ranking.top('最终收益值', 10, {'大区': '不存在'})) == 0
+    with pytest.raises(KeyError):
+        ranking.top('最终收益值', 10, {'门店名称': '门店1'})
+
+
+def test_rank_of_matches_pandas_rank(df):
+    ranking = RankingIndex(df)
+    expected = df['最终收益值'].rank(method='first', ascending=False)
+    for position in range(len(df)):
+        rank = ranking.rank_of('最终收益值', position)
+        if np.isnan(expected.iat[position]):
+            assert rank is None
+            assert ranking.percentile_rank('最终收益值', position) is None
+        else:
+            assert rank == expected.iat[position]
+            total = df['最终收益值'].count()
+            assert ranking.percentile_rank('最终收益值', position) == pytest.approx((total - rank) / total * 100)
+
+
+def test_only_available_metrics_and_dimensions(df):
+    ranking = RankingIndex(df.drop(columns=['顾问编制']))
+    assert ranking.metrics == ['最终收益值', '销售利润']
+    assert ranking.dimensions == ['大区']
+
+
+def test_find_adviser(df):
+    ranking = RankingIndex(df)
+    expected = df.index[df['顾问名称'] == '顾问3'].to_numpy()
+    np.testing.assert_array_equal(ranking.find_adviser('顾问3'), expected)
+    store = df.at[expected[0], '门店名称']
+    np.testing.assert_array_equal(ranking.find_adviser('顾问3', store),
+                                  df.index[(df['顾问名称'] == '顾问3') & (df['门店名称'] == store)].to_numpy())
+    assert len(ranking.find_adviser('不存在')) == 0
+
+
+def _ranking_section_app():
+    import numpy as np
+    import pandas as pd
+
+    import streamlit_app
+
+    size = 60
+    # 华北45人、华南12人、华东3人；华东没有兼职顾问
+    regions = ['华北'] * 45 + ['华南'] * 12 + ['华东'] * 3
+    df = pd.DataFrame({
+        '顾问名称': [f"顾问{i}" for i in range(size)],
+        '门店名称': [f"门店{i % 5}" for i in range(size)],
+        '大区': regions,
+        '顾问编制': ['全职' if region == '华东' else ['全职', '兼职'][i % 2] for i, region in enumerate(regions)],
+        '最终收益值': np.arange(size, dtype=np.float64) * 100,
+        '销售利润': np.arange(size, dtype=np.float64),
+        '总收益': np.arange(size, dtype=np.float64) * 2,
+    })
+    dashboard = streamlit_app.NutritionAdviserDashboard()
+    dashboard._set_month('2025年06月', {'data': df, 'date': pd.Timestamp('2025-06-01'), 'source': 'uploaded'})
+    streamlit_app.render_ranking_section(dashboard, '2025年06月')
+
+
+@pytest.mark.parametrize('filters, expected_rows, slider_max', [
+    ({}, 20, 60),
+    ({'rank_filter_大区': '华南'}, 12, 12),                            # 11-19人：默认值不超过最大值
+    ({'rank_filter_大区': '华东'}, 3, None),                           # 不超过10人：不显示滑块
+    ({'rank_filter_大区': '华东', 'rank_filter_顾问编制': '兼职'}, 0, None),  # 空组合
+])
+def test_ranking_section_with_few_filtered_advisers(filters, expected_rows, slider_max):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(_ranking_section_app, default_timeout=30).run()
+    for key, value in filters.items():
+        app.selectbox(key=key).set_value(value)
+    app.run()
+    assert not app.exception
+    assert len(app.dataframe[0].value) == expected_rows
+    if slider_max is None:
+        assert len(app.slider) == 0
+        assert app.info[0].value.startswith(f"筛选后共{expected_rows}名")
+    else:
+        assert app.slider[0].max == slider_max
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import make_month, write_report
+from ingestion import REPORT_PREFIX, read_excel_projected
+from month_store import MonthStore
+from report_watcher import ReportWatcher, refresh_month_store, scan_reports
+
+MONTHS = {'2025年06月': pd.Timestamp('2025-06-01'), '2025年07月': pd.Timestamp('2025-07-01')}
+
+
+def report_file(directory, date):
+    return os.path.join(directory, f"{REPORT_PREFIX}{date:%Y%m}.xlsx")
+
+
+def write_month(directory, date, seed=0, size=120):
+    path = report_file(directory, date)
+    write_report(make_month(size, date, seed), path)
+    # 保证重写后的文件签名（修改时间）一定变化
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seed * 1_000_000_000))
+    return path
+
+
+@pytest.fixture
+def directory(tmp_path):
+    for date in MONTHS.values():
+        write_month(tmp_path, date)
+    # 文件名日期格式不正确的报表
+    (tmp_path / f"{REPORT_PREFIX}最新.xlsx").write_bytes(b'')
+    return str(tmp_path)
+
+
+def assert_month_matches_file(store, month_key, path):
+    expected = read_excel_projected(path)
+    data = store.view(month_key)['data']
+    assert len(data) == len(expected)
+    np.testing.assert_allclose(data['最终收益值'].to_numpy(dtype=float), expected['最终收益值'].to_numpy())
+    assert data['大区'].astype(object).tolist() == expected['大区'].tolist()
+
+
+def test_scan_reports(directory):
+    reports, skipped = scan_reports(directory)
+    assert sorted(reports) == sorted(MONTHS)
+    assert skipped == [f"{REPORT_PREFIX}最新.xlsx"]
+    file_path, date, signature = reports['2025年06月']
+    assert file_path == report_file(directory, MONTHS['2025年06月']) and date == MONTHS['2025年06月']
+    assert signature == (os.stat(file_path).st_mtime_ns, os.stat(file_path).st_size)
+
+
+def test_refresh_only_reparses_changed_files(directory):
+    store = MonthStore()
+    updated, removed = refresh_month_store(store, scan_reports(directory)[0], max_workers=1)
+    assert sorted(updated) == sorted(MONTHS) and removed == []
+    versions = {month_key: store.version(month_key) for month_key in MONTHS}
+
+    # 文件未变化时不重新解析
+    assert refresh_month_store(store, scan_reports(directory)[0], max_workers=1) == ([], [])
+
+    path = write_month(directory, MONTHS['2025年07月'], seed=1)
+    os.remove(report_file(directory, MONTHS['2025年06月']))
+    reports = scan_reports(directory)[0]
+    assert refresh_month_store(store, reports, max_workers=1) == (['2025年07月'], [])
+    assert store.version('2025年06月') == versions['2025年06月']
+    assert store.version('2025年07月') > versions['2025年07月']
+    assert_month_matches_file(store, '2025年07月', path)
+
+    # remove_missing时移除文件已删除的月份
+    assert refresh_month_store(store, reports, max_workers=1, remove_missing=True) == ([], ['2025年06月'])
+    assert store.months() == ['2025年07月'] and store.is_removed('2025年06月')
+
+
+def test_watcher_retries_unreadable_file(directory):
+    store = MonthStore()
+    changes = []
+    watcher = ReportWatcher(store, directory, max_workers=1, on_change=lambda *change: changes.append(change))
+    refresh_month_store(store, scan_reports(directory)[0], max_workers=1)
+    assert watcher.poll() == ([], [])
+
+    # 正在复制的文件解析失败：记录错误，下次轮询时重试
+    path = report_file(directory, MONTHS['2025年07月'])
+    with open(path, 'wb') as f:
+        f.write(b'not a workbook')
+    assert watcher.poll() == ([], [])
+    assert watcher.last_error.startswith('2025年07月')
+    assert changes == []
+
+    write_month(directory, MONTHS['2025年07月'], seed=2)
+    assert watcher.poll() == (['2025年07月'], [])
+    assert watcher.last_error is None
+    assert changes == [(['2025年07月'], [])]
+    assert_month_matches_file(store, '2025年07月', path)
+    assert watcher.poll() == ([], [])
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_grid import DataGrid, SearchIndex
+
+
+@pytest.fixture
+def df():
+    names = ['张三', '李四', '张三丰', '王五', None, '张小三', '李四', '欧阳张三', '三张']
+    stores = pd.Categorical(['北京一店', '北京二店', '上海一店', '广州店', '北京一店', None, '上海二店', '深圳店',
+                             '北京三店'])
+    return pd.DataFrame({'顾问名称': names, '门店名称': stores, '最终收益值': np.arange(len(names))})
+
+
+def expected_rows(df, text, columns):
+    mask = np.zeros(len(df), dtype=bool)
+    for column in columns:
+        mask |= df[column].astype(object).astype(str).str.contains(text, regex=False).to_numpy() \
+            & df[column].notna().to_numpy()
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('text', ['张三', '三', '张', '北京', '一店', '李四', '张三丰', '三张', '不存在', '店', '京一'])
+def test_search_matches_str_contains(df, text):
+    index = SearchIndex(df)
+    np.testing.assert_array_equal(index.search(text), expected_rows(df, text, ['顾问名称', '门店名称']))
+    np.testing.assert_array_equal(index.search(text, columns=['门店名称']), expected_rows(df, text, ['门店名称']))
+
+
+def test_bigrams_present_but_not_adjacent(df):
+    # “三张”与“张三”的字组相同时也要校验子串
+    index = SearchIndex(df)
+    np.testing.assert_array_equal(index.search('张三张'), expected_rows(df, '张三张', ['顾问名称']))
+
+
+def test_empty_search_returns_all_rows(df):
+    index = SearchIndex(df)
+    np.testing.assert_array_equal(index.search(''), np.arange(len(df)))
+    np.testing.assert_array_equal(index.search('   '), np.arange(len(df)))
+    np.testing.assert_array_equal(index.search(None), np.arange(len(df)))
+
+
+def test_search_strips_text_and_ignores_missing_columns(df):
+    index = SearchIndex(df, columns=['顾问名称', '不存在的列'])
+    assert index.columns == ['顾问名称']
+    np.testing.assert_array_equal(index.search(' 李四 '), expected_rows(df, '李四', ['顾问名称']))
+
+
+def test_search_on_larger_frame():
+    rng = np.random.default_rng(0)
+    chars = list('张王李赵刘陈杨黄一二三四五')
+    names = [''.join(rng.choice(chars, rng.integers(1, 5))) for _ in range(2000)]
+    df = pd.DataFrame({'顾问名称': names, '门店名称': [f"门店{i % 40}" for i in range(2000)]})
+    index = SearchIndex(df)
+    for text in ['张', '张王', '三四', '王李赵', '门店1', '店3', '张王李赵刘']:
+        np.testing.assert_array_equal(index.search(text), expected_rows(df, text, ['顾问名称', '门店名称']))
+
+
+@pytest.fixture
+def grid_df():
+    rng = np.random.default_rng(0)
+    size = 257
+    values = rng.integers(0, 20, size).astype(np.float64)
+    values[::13] = np.nan
+    return pd.DataFrame({
+        '顾问名称': [f"{'张王李'[i % 3]}顾问{i % 40}" for i in range(size)],
+        # 字典顺序与取值顺序不同，排序要按取值而不是编码
+        '门店名称': pd.Categorical([f"门店{i % 9}" for i in range(size)],
+                               categories=[f"门店{i}" for i in (8, 3, 0, 1, 2, 4, 5, 6, 7)]),
+        '大区': rng.choice(['华北', '华南'], size),
+        '最终收益值': values,
+    })
+
+
+@pytest.mark.parametrize('sort_by, ascending', [('最终收益值', True), ('最终收益值', False), ('门店名称', True),
+                                                ('门店名称', False), ('顾问名称', True), (None, True)])
+def test_grid_select_matches_pandas(grid_df, sort_by, ascending):
+    grid = DataGrid(grid_df)
+    mask = (grid_df['大区'] == '华北') & grid_df['顾问名称'].str.contains('张', regex=False)
+    expected = grid_df[mask]
+    if sort_by is not None:
+        key = expected[sort_by].astype(str) if sort_by == '门店名称' else expected[sort_by]
+        expected = expected.loc[key.sort_values(ascending=ascending, kind='stable', na_position='last').index]
+    positions = grid.select(search='张', filters={'大区': '华北'}, sort_by=sort_by, ascending=ascending)
+    np.testing.assert_array_equal(positions, expected.index.to_numpy())
+
+
+def test_grid_page_and_projection(grid_df):
+    grid = DataGrid(grid_df)
+    positions = grid.select(sort_by='最终收益值', ascending=False)
+    result = grid.page(positions, page=3, page_size=50, columns=['最终收益值', '顾问名称', '不存在'])
+    expected = grid_df.iloc[positions[100:150]][['最终收益值', '顾问名称']]
+    pd.testing.assert_frame_equal(result.data, expected)
+    assert (result.total_rows, result.page, result.page_count) == (len(grid_df), 3, 6)
+    # 页码超出范围时取最近的有效页
+    assert grid.page(positions, page=99, page_size=50).page == 6
+    assert grid.page(positions, page=0, page_size=50).page == 1
+    assert grid.distinct('大区', filters={'门店名称': '门店1'}) == sorted(
+        grid_df.loc[grid_df['门店名称'] == '门店1', '大区'].unique().tolist())
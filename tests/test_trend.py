@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_app
+from month_table import MonthTable
+
+MONTHS = ['2025年06月', '2025年07月', '2025年08月']
+
+
+def month_frame(seed):
+    rng = np.random.default_rng(seed)
+    size = 200
+    return pd.DataFrame({
+        '顾问编制': pd.Categorical(rng.choice(['全职', '兼职', '店员'], size)),
+        '最终收益值': rng.normal(50000, 10000, size).round(2),
+    })
+
+
+@pytest.fixture
+def dashboard():
+    streamlit_app._analysis_result.clear()
+    dashboard = streamlit_app.NutritionAdviserDashboard()
+    for seed, month_key in enumerate(MONTHS):
+        dashboard._set_month(month_key, {'data': month_frame(seed), 'source': 'uploaded',
+                                         'date': pd.Timestamp(f"2025-{6 + seed:02d}-01")})
+    return dashboard
+
+
+def expected_trend(frames):
+    records = []
+    for month_key, df in frames.items():
+        record = {'月份': month_key, '总体平均人效价值': df['最终收益值'].mean()}
+        record.update(df.groupby('顾问编制', observed=True)['最终收益值'].mean().to_dict())
+        records.append(record)
+    return pd.DataFrame(records).set_index('月份')
+
+
+def test_trend_table_matches_pandas(dashboard):
+    table = dashboard.get_trend_table()
+    assert table['月份'].tolist() == MONTHS
+    expected = expected_trend({month_key: dashboard.get_month_data(month_key) for month_key in MONTHS})
+    actual = table.drop(columns='日期').set_index('月份')
+    pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False, check_names=False)
+
+
+def test_replacing_a_month_only_aggregates_that_month(dashboard, monkeypatch):
+    dashboard.get_trend_table()
+    aggregated = []
+    original = MonthTable.aggregate
+
+    def counting(self, metric, by=None, months=None):
+        aggregated.append(tuple(months))
+        return original(self, metric, by, months)
+
+    monkeypatch.setattr(MonthTable, 'aggregate', counting)
+    replaced = month_frame(99)
+    dashboard._set_month(MONTHS[1], {'data': replaced, 'source': 'uploaded', 'date': pd.Timestamp('2025-07-01')})
+    table = dashboard.get_trend_table()
+
+    # 只有被替换的月份重新汇总（总体、按类型各一次）
+    assert aggregated == [(MONTHS[1],), (MONTHS[1],)]
+    expected = expected_trend({MONTHS[1]: replaced})
+    assert table.set_index('月份').loc[MONTHS[1], '总体平均人效价值'] == pytest.approx(
+        expected.loc[MONTHS[1], '总体平均人效价值'])
+
+    # 数据未变时整张趋势表命中缓存
+    aggregated.clear()
+    dashboard.get_trend_table()
+    assert aggregated == []
+
+
+def test_removed_month_leaves_the_trend(dashboard):
+    dashboard.get_trend_table()
+    dashboard.remove_month(MONTHS[0])
+    assert dashboard.get_trend_table()['月份'].tolist() == MONTHS[1:]